@@ -1,20 +1,38 @@
 from passlib.context import CryptContext
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
-from typing import Optional
+from typing import Dict, Optional, Tuple
+import asyncio
+import hashlib
 import os
+import time
 
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt runs here so a login never blocks the event loop
+_hash_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("AUTH_HASH_WORKERS", 2)), thread_name_prefix="bcrypt"
+)
 
 # JWT settings
 SECRET_KEY = os.environ.get("JWT_SECRET_KEY", "your-secret-key-change-in-production-32-chars-minimum")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 480  # 8 hours
 
-# Admin credentials (in production, store in database)
-ADMIN_USERNAME = "erishoppe_admin"
-ADMIN_PASSWORD_HASH = pwd_context.hash("@B@3Bh1327@")
+# Verified token payloads keyed by token digest, each kept until its exp
+TOKEN_CACHE_SIZE = int(os.environ.get("TOKEN_CACHE_SIZE", 256))
+_token_cache: "OrderedDict[bytes, Tuple[float, dict]]" = OrderedDict()
+# Digests of tokens revoked before their exp (logout), with that exp
+_revoked_tokens: Dict[bytes, float] = {}
+
+# Admin credentials (in production, store in database). The password is
+# configured as a bcrypt hash; hashing at import cost ~350ms per worker boot.
+ADMIN_USERNAME = os.environ.get("ADMIN_USERNAME", "erishoppe_admin")
+ADMIN_PASSWORD_HASH = os.environ.get(
+    "ADMIN_PASSWORD_HASH", "$2b$12$ptgj5YbWYyyDfuQBAJalL.DvJBtKUR5mzyo9JYmM/II8JuGKGm7WC"
+)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -29,6 +47,14 @@ def authenticate_admin(username: str, password: str) -> bool:
     return verify_password(password, ADMIN_PASSWORD_HASH)
 
 
+async def authenticate_admin_async(username: str, password: str) -> bool:
+    """Authenticate admin user with bcrypt off the event loop"""
+    if username != ADMIN_USERNAME:
+        return False
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_executor, verify_password, password, ADMIN_PASSWORD_HASH)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create JWT access token"""
     to_encode = data.copy()
@@ -42,8 +68,64 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 
+def _token_digest(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
+
+
 def verify_token(token: str) -> Optional[dict]:
-    """Verify JWT token and return payload"""
+    """Verify JWT token and return payload, using the verified-token cache.
+
+    Only valid tokens are cached, and a cached payload is dropped once the
+    token's exp passes, so the result matches a fresh decode. The returned
+    payload is shared between calls and must not be mutated.
+    """
+    digest = _token_digest(token)
+    now = time.time()
+    entry = _token_cache.get(digest)
+    if entry is not None:
+        expires_at, payload = entry
+        if now < expires_at:
+            _token_cache.move_to_end(digest)
+            return payload
+        del _token_cache[digest]
+
+    if digest in _revoked_tokens:
+        return None
+    payload = _decode_token(token)
+    if payload is None or "exp" not in payload:
+        return payload
+
+    _token_cache[digest] = (float(payload["exp"]), payload)
+    if len(_token_cache) > TOKEN_CACHE_SIZE:
+        _token_cache.popitem(last=False)
+    return payload
+
+
+def revoke_token(token: str) -> None:
+    """Reject a token until it expires (logout); per-process like the cache"""
+    digest = _token_digest(token)
+    _token_cache.pop(digest, None)
+    now = time.time()
+    for revoked, expires_at in list(_revoked_tokens.items()):
+        if expires_at <= now:
+            del _revoked_tokens[revoked]
+    payload = _decode_token(token)
+    if payload is not None and "exp" in payload:
+        _revoked_tokens[digest] = float(payload["exp"])
+
+
+def invalidate_token(token: str) -> None:
+    """Drop one token from the cache so its next use is fully re-verified"""
+    _token_cache.pop(_token_digest(token), None)
+
+
+def clear_token_cache() -> None:
+    """Forget every cached payload, e.g. after rotating JWT_SECRET_KEY"""
+    _token_cache.clear()
+
+
+def _decode_token(token: str) -> Optional[dict]:
+    """Verify JWT signature and claims and return payload"""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
@@ -0,0 +1,291 @@
+import asyncio
+from contextlib import AsyncExitStack
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+from models import MAX_BOOKING_HOURS
+
+# Services that consume the same physical resource. Bookings of services that
+# share a resource may not overlap; services not listed are not exclusive.
+BOOKING_RESOURCES = {
+    'car-with-driver': 'car',
+    'car-self-drive': 'car',
+}
+
+
+def as_utc(value: Union[str, datetime]) -> datetime:
+    """Parse an ISO string or datetime into an aware UTC datetime.
+
+    Naive values are treated as UTC, which is how the API has always
+    interpreted them.
+    """
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _iso(value: Union[str, datetime]) -> str:
+    return value if isinstance(value, str) else value.isoformat()
+
+
+class BookingInterval(NamedTuple):
+    id: str
+    start: datetime
+    end: datetime
+    service_type: str
+    slot: dict  # precomputed blocked_slots entry
+
+
+class BookingIntervalIndex:
+    """Process-local index of non-cancelled bookings ordered by start time.
+
+    Entries are kept in a list sorted by (start, id) alongside the longest
+    booking duration seen, so an overlap query only has to look at bookings
+    starting within one maximum duration before the window: O(log n + k).
+
+    Bookings occupy the half-open interval [start, end); a booking without
+    an end date is a single instant. Bookings that merely touch the window
+    edge do not overlap it.
+    """
+
+    def __init__(self):
+        self._keys: List[Tuple[datetime, str]] = []
+        self._by_id: Dict[str, BookingInterval] = {}
+        self._max_duration = timedelta(0)
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __contains__(self, booking_id: str) -> bool:
+        return booking_id in self._by_id
+
+    def load(self, bookings: Iterable[dict]) -> None:
+        """Replace the index contents with the given booking documents"""
+        self._keys = []
+        self._by_id = {}
+        self._max_duration = timedelta(0)
+        entries = [self.interval_for(booking) for booking in bookings]
+        for entry in entries:
+            self._store(entry)
+        self._keys = sorted((entry.start, entry.id) for entry in entries)
+
+    def add(self, booking: dict) -> None:
+        """Insert or replace a booking document"""
+        self.remove(booking['id'])
+        entry = self.interval_for(booking)
+        self._store(entry)
+        insort(self._keys, (entry.start, entry.id))
+
+    def remove(self, booking_id: str) -> None:
+        entry = self._by_id.pop(booking_id, None)
+        if entry is None:
+            return
+        position = bisect_left(self._keys, (entry.start, entry.id))
+        del self._keys[position]
+
+    def overlapping(self, start: datetime, end: datetime, service_types: Optional[Iterable[str]] = None) -> List[BookingInterval]:
+        """Bookings overlapping [start, end), ordered by start"""
+        if end <= start:
+            return []
+        services = set(service_types) if service_types is not None else None
+        lo = bisect_left(self._keys, (start - self._max_duration,))
+        hi = bisect_left(self._keys, (end,))
+        matches = []
+        for _, booking_id in self._keys[lo:hi]:
+            entry = self._by_id[booking_id]
+            if services is not None and entry.service_type not in services:
+                continue
+            if entry.end > start or (entry.end == entry.start and entry.start >= start):
+                matches.append(entry)
+        return matches
+
+    def _store(self, entry: BookingInterval) -> None:
+        self._by_id[entry.id] = entry
+        self._max_duration = max(self._max_duration, entry.end - entry.start)
+
+    @staticmethod
+    def interval_for(booking: dict) -> BookingInterval:
+        start = as_utc(booking['booking_date'])
+        end_value = booking.get('booking_end_date') or booking['booking_date']
+        end = max(as_utc(end_value), start)
+        return BookingInterval(
+            id=booking['id'],
+            start=start,
+            end=end,
+            service_type=booking['service_type'],
+            slot={
+                "id": booking['id'],
+                "start": _iso(booking['booking_date']),
+                "end": _iso(end_value),
+                "service_type": booking['service_type'],
+            },
+        )
+
+
+def stored_overlap_query(entry: BookingInterval, services: Iterable[str]) -> dict:
+    """Mongo filter for other active bookings of the services overlapping entry.
+
+    Same semantics as BookingIntervalIndex.overlapping(); the start is
+    bounded below by the longest allowed booking so the query stays a
+    range scan on booking_date.
+    """
+    end = entry.end if entry.end > entry.start else entry.start + timedelta(milliseconds=1)
+    return {
+        "id": {"$ne": entry.id},
+        "service_type": {"$in": list(services)},
+        "status": {"$ne": "cancelled"},
+        "booking_date": {"$gte": entry.start - timedelta(hours=MAX_BOOKING_HOURS), "$lt": end},
+        "$or": [
+            {"booking_end_date": {"$gt": entry.start}},
+            {"booking_end_date": None, "booking_date": {"$gte": entry.start}},
+        ],
+    }
+
+
+class BookingConflict(Exception):
+    """Raised when a booking overlaps an existing booking of the same resource"""
+
+    def __init__(self, conflict: BookingInterval):
+        super().__init__(f"Booking overlaps booking {conflict.id}")
+        self.conflict = conflict
+
+
+class BookingReservations:
+    """Atomic overlap check + write for bookings of exclusive resources.
+
+    Writes for the same resource are serialised by an asyncio lock and
+    checked against the interval index while holding it, so concurrent
+    requests in this process cannot both claim an overlapping window.
+
+    The lock and the index are per process. With find_stored set, every
+    write is followed by a verification query against the database
+    (stored_overlap_query); if another worker stored an overlapping
+    booking in the meantime the write is undone and BookingConflict is
+    raised. When two workers race, each sees the other's booking, so at
+    worst both are rejected and never both kept.
+    """
+
+    def __init__(
+        self,
+        index: BookingIntervalIndex,
+        find_stored: Optional[Callable[[dict], Awaitable[Optional[dict]]]] = None,
+    ):
+        self.index = index
+        self.find_stored = find_stored
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def find_conflict(self, booking: dict) -> Optional[BookingInterval]:
+        """First active booking of the same resource overlapping this one"""
+        resource = BOOKING_RESOURCES.get(booking['service_type'])
+        if resource is None:
+            return None
+        entry = self.index.interval_for(booking)
+        # A booking without an end date still occupies its start instant
+        end = entry.end if entry.end > entry.start else entry.start + timedelta(microseconds=1)
+        services = [service for service, owner in BOOKING_RESOURCES.items() if owner == resource]
+        for other in self.index.overlapping(entry.start, end, services):
+            if other.id != entry.id:
+                return other
+        return None
+
+    async def find_stored_conflict(self, booking: dict) -> Optional[BookingInterval]:
+        """First overlapping booking of the same resource in the database, e.g. from another worker"""
+        resource = BOOKING_RESOURCES.get(booking['service_type'])
+        if resource is None or self.find_stored is None:
+            return None
+        services = [service for service, owner in BOOKING_RESOURCES.items() if owner == resource]
+        other = await self.find_stored(stored_overlap_query(self.index.interval_for(booking), services))
+        return self.index.interval_for(other) if other is not None else None
+
+    async def reserve(
+        self,
+        booking: dict,
+        write: Callable[[], Awaitable[object]],
+        undo: Optional[Callable[[], Awaitable[object]]] = None,
+    ) -> None:
+        """Run write() and index the booking, unless it would double-book.
+
+        undo() reverts write() when the verification query finds an
+        overlapping booking stored by another worker. Bookings already in
+        the index are not re-checked, so status changes between active
+        states never conflict.
+        """
+        resource = BOOKING_RESOURCES.get(booking['service_type'])
+        if resource is None:
+            await write()
+            self.index.add(booking)
+            return
+        lock = self._locks.setdefault(resource, asyncio.Lock())
+        async with lock:
+            if booking['id'] in self.index:
+                await write()
+                self.index.add(booking)
+                return
+            conflict = self.find_conflict(booking)
+            if conflict is not None:
+                raise BookingConflict(conflict)
+            await write()
+            stored = await self.find_stored_conflict(booking)
+            if stored is not None:
+                if undo is not None:
+                    await undo()
+                raise BookingConflict(stored)
+            self.index.add(booking)
+
+    async def reserve_many(
+        self,
+        bookings: List[dict],
+        write: Callable[[List[dict]], Awaitable[Dict[str, str]]],
+        undo: Optional[Callable[[List[str]], Awaitable[object]]] = None,
+    ) -> Tuple[List[dict], Dict[str, BookingInterval], Dict[str, str]]:
+        """Reserve a batch of bookings with one write.
+
+        Holds the locks of every resource in the batch (in a fixed order),
+        checks each booking against the index and the bookings accepted
+        before it in the batch, then passes the accepted ones to write(),
+        which returns {id: error} for documents it failed to store. Stored
+        bookings that the verification query finds overlapping another
+        worker's booking are passed to undo(ids) and reported as conflicts.
+        Returns (stored bookings, conflicts by id, write errors by id).
+        """
+        resources = sorted({
+            BOOKING_RESOURCES[booking['service_type']]
+            for booking in bookings if booking['service_type'] in BOOKING_RESOURCES
+        })
+        async with AsyncExitStack() as stack:
+            for resource in resources:
+                await stack.enter_async_context(self._locks.setdefault(resource, asyncio.Lock()))
+            accepted, conflicts = [], {}
+            for booking in bookings:
+                conflict = self.find_conflict(booking)
+                if conflict is not None:
+                    conflicts[booking['id']] = conflict
+                    continue
+                # Indexed before the write so later items in the batch see it
+                self.index.add(booking)
+                accepted.append(booking)
+            try:
+                errors = await write(accepted) if accepted else {}
+            except Exception:
+                for booking in accepted:
+                    self.index.remove(booking['id'])
+                raise
+            for booking_id in errors:
+                self.index.remove(booking_id)
+            stored = [booking for booking in accepted if booking['id'] not in errors]
+            rejected = []
+            for booking in stored:
+                conflict = await self.find_stored_conflict(booking)
+                if conflict is not None:
+                    conflicts[booking['id']] = conflict
+                    rejected.append(booking['id'])
+            if rejected:
+                if undo is not None:
+                    await undo(rejected)
+                for booking_id in rejected:
+                    self.index.remove(booking_id)
+                stored = [booking for booking in stored if booking['id'] not in conflicts]
+        return stored, conflicts, errors
@@ -0,0 +1,67 @@
+"""Microbenchmark: GET /api/bookings/calendar vs the raw blocked_slots payload.
+
+Builds a month of car bookings in the in-memory index and compares the
+size of the availability response the booking modal used to download with
+the month calendar, plus the cost of computing a calendar (cache miss) and
+of serving one from the cache. Run from the backend directory:
+
+    python -m benchmarks.bench_calendar
+"""
+import json
+import sys
+import timeit
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from availability import BookingIntervalIndex  # noqa: E402
+from cache import GenerationCache  # noqa: E402
+from calendar_slots import day_starts, month_calendar  # noqa: E402
+
+
+def make_index(count: int) -> BookingIntervalIndex:
+    """count car bookings of 2-24 hours spread over November 2026"""
+    index = BookingIntervalIndex()
+    start = datetime(2026, 11, 1, tzinfo=timezone.utc)
+    durations = (2, 4, 12, 24)
+    bookings = []
+    for i in range(count):
+        booking_date = start + timedelta(minutes=(i * 30 * 24 * 60) // count)
+        bookings.append({
+            "id": f"booking-{i}",
+            "booking_date": booking_date,
+            "booking_end_date": booking_date + timedelta(hours=durations[i % len(durations)]),
+            "service_type": ("car-with-driver", "car-self-drive")[i % 2],
+        })
+    index.load(bookings)
+    return index
+
+
+def bench(fn, number: int) -> float:
+    """Best-of-7 cost of one call in microseconds"""
+    return min(timeit.repeat(fn, number=number, repeat=7)) / number * 1e6
+
+
+def main(sizes=(50, 500, 5000)):
+    print("November 2026, car bookings, 30 minute slots, best of 7")
+    for size in sizes:
+        index = make_index(size)
+        starts = day_starts(2026, 11)
+        blocked_slots = [entry.slot for entry in index.overlapping(starts[0], starts[-1])]
+        raw = json.dumps({"blocked_slots": blocked_slots}).encode()
+
+        def compute():
+            return json.dumps(month_calendar(index, 2026, 11, "car-with-driver", 30)).encode()
+
+        body = compute()
+        cache = GenerationCache()
+        cache.put(("2026-11", "car-with-driver", 30), body, cache.generation)
+        miss = bench(compute, 200)
+        hit = bench(lambda: cache.get(("2026-11", "car-with-driver", 30)), 20000)
+        print(f"{size:5d} bookings  blocked_slots {len(raw):8d} B   calendar {len(body):4d} B   "
+              f"compute {miss:7.1f} us   cached {hit:5.2f} us")
+
+
+if __name__ == "__main__":
+    main()
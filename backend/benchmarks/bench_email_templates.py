@@ -0,0 +1,317 @@
+"""Microbenchmark: legacy inline f-string emails vs the email templates.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_email_templates
+"""
+import sys
+import timeit
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from email_templates import render_booking_confirmation, render_booking_notification  # noqa: E402
+
+
+class LegacyRenderer:
+    """Verbatim copy of the pre-template EmailService rendering code"""
+
+    def render_booking_confirmation(self, booking_data: dict):
+        """Send booking confirmation email to customer"""
+        customer_email = booking_data['email']
+        customer_name = booking_data['name']
+        
+        subject = "Booking Confirmation - Eri's Shoppe"
+        
+        # Format booking date
+        booking_date = booking_data['booking_date']
+        if isinstance(booking_date, str):
+            booking_date = datetime.fromisoformat(booking_date.replace('Z', '+00:00'))
+        formatted_date = booking_date.strftime("%B %d, %Y at %I:%M %p")
+        
+        # Determine service details
+        service_name = self._get_service_name(booking_data['service_type'])
+        duration_text = self._get_duration_text(booking_data)
+        
+        html_content = f"""
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <style>
+                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
+                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
+                .header {{ background-color: #0f172a; color: white; padding: 20px; text-align: center; border-radius: 8px 8px 0 0; }}
+                .content {{ background-color: #f8f9fa; padding: 30px; border-radius: 0 0 8px 8px; }}
+                .booking-details {{ background-color: white; padding: 20px; border-radius: 8px; margin: 20px 0; }}
+                .detail-row {{ display: flex; padding: 10px 0; border-bottom: 1px solid #e2e8f0; }}
+                .detail-label {{ font-weight: bold; width: 150px; color: #64748b; }}
+                .detail-value {{ flex: 1; }}
+                .footer {{ text-align: center; margin-top: 30px; color: #64748b; font-size: 14px; }}
+                .button {{ background-color: #0f172a; color: white; padding: 12px 30px; text-decoration: none; border-radius: 6px; display: inline-block; margin-top: 20px; }}
+            </style>
+        </head>
+        <body>
+            <div class="container">
+                <div class="header">
+                    <h1>Booking Confirmed!</h1>
+                </div>
+                <div class="content">
+                    <p>Dear {customer_name},</p>
+                    <p>Thank you for choosing Eri's Shoppe! Your booking has been confirmed.</p>
+                    
+                    <div class="booking-details">
+                        <h2 style="margin-top: 0; color: #0f172a;">Booking Details</h2>
+                        <div class="detail-row">
+                            <div class="detail-label">Service:</div>
+                            <div class="detail-value">{service_name}</div>
+                        </div>
+                        <div class="detail-row">
+                            <div class="detail-label">Date & Time:</div>
+                            <div class="detail-value">{formatted_date}</div>
+                        </div>
+                        {f'''
+                        <div class="detail-row">
+                            <div class="detail-label">Duration:</div>
+                            <div class="detail-value">{duration_text}</div>
+                        </div>
+                        ''' if duration_text else ''}
+                        {f'''
+                        <div class="detail-row">
+                            <div class="detail-label">Pickup Location:</div>
+                            <div class="detail-value">{booking_data.get('pickup_location', 'N/A')}</div>
+                        </div>
+                        ''' if booking_data.get('pickup_location') else ''}
+                        {f'''
+                        <div class="detail-row">
+                            <div class="detail-label">Drop-off Location:</div>
+                            <div class="detail-value">{booking_data.get('dropoff_location', 'N/A')}</div>
+                        </div>
+                        ''' if booking_data.get('dropoff_location') else ''}
+                        <div class="detail-row">
+                            <div class="detail-label">Contact Phone:</div>
+                            <div class="detail-value">{booking_data['phone']}</div>
+                        </div>
+                    </div>
+                    
+                    <p>We will contact you shortly to confirm the final details.</p>
+                    <p>If you have any questions, feel free to reach out:</p>
+                    <ul>
+                        <li>Phone/WhatsApp: 0909 967 4035</li>
+                        <li>Email: rensengamboa@gmail.com</li>
+                    </ul>
+                    
+                    <div class="footer">
+                        <p><strong>Eri's Shoppe</strong><br>
+                        Luzonwide Coverage<br>
+                        Your Trusted Partner for All Services</p>
+                    </div>
+                </div>
+            </div>
+        </body>
+        </html>
+        """
+        
+        text_content = f"""
+        Booking Confirmation - Eri's Shoppe
+        
+        Dear {customer_name},
+        
+        Thank you for choosing Eri's Shoppe! Your booking has been confirmed.
+        
+        Booking Details:
+        Service: {service_name}
+        Date & Time: {formatted_date}
+        {f"Duration: {duration_text}" if duration_text else ""}
+        {f"Pickup Location: {booking_data.get('pickup_location')}" if booking_data.get('pickup_location') else ""}
+        {f"Drop-off Location: {booking_data.get('dropoff_location')}" if booking_data.get('dropoff_location') else ""}
+        Contact Phone: {booking_data['phone']}
+        
+        We will contact you shortly to confirm the final details.
+        
+        Contact us:
+        Phone/WhatsApp: 0909 967 4035
+        Email: rensengamboa@gmail.com
+        
+        Eri's Shoppe - Your Trusted Partner for All Services
+        """
+        
+        return subject, html_content, locals().get('text_content')
+
+    def render_booking_notification(self, booking_data: dict):
+        """Send new booking notification to business owner"""
+        subject = f"New Booking Received - {self._get_service_name(booking_data['service_type'])}"
+        
+        # Format booking date
+        booking_date = booking_data['booking_date']
+        if isinstance(booking_date, str):
+            booking_date = datetime.fromisoformat(booking_date.replace('Z', '+00:00'))
+        formatted_date = booking_date.strftime("%B %d, %Y at %I:%M %p")
+        
+        duration_text = self._get_duration_text(booking_data)
+        
+        html_content = f"""
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <style>
+                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
+                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
+                .header {{ background-color: #16a34a; color: white; padding: 20px; text-align: center; border-radius: 8px 8px 0 0; }}
+                .content {{ background-color: #f8f9fa; padding: 30px; border-radius: 0 0 8px 8px; }}
+                .booking-details {{ background-color: white; padding: 20px; border-radius: 8px; margin: 20px 0; }}
+                .detail-row {{ padding: 10px 0; border-bottom: 1px solid #e2e8f0; }}
+                .detail-label {{ font-weight: bold; color: #64748b; }}
+                .detail-value {{ margin-top: 5px; }}
+                .urgent {{ background-color: #fef3c7; padding: 15px; border-left: 4px solid #f59e0b; border-radius: 4px; margin: 20px 0; }}
+            </style>
+        </head>
+        <body>
+            <div class="container">
+                <div class="header">
+                    <h1>🎉 New Booking Received!</h1>
+                </div>
+                <div class="content">
+                    <div class="urgent">
+                        <strong>Action Required:</strong> Please contact the customer to confirm the booking.
+                    </div>
+                    
+                    <div class="booking-details">
+                        <h2 style="margin-top: 0; color: #0f172a;">Customer Information</h2>
+                        <div class="detail-row">
+                            <div class="detail-label">Name:</div>
+                            <div class="detail-value">{booking_data['name']}</div>
+                        </div>
+                        <div class="detail-row">
+                            <div class="detail-label">Email:</div>
+                            <div class="detail-value">{booking_data['email']}</div>
+                        </div>
+                        <div class="detail-row">
+                            <div class="detail-label">Phone:</div>
+                            <div class="detail-value">{booking_data['phone']}</div>
+                        </div>
+                        
+                        <h2 style="margin-top: 30px; color: #0f172a;">Booking Details</h2>
+                        <div class="detail-row">
+                            <div class="detail-label">Service:</div>
+                            <div class="detail-value">{self._get_service_name(booking_data['service_type'])}</div>
+                        </div>
+                        <div class="detail-row">
+                            <div class="detail-label">Date & Time:</div>
+                            <div class="detail-value">{formatted_date}</div>
+                        </div>
+                        {f'''
+                        <div class="detail-row">
+                            <div class="detail-label">Duration:</div>
+                            <div class="detail-value">{duration_text}</div>
+                        </div>
+                        ''' if duration_text else ''}
+                        {f'''
+                        <div class="detail-row">
+                            <div class="detail-label">Package:</div>
+                            <div class="detail-value">{booking_data.get('package_type', 'N/A').replace('-', ' ').title()}</div>
+                        </div>
+                        ''' if booking_data.get('package_type') else ''}
+                        {f'''
+                        <div class="detail-row">
+                            <div class="detail-label">Pickup Location:</div>
+                            <div class="detail-value">{booking_data.get('pickup_location')}</div>
+                        </div>
+                        ''' if booking_data.get('pickup_location') else ''}
+                        {f'''
+                        <div class="detail-row">
+                            <div class="detail-label">Drop-off Location:</div>
+                            <div class="detail-value">{booking_data.get('dropoff_location')}</div>
+                        </div>
+                        ''' if booking_data.get('dropoff_location') else ''}
+                        {f'''
+                        <div class="detail-row">
+                            <div class="detail-label">Message:</div>
+                            <div class="detail-value">{booking_data.get('message')}</div>
+                        </div>
+                        ''' if booking_data.get('message') else ''}
+                    </div>
+                </div>
+            </div>
+        </body>
+        </html>
+        """
+        
+        return subject, html_content, locals().get('text_content')
+
+    def _get_service_name(self, service_type: str) -> str:
+        """Get friendly service name"""
+        service_names = {
+            'car-with-driver': 'Car Service - With Driver',
+            'car-self-drive': 'Car Service - Self Drive',
+            'computer': 'Computer Services',
+            'consulting': 'Freelancing & Consulting'
+        }
+        return service_names.get(service_type, service_type)
+
+    def _get_duration_text(self, booking_data: dict) -> str:
+        """Get duration text"""
+        if booking_data.get('duration_hours'):
+            hours = booking_data['duration_hours']
+            if hours == 24:
+                return "Full Day (24 hours)"
+            elif hours == 12:
+                return "Half Day (12 hours)"
+            elif hours <= 4:
+                return f"{hours} hour(s)"
+            else:
+                return f"{hours} hours"
+        return ""
+
+
+BOOKING = {
+    "name": "Juan Dela Cruz",
+    "email": "juan@example.com",
+    "phone": "09171234567",
+    "service_type": "car-with-driver",
+    "booking_date": "2026-11-01T09:00:00+00:00",
+    "duration_hours": 12,
+    "package_type": "half-day",
+    "pickup_location": "Makati City",
+    "dropoff_location": "NAIA Terminal 3",
+    "message": "Two passengers with luggage",
+}
+
+
+def make_bookings(count: int, as_string: bool):
+    """Distinct bookings so per-date caching cannot hit across iterations"""
+    start = datetime(2026, 11, 1, 9, 0, tzinfo=timezone.utc)
+    bookings = []
+    for i in range(count):
+        booking_date = start + timedelta(minutes=30 * i)
+        bookings.append(dict(BOOKING, booking_date=booking_date.isoformat() if as_string else booking_date))
+    return bookings
+
+
+def bench(bookings, confirmation, notification):
+    """Best-of-7 cost of rendering the customer + business pair for one booking"""
+    def run():
+        for booking in bookings:
+            confirmation(booking)
+            notification(booking)
+    return min(timeit.repeat(run, number=1, repeat=7)) / len(bookings) * 1e6
+
+
+def main(count: int = 20000):
+    legacy = LegacyRenderer()
+    print(f"customer confirmation + business notification, {count} bookings, best of 7")
+    for as_string in (True, False):
+        bookings = make_bookings(count, as_string)
+        old = bench(bookings, legacy.render_booking_confirmation, legacy.render_booking_notification)
+        new = bench(bookings, render_booking_confirmation, render_booking_notification)
+        label = "ISO string dates" if as_string else "datetime dates"
+        print(f"{label:<18} legacy {old:7.2f} us   templates {new:7.2f} us   ratio {old / new:.2f}x")
+
+    old_html = legacy.render_booking_confirmation(BOOKING)[1]
+    new = render_booking_confirmation(BOOKING)
+    print(f"customer HTML size: legacy {len(old_html)} bytes, templates {len(new.html)} bytes")
+    print("template output also escapes user fields and includes a text part for every email")
+
+
+if __name__ == "__main__":
+    main()
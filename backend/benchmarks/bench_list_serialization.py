@@ -0,0 +1,96 @@
+"""Microbenchmark: list response serialization, response_model vs FAST_JSON_RESPONSES.
+
+Times the work FastAPI does after GET /api/bookings has fetched its rows
+(response_model validation + stdlib json) against RawJSONResponse, and
+records peak allocations with tracemalloc. Run from the backend directory:
+
+    python -m benchmarks.bench_list_serialization
+"""
+import asyncio
+import os
+import sys
+import timeit
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "bench")
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+
+from models import Booking  # noqa: E402
+from responses import RawJSONResponse  # noqa: E402
+from server import app  # noqa: E402
+
+
+def make_rows(count: int) -> list:
+    """Rows as Motor returns them with the model projection (tz-aware datetimes)"""
+    start = datetime(2026, 1, 1, 9, tzinfo=timezone.utc)
+    rows = []
+    for i in range(count):
+        booking_date = start + timedelta(hours=i)
+        rows.append(Booking(
+            id=str(uuid.uuid4()),
+            name=f"Customer {i}",
+            email=f"customer{i}@example.com",
+            phone="+1 555 0100",
+            service_type="car-with-driver",
+            pickup_location="Airport",
+            dropoff_location="Hotel",
+            booking_date=booking_date,
+            booking_end_date=booking_date + timedelta(hours=4),
+            duration_hours=4,
+            package_type="half-day",
+            message="Two passengers, one large suitcase",
+            created_at=booking_date - timedelta(days=2),
+        ).model_dump())
+    return rows
+
+
+def bookings_route():
+    return next(
+        route for route in app.routes
+        if getattr(route, "path", None) == "/api/bookings" and "GET" in route.methods
+    )
+
+
+def main(sizes=(1000, 10000)):
+    route = bookings_route()
+    loop = asyncio.new_event_loop()
+
+    def validated(rows):
+        content = loop.run_until_complete(
+            serialize_response(field=route.response_field, response_content=rows)
+        )
+        return JSONResponse(content).body
+
+    def fast(rows):
+        return RawJSONResponse(rows).body
+
+    print("GET /api/bookings serialization, best of 5")
+    for size in sizes:
+        rows = make_rows(size)
+        assert validated(rows) == fast(rows), "fast path output differs"
+        number = max(1, 20000 // size)
+        results = {}
+        for label, fn in (("response_model", validated), ("fast path", fast)):
+            seconds = min(timeit.repeat(lambda: fn(rows), number=number, repeat=5)) / number
+            tracemalloc.start()
+            fn(rows)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            results[label] = (seconds, peak)
+        (slow_s, slow_peak), (fast_s, fast_peak) = results["response_model"], results["fast path"]
+        print(f"{size:6d} rows  response_model {slow_s * 1000:8.2f} ms {slow_peak / 2**20:7.1f} MiB   "
+              f"fast path {fast_s * 1000:7.2f} ms {fast_peak / 2**20:6.1f} MiB   "
+              f"{slow_s / fast_s:.1f}x faster")
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
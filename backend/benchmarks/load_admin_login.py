@@ -0,0 +1,131 @@
+"""Load test: public endpoint latency while admin logins are hammered.
+
+Measures GET /api/bookings/availability latency (p50/p99) on its own and
+then while a stream of concurrent admin logins runs. In-process mode also
+repeats the run with bcrypt verified inline on the event loop, the way
+admin_login used to work, for comparison.
+
+Against a running server (use a test deployment, raise its login limits
+via LOGIN_MAX_ATTEMPTS_PER_USER / LOGIN_MAX_ATTEMPTS_PER_IP):
+
+    python -m benchmarks.load_admin_login --base-url http://localhost:8001/api --password ...
+
+In-process against the ASGI app (needs MONGO_URL / DB_NAME of a test database):
+
+    python -m benchmarks.load_admin_login --in-process
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@asynccontextmanager
+async def client_for(args):
+    if args.in_process:
+        import server
+        async with server.app.router.lifespan_context(server.app):
+            transport = httpx.ASGITransport(app=server.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://load/api") as client:
+                yield client
+    else:
+        async with httpx.AsyncClient(base_url=args.base_url, timeout=30) as client:
+            yield client
+
+
+def percentile(samples, q: float) -> float:
+    return statistics.quantiles(samples, n=100)[int(q) - 1] if len(samples) > 1 else samples[0]
+
+
+async def probe_public(client, args, stop: asyncio.Event):
+    """Availability requests on a fixed schedule until stopped; returns latencies in ms.
+
+    Latency is measured from when each request was due, not when it was
+    sent, so time the event loop spends blocked is counted instead of
+    silently delaying the probe (coordinated omission).
+    """
+    params = {"start_date": "2026-01-01T00:00:00Z", "end_date": "2026-03-01T00:00:00Z"}
+    latencies = []
+    due = time.perf_counter()
+    while not stop.is_set() or not latencies:
+        await asyncio.sleep(max(due - time.perf_counter(), 0))
+        await client.get("/bookings/availability", params=params)
+        now = time.perf_counter()
+        while due <= now:
+            latencies.append((now - due) * 1000)
+            due += args.probe_interval
+    return latencies
+
+
+async def hammer_logins(client, args):
+    statuses = {}
+    semaphore = asyncio.Semaphore(args.login_concurrency)
+
+    async def login(i):
+        async with semaphore:
+            response = await client.post("/admin/login", json={"username": args.username, "password": args.password})
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    await asyncio.gather(*(login(i) for i in range(args.logins)))
+    return statuses
+
+
+async def run(client, args, label: str, with_logins: bool):
+    """Probe the public endpoint while logins run, or for --baseline-seconds"""
+    stop = asyncio.Event()
+    probe = asyncio.create_task(probe_public(client, args, stop))
+    statuses = {}
+    if with_logins:
+        statuses = await hammer_logins(client, args)
+    else:
+        await asyncio.sleep(args.baseline_seconds)
+    stop.set()
+    latencies = await probe
+    print(f"{label:<34} p50 {percentile(latencies, 50):7.1f} ms   p99 {percentile(latencies, 99):7.1f} ms"
+          f"   max {max(latencies):7.1f} ms   samples {len(latencies):4d}   logins {statuses or '-'}")
+
+
+async def main(args):
+    async with client_for(args) as client:
+        if args.in_process:
+            import auth
+            import server
+            from ratelimit import AttemptLimiter
+            # Measure hashing, not the limiter
+            server.login_user_limiter = AttemptLimiter(10 ** 9, 60)
+            server.login_ip_limiter = AttemptLimiter(10 ** 9, 60)
+
+        await run(client, args, "public only", with_logins=False)
+        await run(client, args, "public + logins (thread pool)", with_logins=True)
+
+        if args.in_process:
+            pooled = server.authenticate_admin_async
+
+            async def inline(username, password):
+                return auth.authenticate_admin(username, password)
+
+            server.authenticate_admin_async = inline
+            try:
+                await run(client, args, "public + logins (inline bcrypt)", with_logins=True)
+            finally:
+                server.authenticate_admin_async = pooled
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8001/api")
+    parser.add_argument("--in-process", action="store_true")
+    parser.add_argument("--username", default="erishoppe_admin")
+    parser.add_argument("--password", default="wrong-password")
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--login-concurrency", type=int, default=8)
+    parser.add_argument("--baseline-seconds", type=float, default=2.0)
+    parser.add_argument("--probe-interval", type=float, default=0.005)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,398 @@
+"""Load test: mixed traffic against a local stack, with per-endpoint latency percentiles.
+
+By default the harness starts everything it needs on free local ports: a
+throwaway mongod (data in a temp directory), an aiosmtpd sink that
+accepts and counts the outbox's emails, and the app under uvicorn. It
+then drives a weighted mix of booking, availability, contact and admin
+requests and writes RPS plus p50/p95/p99 per endpoint as JSON, so runs
+from two releases can be diffed. Needs `mongod` on PATH and
+`pip install aiosmtpd`. Run from the backend directory:
+
+    python -m benchmarks.load_test --duration 30 --concurrency 32 --output before.json
+    python -m benchmarks.load_test --mix booking=1,availability=10,admin=2 --compare before.json
+
+Against an already running deployment (test data only; bookings are
+really created). Admin requests need --admin-password:
+
+    python -m benchmarks.load_test --base-url http://localhost:8001/api --admin-password ...
+
+--rate switches from a closed loop (each worker sends its next request
+when the last one finished) to a fixed arrival rate. Latency is then
+measured from when each request was due, so server stalls are not
+hidden by the load generator slowing down (coordinated omission).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import secrets
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.load_admin_login import percentile  # noqa: E402
+from benchmarks.profile_startup import BACKEND_DIR, free_port  # noqa: E402
+
+DEFAULT_MIX = "booking=2,availability=10,contact=2,admin=3"
+SERVICE_TYPES = ["car-with-driver", "car-self-drive", "computer", "consulting"]
+
+
+# Traffic: each scenario sends one request and returns (endpoint label, response)
+
+def random_booking_date() -> str:
+    # Spread over ~3 years of hourly slots so most bookings do not conflict
+    start = datetime(2027, 1, 1, tzinfo=timezone.utc)
+    return (start + timedelta(hours=random.randrange(3 * 365 * 24))).isoformat()
+
+
+async def create_booking(client, admin_headers):
+    response = await client.post("/bookings", json={
+        "name": "Load Test",
+        "email": f"load+{uuid.uuid4().hex[:8]}@example.com",
+        "phone": "+1 555 0100",
+        "service_type": random.choice(SERVICE_TYPES),
+        "booking_date": random_booking_date(),
+        "duration_hours": random.choice([None, 4, 12]),
+        "message": "load test",
+    })
+    return "POST /bookings", response
+
+
+async def get_availability(client, admin_headers):
+    start = datetime(2027, 1, 1, tzinfo=timezone.utc) + timedelta(days=30 * random.randrange(36))
+    response = await client.get("/bookings/availability", params={
+        "start_date": start.isoformat(),
+        "end_date": (start + timedelta(days=42)).isoformat(),
+    })
+    return "GET /bookings/availability", response
+
+
+async def submit_contact(client, admin_headers):
+    response = await client.post("/contact", json={
+        "name": "Load Test",
+        "email": f"load+{uuid.uuid4().hex[:8]}@example.com",
+        "service": random.choice(SERVICE_TYPES),
+        "message": "load test",
+    })
+    return "POST /contact", response
+
+
+ADMIN_READS = [
+    ("GET /admin/stats", "/admin/stats", None),
+    ("GET /bookings", "/bookings", {"limit": 100}),
+    ("GET /contact", "/contact", {"limit": 100}),
+]
+
+
+async def admin_read(client, admin_headers):
+    label, path, params = random.choice(ADMIN_READS)
+    return label, await client.get(path, params=params, headers=admin_headers)
+
+
+SCENARIOS = {
+    "booking": create_booking,
+    "availability": get_availability,
+    "contact": submit_contact,
+    "admin": admin_read,
+}
+
+
+def parse_mix(mix: str):
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in SCENARIOS:
+            raise SystemExit(f"unknown scenario {name!r}; choose from {', '.join(SCENARIOS)}")
+        weights[name.strip()] = float(weight or 1)
+    return list(weights), list(weights.values())
+
+
+class Recorder:
+    """Latency samples and status codes per endpoint label"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.errors = defaultdict(int)
+        self.recording = False
+
+    def record(self, label: str, status, latency_ms: float):
+        if not self.recording:
+            return
+        self.latencies[label].append(latency_ms)
+        self.statuses[label][str(status)] += 1
+        if status == "error" or status >= 500:
+            self.errors[label] += 1
+
+    def summary(self, seconds: float) -> dict:
+        def stats(samples, statuses, errors):
+            return {
+                "requests": len(samples),
+                "errors": errors,
+                "statuses": dict(sorted(statuses.items())),
+                "rps": round(len(samples) / seconds, 1),
+                "p50_ms": round(percentile(samples, 50), 2),
+                "p95_ms": round(percentile(samples, 95), 2),
+                "p99_ms": round(percentile(samples, 99), 2),
+                "max_ms": round(max(samples), 2),
+            }
+
+        endpoints = {
+            label: stats(samples, self.statuses[label], self.errors[label])
+            for label, samples in sorted(self.latencies.items())
+        }
+        everything = [sample for samples in self.latencies.values() for sample in samples]
+        totals = defaultdict(int)
+        for statuses in self.statuses.values():
+            for status, count in statuses.items():
+                totals[status] += count
+        total = stats(everything, totals, sum(self.errors.values())) if everything else {}
+        return {"endpoints": endpoints, "total": total}
+
+
+async def send(client, admin_headers, scenarios, weights, recorder: Recorder, due: float):
+    name = random.choices(scenarios, weights)[0]
+    label = name
+    try:
+        label, response = await SCENARIOS[name](client, admin_headers)
+        status = response.status_code
+    except httpx.HTTPError:
+        status = "error"
+    recorder.record(label, status, (time.perf_counter() - due) * 1000)
+
+
+async def closed_loop(client, admin_headers, scenarios, weights, recorder, args, deadline: float):
+    async def worker():
+        while time.perf_counter() < deadline:
+            await send(client, admin_headers, scenarios, weights, recorder, time.perf_counter())
+
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+
+
+async def open_loop(client, admin_headers, scenarios, weights, recorder, args, deadline: float):
+    # At most --concurrency requests in flight; the rest wait and are
+    # charged for the wait, because latency counts from the due time
+    semaphore = asyncio.Semaphore(args.concurrency)
+    tasks = set()
+
+    async def request(due):
+        async with semaphore:
+            await send(client, admin_headers, scenarios, weights, recorder, due)
+
+    interval = 1 / args.rate
+    due = time.perf_counter()
+    while due < deadline:
+        await asyncio.sleep(max(due - time.perf_counter(), 0))
+        task = asyncio.create_task(request(due))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        due += interval
+    await asyncio.gather(*tasks)
+
+
+async def drive(client, args, admin_password=None) -> dict:
+    """Warm up, then run the mix for --duration seconds and summarise it"""
+    scenarios, weights = parse_mix(args.mix)
+    admin_headers = {}
+    if "admin" in scenarios:
+        if not admin_password:
+            raise SystemExit("admin traffic needs --admin-password against an external server")
+        response = await client.post("/admin/login", json={"username": args.admin_username, "password": admin_password})
+        response.raise_for_status()
+        admin_headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    run = open_loop if args.rate else closed_loop
+    recorder = Recorder()
+    if args.warmup:
+        await run(client, admin_headers, scenarios, weights, recorder, args, time.perf_counter() + args.warmup)
+    recorder.recording = True
+    started = time.perf_counter()
+    await run(client, admin_headers, scenarios, weights, recorder, args, started + args.duration)
+    return recorder.summary(time.perf_counter() - started)
+
+
+# Local stack
+
+def wait_until(check, timeout: float, what: str, process=None):
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        if process is not None and process.poll() is not None:
+            raise SystemExit(f"{what} exited with code {process.returncode}")
+        try:
+            if check():
+                return
+        except Exception:
+            pass
+        time.sleep(0.05)
+    raise SystemExit(f"{what} not ready within {timeout}s")
+
+
+@contextmanager
+def spawned(command, **kwargs):
+    process = subprocess.Popen(command, **kwargs)
+    try:
+        yield process
+    finally:
+        process.terminate()
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+@contextmanager
+def local_mongod(args):
+    """Throwaway mongod on a free port, deleted afterwards; yields its URL"""
+    from pymongo import MongoClient
+
+    if not shutil.which(args.mongod):
+        raise SystemExit(f"{args.mongod} not found; install MongoDB or pass --mongo-url")
+    port = free_port()
+    with tempfile.TemporaryDirectory(prefix="load-mongod-") as dbpath:
+        command = [args.mongod, "--dbpath", dbpath, "--port", str(port), "--bind_ip", "127.0.0.1", "--quiet"]
+        with spawned(command, stdout=subprocess.DEVNULL) as process:
+            url = f"mongodb://127.0.0.1:{port}"
+            with MongoClient(url, serverSelectionTimeoutMS=500) as mongo:
+                wait_until(lambda: mongo.admin.command("ping"), args.timeout, "mongod", process)
+            yield url
+
+
+@contextmanager
+def smtp_sink():
+    """aiosmtpd server that accepts every message; yields (port, received list)"""
+    from aiosmtpd.controller import Controller
+
+    received = []
+
+    class Sink:
+        async def handle_DATA(self, server, session, envelope):
+            received.append(envelope.rcpt_tos)
+            return "250 Message accepted for delivery"
+
+    controller = Controller(Sink(), hostname="127.0.0.1", port=free_port())
+    controller.start()
+    try:
+        yield controller.port, received
+    finally:
+        controller.stop()
+
+
+@contextmanager
+def local_server(args, mongo_url: str, smtp_port: int, admin_password: str):
+    """uvicorn serving server:app against a fresh database; yields its API base URL"""
+    from pymongo import MongoClient
+
+    from auth import pwd_context
+
+    db_name = f"load_test_{uuid.uuid4().hex[:8]}"
+    port = free_port()
+    env = {
+        **os.environ,
+        "MONGO_URL": mongo_url,
+        "DB_NAME": db_name,
+        "SMTP_HOST": "127.0.0.1",
+        "SMTP_PORT": str(smtp_port),
+        "SMTP_USER": "",
+        "SMTP_FROM": "load-test@example.com",
+        "SMTP_USE_TLS": "false",
+        "SMTP_START_TLS": "false",
+        "BUSINESS_EMAIL": "business@example.com",
+        "ADMIN_USERNAME": args.admin_username,
+        "ADMIN_PASSWORD_HASH": pwd_context.hash(admin_password),
+    }
+    command = [
+        sys.executable, "-m", "uvicorn", "server:app",
+        "--port", str(port), "--workers", str(args.workers), "--log-level", "warning",
+    ]
+    base_url = f"http://127.0.0.1:{port}/api"
+    try:
+        with spawned(command, cwd=BACKEND_DIR, env=env) as process:
+            wait_until(lambda: httpx.get(f"{base_url}/", timeout=1).status_code == 200, args.timeout, "uvicorn", process)
+            yield base_url
+    finally:
+        with MongoClient(mongo_url, serverSelectionTimeoutMS=2000) as mongo:
+            mongo.drop_database(db_name)
+
+
+async def run_against(base_url: str, args, admin_password) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.request_timeout, limits=limits) as client:
+        return await drive(client, args, admin_password)
+
+
+def compare(previous: dict, current: dict) -> None:
+    """Print per-endpoint RPS and p99 change against an earlier result file"""
+    print(f"{'endpoint':<30} {'rps':>17} {'p99 ms':>21}", file=sys.stderr)
+    for label, now in sorted(current["endpoints"].items()):
+        before = previous["endpoints"].get(label)
+        if before is None:
+            print(f"{label:<30} {now['rps']:>8} (new)", file=sys.stderr)
+            continue
+        print(f"{label:<30} {before['rps']:>8} -> {now['rps']:<6} {before['p99_ms']:>9} -> {now['p99_ms']:<8}",
+              file=sys.stderr)
+
+
+def main(args):
+    result = {
+        "config": {
+            key: getattr(args, key)
+            for key in ("mix", "duration", "warmup", "concurrency", "rate", "workers")
+        },
+        "started_at": datetime.now(timezone.utc).isoformat(),
+    }
+    if args.base_url:
+        result["target"] = args.base_url
+        result.update(asyncio.run(run_against(args.base_url, args, args.admin_password)))
+    else:
+        admin_password = secrets.token_urlsafe(16)
+        with ExitStack() as stack:
+            mongo_url = args.mongo_url or stack.enter_context(local_mongod(args))
+            smtp_port, received = stack.enter_context(smtp_sink())
+            base_url = stack.enter_context(local_server(args, mongo_url, smtp_port, admin_password))
+            result["target"] = "local"
+            result.update(asyncio.run(run_against(base_url, args, admin_password)))
+            # Give the outbox a moment to drain before counting
+            time.sleep(args.drain)
+            result["emails_delivered"] = len(received)
+
+    output = json.dumps(result, indent=2, sort_keys=True)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    else:
+        print(output)
+    if args.compare:
+        compare(json.loads(Path(args.compare).read_text()), result)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"scenario=weight list (default {DEFAULT_MIX})")
+    parser.add_argument("--duration", type=float, default=20, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=3, help="unmeasured seconds before the run")
+    parser.add_argument("--concurrency", type=int, default=16, help="workers, or max in flight with --rate")
+    parser.add_argument("--rate", type=float, help="fixed arrival rate in requests/second (open loop)")
+    parser.add_argument("--request-timeout", type=float, default=30)
+    parser.add_argument("--output", help="write the JSON result here instead of stdout")
+    parser.add_argument("--compare", help="earlier JSON result to compare against")
+    parser.add_argument("--base-url", help="target a running server instead of starting a local stack")
+    parser.add_argument("--admin-username", default="erishoppe_admin")
+    parser.add_argument("--admin-password", help="admin password of the --base-url server")
+    parser.add_argument("--mongo-url", help="use this MongoDB instead of starting mongod")
+    parser.add_argument("--mongod", default="mongod", help="mongod binary")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--drain", type=float, default=2, help="seconds to wait for queued emails")
+    parser.add_argument("--timeout", type=float, default=60, help="startup timeout per process")
+    main(parser.parse_args())
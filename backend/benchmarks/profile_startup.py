@@ -0,0 +1,94 @@
+"""Startup profile: import-time breakdown and cold start to first request.
+
+Run from the backend directory (MONGO_URL / DB_NAME must point at a
+reachable test database for the cold start measurement):
+
+    python -m benchmarks.profile_startup
+    python -m benchmarks.profile_startup --skip-server --top 15
+"""
+import argparse
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_profile(top: int) -> None:
+    """Run `python -X importtime -c 'import server'` and summarise it"""
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import server"],
+        cwd=BACKEND_DIR, capture_output=True, text=True, env=os.environ.copy(),
+    )
+    wall = time.perf_counter() - started
+    rows = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+    if result.returncode != 0 or not rows:
+        print(result.stderr[-2000:])
+        raise SystemExit("import server failed")
+
+    local = {path.stem for path in BACKEND_DIR.glob("*.py")}
+    server_total = next(cumulative for module, _, cumulative, _ in rows if module == "server")
+    print(f"import server: {server_total / 1000:.0f} ms (process wall time {wall * 1000:.0f} ms)")
+    print("\ntop-level imports by cumulative time")
+    top_level = [row for row in rows if row[3] <= 1]
+    for module, _, cumulative, _ in sorted(top_level, key=lambda row: -row[2])[:top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {module}")
+    print("\napplication modules by self time")
+    for module, self_us, cumulative, _ in sorted((r for r in rows if r[0] in local), key=lambda row: -row[1]):
+        print(f"  {self_us / 1000:8.1f} ms self  {cumulative / 1000:8.1f} ms cumulative  {module}")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def cold_start(timeout: float) -> None:
+    """Spawn uvicorn and time process start to the first successful request"""
+    port = free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=os.environ.copy(),
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if process.poll() is not None:
+                raise SystemExit(f"uvicorn exited with code {process.returncode}")
+            try:
+                response = httpx.get(f"http://127.0.0.1:{port}/api/", timeout=1)
+                if response.status_code == 200:
+                    print(f"\ncold start to first request: {(time.perf_counter() - started) * 1000:.0f} ms")
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.01)
+        raise SystemExit(f"no response within {timeout}s")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--skip-server", action="store_true", help="only profile imports")
+    parser.add_argument("--timeout", type=float, default=60)
+    args = parser.parse_args()
+    import_profile(args.top)
+    if not args.skip_server:
+        cold_start(args.timeout)
@@ -0,0 +1,140 @@
+"""Concurrency stress test for double-booking prevention.
+
+Fires many concurrent POST /api/bookings requests for overlapping car
+windows and then counts overlapping active car bookings in the bookings
+collection itself, so a double-booking that reached MongoDB is caught even
+if no worker's in-memory index knows about it. MONGO_URL / DB_NAME must
+point at the database the server uses.
+
+Against running servers; repeat --base-url to spread the requests over
+several workers sharing one database:
+
+    python -m benchmarks.stress_double_booking --base-url http://localhost:8001/api --base-url http://localhost:8002/api
+
+In-process against the ASGI app (needs a test database):
+
+    python -m benchmarks.stress_double_booking --in-process
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import httpx
+from motor.motor_asyncio import AsyncIOMotorClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from availability import BOOKING_RESOURCES, as_utc  # noqa: E402
+
+
+@asynccontextmanager
+async def clients_for(args):
+    if args.in_process:
+        import server
+        async with server.app.router.lifespan_context(server.app):
+            transport = httpx.ASGITransport(app=server.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://stress/api") as client:
+                yield [client]
+    else:
+        clients = [httpx.AsyncClient(base_url=url, timeout=30) for url in args.base_url]
+        try:
+            yield clients
+        finally:
+            for client in clients:
+                await client.aclose()
+
+
+async def stored_car_bookings(services, start: datetime, end: datetime):
+    """Active bookings of the services in [start, end) as (start, end) pairs, read from MongoDB"""
+    mongo = AsyncIOMotorClient(os.environ['MONGO_URL'], tz_aware=True)
+    try:
+        docs = await mongo[os.environ['DB_NAME']].bookings.find(
+            {
+                "service_type": {"$in": services},
+                "status": {"$ne": "cancelled"},
+                "booking_date": {"$gte": start, "$lt": end},
+            },
+            {"_id": 0, "booking_date": 1, "booking_end_date": 1},
+        ).to_list(None)
+    finally:
+        mongo.close()
+    return sorted(
+        (as_utc(doc["booking_date"]), as_utc(doc.get("booking_end_date") or doc["booking_date"]))
+        for doc in docs
+    )
+
+
+def booking_payload(start: datetime, hours: int, service_type: str) -> dict:
+    return {
+        "name": "Stress Test",
+        "email": "stress@example.com",
+        "phone": "09170000000",
+        "service_type": service_type,
+        "booking_date": start.isoformat(),
+        "duration_hours": hours,
+        "package_type": "stress-test",
+    }
+
+
+async def main(args):
+    rng = random.Random(args.seed)
+    # Far in the future so the run does not collide with real bookings
+    base = datetime(2099, 1, 1, tzinfo=timezone.utc) + timedelta(days=rng.randrange(0, 3000))
+    services = [service for service, resource in BOOKING_RESOURCES.items() if resource == "car"]
+    payloads = [
+        booking_payload(
+            base + timedelta(minutes=30 * rng.randrange(0, args.window_slots)),
+            rng.choice([2, 4, 12, 24]),
+            rng.choice(services),
+        )
+        for _ in range(args.requests)
+    ]
+
+    statuses = Counter()
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async with clients_for(args) as clients:
+        async def submit(number, payload):
+            async with semaphore:
+                response = await clients[number % len(clients)].post("/bookings", json=payload)
+                statuses[response.status_code] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(submit(number, payload) for number, payload in enumerate(payloads)))
+        elapsed = time.perf_counter() - started
+
+        slots = await stored_car_bookings(
+            services, base - timedelta(days=2), base + timedelta(minutes=30 * args.window_slots, hours=24)
+        )
+
+    # Sorted by start: any overlap shows up against the latest end seen so far
+    overlaps, latest_end = 0, None
+    for start, end in slots:
+        if latest_end is not None and start < latest_end:
+            overlaps += 1
+        latest_end = end if latest_end is None else max(latest_end, end)
+    print(f"requests: {args.requests}  concurrency: {args.concurrency}  workers: {len(clients)}  "
+          f"elapsed: {elapsed:.2f}s ({args.requests / elapsed:.0f} req/s)")
+    print(f"responses: {dict(statuses)}")
+    print(f"active car bookings stored in window: {len(slots)}  overlapping: {overlaps}")
+    return 1 if overlaps else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", action="append", help="API base URL of a worker; repeat for several")
+    parser.add_argument("--in-process", action="store_true")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--window-slots", type=int, default=96, help="30-minute start slots to spread requests over")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    args.base_url = args.base_url or ["http://localhost:8001/api"]
+    sys.exit(asyncio.run(main(args)))
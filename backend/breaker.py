@@ -0,0 +1,118 @@
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+STATES = (CLOSED, HALF_OPEN, OPEN)
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling a dependency the breaker considers down"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} circuit is open, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a single half-open probe.
+
+    Closed: calls go through; failure_threshold failures in a row (a call
+    slower than slow_call_seconds counts as one) open the circuit. Open:
+    calls fail immediately with CircuitOpen for reset_timeout seconds.
+    Half-open: one probe call is let through; its success closes the
+    circuit, its failure opens it again for another reset_timeout.
+
+    is_failure decides which exceptions raised inside guard() count as the
+    dependency being unavailable; the others (e.g. a permanent rejection
+    of one request) are re-raised but count as the dependency answering.
+    By default every exception is a failure.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30,
+        slow_call_seconds: Optional[float] = None,
+        on_state_change: Optional[Callable[[str], None]] = None,
+        is_failure: Optional[Callable[[Exception], bool]] = None,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.slow_call_seconds = slow_call_seconds
+        self.on_state_change = on_state_change
+        self.is_failure = is_failure
+        self.state = CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    def retry_after(self) -> float:
+        return max(self._opened_at + self.reset_timeout - time.monotonic(), 0.0)
+
+    def before_call(self) -> None:
+        """Raise CircuitOpen unless a call may go ahead now"""
+        if self.state == OPEN:
+            if self.retry_after() > 0:
+                raise CircuitOpen(self.name, self.retry_after())
+            self._set_state(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            if self._probing:
+                raise CircuitOpen(self.name, self.reset_timeout)
+            self._probing = True
+
+    def record_success(self, duration: float = 0.0) -> None:
+        if self.slow_call_seconds and duration > self.slow_call_seconds:
+            logger.warning(f"{self.name} call took {duration:.1f}s, counting it as a failure")
+            self.record_failure()
+            return
+        self._probing = False
+        self.failures = 0
+        if self.state != CLOSED:
+            self._set_state(CLOSED)
+
+    def record_failure(self) -> None:
+        self._probing = False
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+            if self.state != OPEN:
+                self._set_state(OPEN)
+
+    @asynccontextmanager
+    async def guard(self):
+        """Wrap one call: fail fast while open, record its outcome and duration"""
+        self.before_call()
+        started = time.monotonic()
+        try:
+            yield
+        except Exception as e:
+            if self.is_failure is None or self.is_failure(e):
+                self.record_failure()
+            else:
+                self.record_success(time.monotonic() - started)
+            raise
+        except BaseException:
+            # Cancelled: no verdict on the dependency, the next call may probe
+            self._probing = False
+            raise
+        self.record_success(time.monotonic() - started)
+
+    def _set_state(self, state: str) -> None:
+        if state == OPEN:
+            logger.warning(
+                f"{self.name} circuit opened after {self.failures} consecutive failures, "
+                f"failing fast for {self.reset_timeout:.0f}s"
+            )
+        else:
+            logger.info(f"{self.name} circuit {state}")
+        self.state = state
+        if self.on_state_change:
+            self.on_state_change(state)
@@ -0,0 +1,95 @@
+import base64
+import calendar
+import os
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Iterable, List, Optional
+from zoneinfo import ZoneInfo
+
+from availability import BOOKING_RESOURCES, BookingInterval, BookingIntervalIndex
+
+# Calendar days start at local midnight in the business's timezone
+BUSINESS_TIMEZONE = os.environ.get('BUSINESS_TIMEZONE', 'Asia/Manila')
+CALENDAR_SLOT_MINUTES = int(os.environ.get('CALENDAR_SLOT_MINUTES', 30))
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def _micros(value: datetime) -> int:
+    return (value - _EPOCH) // _MICROSECOND
+
+
+def shared_services(service_type: str) -> List[str]:
+    """Services whose bookings block service_type: those sharing its resource, or itself"""
+    resource = BOOKING_RESOURCES.get(service_type)
+    if resource is None:
+        return [service_type]
+    return [service for service, owner in BOOKING_RESOURCES.items() if owner == resource]
+
+
+def day_starts(year: int, month: int, tz: str = BUSINESS_TIMEZONE) -> List[datetime]:
+    """Local midnight of every day in the month and of the next month's first day, in UTC"""
+    zone = ZoneInfo(tz)
+    first = date(year, month, 1)
+    days = calendar.monthrange(year, month)[1]
+    return [
+        datetime.combine(first + timedelta(days=offset), time(), zone).astimezone(timezone.utc)
+        for offset in range(days + 1)
+    ]
+
+
+def day_bitmaps(intervals: Iterable[BookingInterval], starts: List[datetime], slot_minutes: int) -> List[bytes]:
+    """Occupancy bitmap per day; bit i (most significant first) is set when a booking overlaps slot i.
+
+    Slots are slot_minutes long counted from each local midnight, so every
+    day has 1440 / slot_minutes of them. Each booking marks a range of the
+    month's flattened slot grid in a difference array, and one cumulative
+    sum turns that into the occupancy of every slot at once.
+    """
+    # Imported on first use so server startup does not pay for numpy
+    import numpy as np
+
+    slots_per_day = 1440 // slot_minutes
+    midnights = np.array([_micros(start) for start in starts], dtype=np.int64)
+    # Slot start instants, clipped to the next midnight on days shortened by DST
+    grid = midnights[:-1, None] + np.arange(slots_per_day, dtype=np.int64) * (slot_minutes * 60_000_000)
+    grid = np.minimum(grid, midnights[1:, None]).ravel()
+
+    intervals = list(intervals)
+    delta = np.zeros(grid.size + 1, dtype=np.int32)
+    if intervals:
+        begin = np.array([_micros(entry.start) for entry in intervals], dtype=np.int64)
+        end = np.array([_micros(entry.end) for entry in intervals], dtype=np.int64)
+        # A booking without an end date still occupies the slot of its start instant
+        end = np.maximum(end, begin + 1)
+        first = np.maximum(np.searchsorted(grid, begin, side="right") - 1, 0)
+        last = np.searchsorted(grid, end, side="left")
+        np.add.at(delta, first, 1)
+        np.add.at(delta, last, -1)
+    busy = np.cumsum(delta[:-1]).reshape(len(starts) - 1, slots_per_day) > 0
+    return [row.tobytes() for row in np.packbits(busy, axis=1)]
+
+
+def month_calendar(
+    index: BookingIntervalIndex,
+    year: int,
+    month: int,
+    service_type: Optional[str] = None,
+    slot_minutes: int = CALENDAR_SLOT_MINUTES,
+    tz: str = BUSINESS_TIMEZONE,
+) -> dict:
+    """Base64 day bitmaps for one month, from the in-memory booking index.
+
+    With a service_type only bookings that would conflict with it count;
+    without one every active booking does.
+    """
+    starts = day_starts(year, month, tz)
+    services = shared_services(service_type) if service_type else None
+    intervals = index.overlapping(starts[0], starts[-1], services)
+    return {
+        "month": f"{year:04d}-{month:02d}",
+        "timezone": tz,
+        "slot_minutes": slot_minutes,
+        "service_type": service_type,
+        "days": [base64.b64encode(bitmap).decode() for bitmap in day_bitmaps(intervals, starts, slot_minutes)],
+    }
@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+COUNTERS_ID = "dashboard"
+
+# Attempts at writing a recount before giving up until the next interval
+RECONCILE_ATTEMPTS = 3
+
+# Status counts of one collection; plain $group so any supported MongoDB
+# server can run it (no $unionWith, which needs 4.4)
+COUNT_PIPELINE = [{"$group": {"_id": "$status", "count": {"$sum": 1}}}]
+
+
+def _bucket(groups) -> dict:
+    counts = {group["_id"]: group["count"] for group in groups if group["_id"] is not None}
+    counts["total"] = sum(group["count"] for group in groups)
+    return counts
+
+
+class DashboardCounters:
+    """Admin dashboard totals kept in a single document.
+
+    Writers bump the counters with $inc as bookings and contact forms are
+    created or change status, so reading the stats is one document fetch.
+    reconcile() recounts from the source collections and overwrites the
+    document to repair any drift (e.g. a write that failed after the
+    insert, or data changed outside the API).
+
+    Every $inc also bumps seq, and a recount is only written if seq is
+    unchanged since before counting; otherwise an increment landed in
+    between and the recount is retried, so increments are never lost.
+    """
+
+    def __init__(
+        self,
+        db,
+        reconcile_interval: Optional[float] = None,
+        on_change: Optional[Callable[[], None]] = None,
+    ):
+        self.db = db
+        # Called after every write to the counters document
+        self.on_change = on_change
+        self.collection = db.counters
+        self.reconcile_interval = reconcile_interval or float(os.environ.get('COUNTER_RECONCILE_INTERVAL', 3600))
+        self._task: Optional[asyncio.Task] = None
+
+    async def _inc(self, increments: dict) -> None:
+        await self.collection.update_one({"_id": COUNTERS_ID}, {"$inc": {**increments, "seq": 1}}, upsert=True)
+        if self.on_change:
+            self.on_change()
+
+    async def booking_created(self, status: str, count: int = 1) -> None:
+        await self._inc({"bookings.total": count, f"bookings.{status}": count})
+
+    async def booking_status_changed(self, old_status: str, new_status: str) -> None:
+        if old_status == new_status:
+            return
+        await self._inc({f"bookings.{old_status}": -1, f"bookings.{new_status}": 1})
+
+    async def contact_created(self, status: str) -> None:
+        await self._inc({"contacts.total": 1, f"contacts.{status}": 1})
+
+    async def count(self) -> dict:
+        """Recount both collections, one $group aggregation each, run concurrently"""
+        bookings, contacts = await asyncio.gather(
+            self.db.bookings.aggregate(COUNT_PIPELINE).to_list(None),
+            self.db.contact_forms.aggregate(COUNT_PIPELINE).to_list(None),
+        )
+        return {"bookings": _bucket(bookings), "contacts": _bucket(contacts)}
+
+    async def reconcile(self) -> dict:
+        """Overwrite the counters with fresh counts and return them"""
+        for _ in range(RECONCILE_ATTEMPTS):
+            doc = await self.collection.find_one({"_id": COUNTERS_ID}, {"seq": 1})
+            seq = (doc or {}).get("seq")
+            counts = await self.count()
+            unchanged = {"_id": COUNTERS_ID, "seq": seq} if seq is not None else {"_id": COUNTERS_ID, "seq": {"$exists": False}}
+            try:
+                result = await self.collection.update_one(
+                    unchanged,
+                    {"$set": {**counts, "reconciled_at": datetime.now(timezone.utc)}},
+                    upsert=True,
+                )
+            except DuplicateKeyError:
+                # The document was created by an $inc while counting
+                continue
+            if result.matched_count or result.upserted_id is not None:
+                if self.on_change:
+                    self.on_change()
+                return counts
+        logger.warning("Counters kept changing during reconciliation; keeping the incremented values")
+        return counts
+
+    async def read(self) -> dict:
+        """Current counters, computing them on first use"""
+        doc = await self.collection.find_one({"_id": COUNTERS_ID})
+        if doc is None or "bookings" not in doc or "contacts" not in doc:
+            return await self.reconcile()
+        return doc
+
+    async def start(self) -> None:
+        """Reconcile now and then every reconcile_interval seconds"""
+        self._task = asyncio.create_task(self._reconcile_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _reconcile_loop(self) -> None:
+        while True:
+            try:
+                before = await self.collection.find_one({"_id": COUNTERS_ID}) or {}
+                after = await self.reconcile()
+                for kind in ("bookings", "contacts"):
+                    drift = {
+                        key: after[kind].get(key, 0) - value
+                        for key, value in before.get(kind, {}).items()
+                        if after[kind].get(key, 0) != value
+                    }
+                    if drift:
+                        logger.warning(f"Corrected {kind} counter drift: {drift}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Counter reconciliation failed: {str(e)}")
+            await asyncio.sleep(self.reconcile_interval)
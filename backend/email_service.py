@@ -1,14 +1,147 @@
 import aiosmtplib
+import asyncio
+from contextlib import asynccontextmanager
 from email.message import EmailMessage
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import os
-from datetime import datetime
+import time
+from typing import List, Optional, Tuple
 import logging
+from breaker import STATES, CircuitBreaker, CircuitOpen
+from email_templates import (
+    render_booking_batch_notification,
+    render_business_digest,
+    render_booking_confirmation,
+    render_booking_notification,
+    render_contact_notification,
+)
+from metrics import email_circuit_state, email_send_duration
 
 logger = logging.getLogger(__name__)
 
 
+
+class SMTPConnectionPool:
+    """Small pool of authenticated SMTP sessions reused across messages.
+
+    Each connection pays for the TCP connect, TLS handshake and AUTH once.
+    Idle connections are probed with NOOP before reuse, and connections
+    that fail the probe or exceed their lifetime are replaced.
+    """
+
+    def __init__(
+        self,
+        hostname: str,
+        port: int,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        use_tls: bool = True,
+        start_tls: Optional[bool] = None,
+        size: int = 2,
+        max_idle_seconds: float = 30,
+        max_lifetime_seconds: float = 600,
+        timeout: float = 30,
+    ):
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.start_tls = start_tls
+        self.size = size
+        self.max_idle_seconds = max_idle_seconds
+        self.max_lifetime_seconds = max_lifetime_seconds
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(size)
+        # (connection, opened_at, last_used_at)
+        self._idle: List[Tuple[aiosmtplib.SMTP, float, float]] = []
+
+    @asynccontextmanager
+    async def connection(self):
+        """Check out (connection, reused) where reused means it was taken from
+        the idle list; broken connections are not returned"""
+        async with self._semaphore:
+            smtp, opened_at, reused = await self._checkout()
+            try:
+                yield smtp, reused
+            except BaseException:
+                await self._discard(smtp)
+                raise
+            else:
+                self._idle.append((smtp, opened_at, time.monotonic()))
+
+    async def close(self) -> None:
+        """Close every idle connection"""
+        idle, self._idle = self._idle, []
+        for smtp, _, _ in idle:
+            await self._discard(smtp)
+
+    async def _checkout(self) -> Tuple[aiosmtplib.SMTP, float, bool]:
+        now = time.monotonic()
+        while self._idle:
+            smtp, opened_at, last_used_at = self._idle.pop()
+            if not smtp.is_connected or now - opened_at > self.max_lifetime_seconds:
+                await self._discard(smtp)
+                continue
+            if now - last_used_at > self.max_idle_seconds:
+                try:
+                    await smtp.noop()
+                except Exception:
+                    await self._discard(smtp)
+                    continue
+            return smtp, opened_at, True
+        return await self._connect(), now, False
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        smtp = aiosmtplib.SMTP(
+            hostname=self.hostname,
+            port=self.port,
+            use_tls=self.use_tls,
+            start_tls=self.start_tls,
+            timeout=self.timeout,
+        )
+        await smtp.connect()
+        if self.username:
+            await smtp.login(self.username, self.password)
+        return smtp
+
+    async def _discard(self, smtp: aiosmtplib.SMTP) -> None:
+        try:
+            if smtp.is_connected:
+                await smtp.quit()
+        except Exception:
+            smtp.close()
+
+
+def _report_circuit_state(state: str) -> None:
+    for name in STATES:
+        email_circuit_state.set(1 if name == state else 0, name)
+
+
+def _env_flag(name: str, default: Optional[bool]) -> Optional[bool]:
+    value = os.environ.get(name)
+    if value is None or value == '':
+        return default
+    return value.lower() in ('1', 'true', 'yes', 'on')
+
+
+def _smtp_unavailable(error: Exception) -> bool:
+    """Whether a send error means the SMTP server is unreachable or temporarily refusing.
+
+    Connection, timeout and disconnect errors (all OSErrors) and 4xx
+    replies count against the circuit breaker; a permanent 5xx rejection
+    of one message (bad recipient, sender or content) does not.
+    """
+    if isinstance(error, OSError):
+        return True
+    if isinstance(error, aiosmtplib.SMTPRecipientsRefused):
+        return any(refused.code < 500 for refused in error.recipients)
+    if isinstance(error, aiosmtplib.SMTPResponseException):
+        return error.code < 500
+    return False
+
+
 class EmailService:
     def __init__(self):
         self.smtp_host = os.environ.get('SMTP_HOST', 'smtp.gmail.com')
@@ -16,332 +149,128 @@ class EmailService:
         self.smtp_user = os.environ.get('SMTP_USER')
         self.smtp_password = os.environ.get('SMTP_PASSWORD')
         self.business_email = os.environ.get('BUSINESS_EMAIL')
+        self.from_email = os.environ.get('SMTP_FROM') or self.smtp_user
+        self.pool = SMTPConnectionPool(
+            hostname=self.smtp_host,
+            port=self.smtp_port,
+            username=self.smtp_user,
+            password=self.smtp_password,
+            use_tls=_env_flag('SMTP_USE_TLS', True),
+            start_tls=_env_flag('SMTP_START_TLS', None),
+            size=int(os.environ.get('SMTP_POOL_SIZE', 2)),
+            max_idle_seconds=float(os.environ.get('SMTP_POOL_MAX_IDLE', 30)),
+            timeout=float(os.environ.get('SMTP_TIMEOUT', 30)),
+        )
+        # Stops waiting out connect/TLS timeouts while the SMTP server is down
+        self.breaker = CircuitBreaker(
+            "SMTP",
+            failure_threshold=int(os.environ.get('SMTP_BREAKER_THRESHOLD', 5)),
+            reset_timeout=float(os.environ.get('SMTP_BREAKER_RESET_SECONDS', 30)),
+            slow_call_seconds=float(os.environ.get('SMTP_SLOW_CALL_SECONDS', 10)),
+            on_state_change=_report_circuit_state,
+            is_failure=_smtp_unavailable,
+        )
+        _report_circuit_state(self.breaker.state)
+
+    def _build_message(self, to_email: str, subject: str, html_content: str, text_content: str = None):
+        message = MIMEMultipart('alternative')
+        message['From'] = self.from_email
+        message['To'] = to_email
+        message['Subject'] = subject
+
+        # Add text and HTML parts
+        if text_content:
+            part1 = MIMEText(text_content, 'plain')
+            message.attach(part1)
+
+        part2 = MIMEText(html_content, 'html')
+        message.attach(part2)
+        return message
 
     async def send_email(self, to_email: str, subject: str, html_content: str, text_content: str = None):
-        """Send email using Gmail SMTP"""
+        """Send email over a pooled SMTP connection"""
+        started = time.perf_counter()
         try:
-            message = MIMEMultipart('alternative')
-            message['From'] = self.smtp_user
-            message['To'] = to_email
-            message['Subject'] = subject
-
-            # Add text and HTML parts
-            if text_content:
-                part1 = MIMEText(text_content, 'plain')
-                message.attach(part1)
-            
-            part2 = MIMEText(html_content, 'html')
-            message.attach(part2)
-
-            # Send email
-            await aiosmtplib.send(
-                message,
-                hostname=self.smtp_host,
-                port=self.smtp_port,
-                username=self.smtp_user,
-                password=self.smtp_password,
-                use_tls=True
-            )
-            
+            message = self._build_message(to_email, subject, html_content, text_content)
+            await self._send_message(message)
+            email_send_duration.observe(time.perf_counter() - started, "send_email", "ok")
             logger.info(f"Email sent successfully to {to_email}")
             return True
+        except CircuitOpen:
+            email_send_duration.observe(time.perf_counter() - started, "send_email", "circuit_open")
+            raise
         except Exception as e:
+            email_send_duration.observe(time.perf_counter() - started, "send_email", "error")
             logger.error(f"Failed to send email to {to_email}: {str(e)}")
             raise
 
+    async def _send_message(self, message: MIMEMultipart):
+        """Send a message on a pooled session.
+
+        A session reused from the idle list that the server has dropped is
+        discarded and the send moves to the next one (or a fresh connection);
+        a failed fresh connect is raised straight away. Raises CircuitOpen
+        without touching the network while the breaker is open.
+        """
+        async with self.breaker.guard():
+            while True:
+                reused = False
+                try:
+                    async with self.pool.connection() as (smtp, reused):
+                        await smtp.send_message(message)
+                    return
+                except aiosmtplib.SMTPServerDisconnected:
+                    if not reused:
+                        raise
+                    logger.warning("Pooled SMTP connection went stale, reconnecting")
+
+    async def close(self):
+        """Close pooled SMTP connections"""
+        await self.pool.close()
+
     async def send_booking_confirmation_to_customer(self, booking_data: dict):
         """Send booking confirmation email to customer"""
-        customer_email = booking_data['email']
-        customer_name = booking_data['name']
-        
-        subject = "Booking Confirmation - Eri's Shoppe"
-        
-        # Format booking date
-        booking_date = booking_data['booking_date']
-        if isinstance(booking_date, str):
-            booking_date = datetime.fromisoformat(booking_date.replace('Z', '+00:00'))
-        formatted_date = booking_date.strftime("%B %d, %Y at %I:%M %p")
-        
-        # Determine service details
-        service_name = self._get_service_name(booking_data['service_type'])
-        duration_text = self._get_duration_text(booking_data)
-        
-        html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                .header {{ background-color: #0f172a; color: white; padding: 20px; text-align: center; border-radius: 8px 8px 0 0; }}
-                .content {{ background-color: #f8f9fa; padding: 30px; border-radius: 0 0 8px 8px; }}
-                .booking-details {{ background-color: white; padding: 20px; border-radius: 8px; margin: 20px 0; }}
-                .detail-row {{ display: flex; padding: 10px 0; border-bottom: 1px solid #e2e8f0; }}
-                .detail-label {{ font-weight: bold; width: 150px; color: #64748b; }}
-                .detail-value {{ flex: 1; }}
-                .footer {{ text-align: center; margin-top: 30px; color: #64748b; font-size: 14px; }}
-                .button {{ background-color: #0f172a; color: white; padding: 12px 30px; text-decoration: none; border-radius: 6px; display: inline-block; margin-top: 20px; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>Booking Confirmed!</h1>
-                </div>
-                <div class="content">
-                    <p>Dear {customer_name},</p>
-                    <p>Thank you for choosing Eri's Shoppe! Your booking has been confirmed.</p>
-                    
-                    <div class="booking-details">
-                        <h2 style="margin-top: 0; color: #0f172a;">Booking Details</h2>
-                        <div class="detail-row">
-                            <div class="detail-label">Service:</div>
-                            <div class="detail-value">{service_name}</div>
-                        </div>
-                        <div class="detail-row">
-                            <div class="detail-label">Date & Time:</div>
-                            <div class="detail-value">{formatted_date}</div>
-                        </div>
-                        {f'''
-                        <div class="detail-row">
-                            <div class="detail-label">Duration:</div>
-                            <div class="detail-value">{duration_text}</div>
-                        </div>
-                        ''' if duration_text else ''}
-                        {f'''
-                        <div class="detail-row">
-                            <div class="detail-label">Pickup Location:</div>
-                            <div class="detail-value">{booking_data.get('pickup_location', 'N/A')}</div>
-                        </div>
-                        ''' if booking_data.get('pickup_location') else ''}
-                        {f'''
-                        <div class="detail-row">
-                            <div class="detail-label">Drop-off Location:</div>
-                            <div class="detail-value">{booking_data.get('dropoff_location', 'N/A')}</div>
-                        </div>
-                        ''' if booking_data.get('dropoff_location') else ''}
-                        <div class="detail-row">
-                            <div class="detail-label">Contact Phone:</div>
-                            <div class="detail-value">{booking_data['phone']}</div>
-                        </div>
-                    </div>
-                    
-                    <p>We will contact you shortly to confirm the final details.</p>
-                    <p>If you have any questions, feel free to reach out:</p>
-                    <ul>
-                        <li>Phone/WhatsApp: 0909 967 4035</li>
-                        <li>Email: rensengamboa@gmail.com</li>
-                    </ul>
-                    
-                    <div class="footer">
-                        <p><strong>Eri's Shoppe</strong><br>
-                        Luzonwide Coverage<br>
-                        Your Trusted Partner for All Services</p>
-                    </div>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        
-        text_content = f"""
-        Booking Confirmation - Eri's Shoppe
-        
-        Dear {customer_name},
-        
-        Thank you for choosing Eri's Shoppe! Your booking has been confirmed.
-        
-        Booking Details:
-        Service: {service_name}
-        Date & Time: {formatted_date}
-        {f"Duration: {duration_text}" if duration_text else ""}
-        {f"Pickup Location: {booking_data.get('pickup_location')}" if booking_data.get('pickup_location') else ""}
-        {f"Drop-off Location: {booking_data.get('dropoff_location')}" if booking_data.get('dropoff_location') else ""}
-        Contact Phone: {booking_data['phone']}
-        
-        We will contact you shortly to confirm the final details.
-        
-        Contact us:
-        Phone/WhatsApp: 0909 967 4035
-        Email: rensengamboa@gmail.com
-        
-        Eri's Shoppe - Your Trusted Partner for All Services
-        """
-        
-        await self.send_email(customer_email, subject, html_content, text_content)
+        email = render_booking_confirmation(booking_data)
+        await self.send_email(booking_data['email'], email.subject, email.html, email.text)
 
     async def send_booking_notification_to_business(self, booking_data: dict):
         """Send new booking notification to business owner"""
-        subject = f"New Booking Received - {self._get_service_name(booking_data['service_type'])}"
-        
-        # Format booking date
-        booking_date = booking_data['booking_date']
-        if isinstance(booking_date, str):
-            booking_date = datetime.fromisoformat(booking_date.replace('Z', '+00:00'))
-        formatted_date = booking_date.strftime("%B %d, %Y at %I:%M %p")
-        
-        duration_text = self._get_duration_text(booking_data)
-        
-        html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                .header {{ background-color: #16a34a; color: white; padding: 20px; text-align: center; border-radius: 8px 8px 0 0; }}
-                .content {{ background-color: #f8f9fa; padding: 30px; border-radius: 0 0 8px 8px; }}
-                .booking-details {{ background-color: white; padding: 20px; border-radius: 8px; margin: 20px 0; }}
-                .detail-row {{ padding: 10px 0; border-bottom: 1px solid #e2e8f0; }}
-                .detail-label {{ font-weight: bold; color: #64748b; }}
-                .detail-value {{ margin-top: 5px; }}
-                .urgent {{ background-color: #fef3c7; padding: 15px; border-left: 4px solid #f59e0b; border-radius: 4px; margin: 20px 0; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>🎉 New Booking Received!</h1>
-                </div>
-                <div class="content">
-                    <div class="urgent">
-                        <strong>Action Required:</strong> Please contact the customer to confirm the booking.
-                    </div>
-                    
-                    <div class="booking-details">
-                        <h2 style="margin-top: 0; color: #0f172a;">Customer Information</h2>
-                        <div class="detail-row">
-                            <div class="detail-label">Name:</div>
-                            <div class="detail-value">{booking_data['name']}</div>
-                        </div>
-                        <div class="detail-row">
-                            <div class="detail-label">Email:</div>
-                            <div class="detail-value">{booking_data['email']}</div>
-                        </div>
-                        <div class="detail-row">
-                            <div class="detail-label">Phone:</div>
-                            <div class="detail-value">{booking_data['phone']}</div>
-                        </div>
-                        
-                        <h2 style="margin-top: 30px; color: #0f172a;">Booking Details</h2>
-                        <div class="detail-row">
-                            <div class="detail-label">Service:</div>
-                            <div class="detail-value">{self._get_service_name(booking_data['service_type'])}</div>
-                        </div>
-                        <div class="detail-row">
-                            <div class="detail-label">Date & Time:</div>
-                            <div class="detail-value">{formatted_date}</div>
-                        </div>
-                        {f'''
-                        <div class="detail-row">
-                            <div class="detail-label">Duration:</div>
-                            <div class="detail-value">{duration_text}</div>
-                        </div>
-                        ''' if duration_text else ''}
-                        {f'''
-                        <div class="detail-row">
-                            <div class="detail-label">Package:</div>
-                            <div class="detail-value">{booking_data.get('package_type', 'N/A').replace('-', ' ').title()}</div>
-                        </div>
-                        ''' if booking_data.get('package_type') else ''}
-                        {f'''
-                        <div class="detail-row">
-                            <div class="detail-label">Pickup Location:</div>
-                            <div class="detail-value">{booking_data.get('pickup_location')}</div>
-                        </div>
-                        ''' if booking_data.get('pickup_location') else ''}
-                        {f'''
-                        <div class="detail-row">
-                            <div class="detail-label">Drop-off Location:</div>
-                            <div class="detail-value">{booking_data.get('dropoff_location')}</div>
-                        </div>
-                        ''' if booking_data.get('dropoff_location') else ''}
-                        {f'''
-                        <div class="detail-row">
-                            <div class="detail-label">Message:</div>
-                            <div class="detail-value">{booking_data.get('message')}</div>
-                        </div>
-                        ''' if booking_data.get('message') else ''}
-                    </div>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        
-        await self.send_email(self.business_email, subject, html_content)
+        email = render_booking_notification(booking_data)
+        await self.send_email(self.business_email, email.subject, email.html, email.text)
+
+    async def send_booking_batch_notification_to_business(self, batch_data: dict):
+        """Send one notification covering a batch of new bookings to business owner"""
+        email = render_booking_batch_notification(batch_data['bookings'])
+        await self.send_email(self.business_email, email.subject, email.html, email.text)
 
     async def send_contact_form_notification(self, contact_data: dict):
         """Send contact form submission notification to business owner"""
-        subject = f"New Contact Form Submission - {contact_data['service']}"
-        
-        html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                .header {{ background-color: #0f172a; color: white; padding: 20px; text-align: center; }}
-                .content {{ background-color: #f8f9fa; padding: 30px; }}
-                .detail-row {{ padding: 10px 0; border-bottom: 1px solid #e2e8f0; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>New Contact Form Submission</h1>
-                </div>
-                <div class="content">
-                    <div class="detail-row">
-                        <strong>Name:</strong> {contact_data['name']}
-                    </div>
-                    <div class="detail-row">
-                        <strong>Email:</strong> {contact_data['email']}
-                    </div>
-                    <div class="detail-row">
-                        <strong>Phone:</strong> {contact_data.get('phone', 'N/A')}
-                    </div>
-                    <div class="detail-row">
-                        <strong>Service:</strong> {contact_data['service']}
-                    </div>
-                    {f'''
-                    <div class="detail-row">
-                        <strong>Message:</strong><br>{contact_data.get('message')}
-                    </div>
-                    ''' if contact_data.get('message') else ''}
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        
-        await self.send_email(self.business_email, subject, html_content)
-
-    def _get_service_name(self, service_type: str) -> str:
-        """Get friendly service name"""
-        service_names = {
-            'car-with-driver': 'Car Service - With Driver',
-            'car-self-drive': 'Car Service - Self Drive',
-            'computer': 'Computer Services',
-            'consulting': 'Freelancing & Consulting'
-        }
-        return service_names.get(service_type, service_type)
-
-    def _get_duration_text(self, booking_data: dict) -> str:
-        """Get duration text"""
-        if booking_data.get('duration_hours'):
-            hours = booking_data['duration_hours']
-            if hours == 24:
-                return "Full Day (24 hours)"
-            elif hours == 12:
-                return "Half Day (12 hours)"
-            elif hours <= 4:
-                return f"{hours} hour(s)"
+        email = render_contact_notification(contact_data)
+        await self.send_email(self.business_email, email.subject, email.html, email.text)
+
+    async def send_business_digest(self, notifications: List[Tuple[str, dict]]):
+        """Send one email to business owner covering several queued notifications"""
+        bookings, contacts = [], []
+        for kind, payload in notifications:
+            if kind == 'booking_notification':
+                bookings.append(payload)
+            elif kind == 'booking_batch_notification':
+                bookings.extend(payload['bookings'])
+            elif kind == 'contact_notification':
+                contacts.append(payload)
             else:
-                return f"{hours} hours"
-        return ""
+                raise ValueError(f"Cannot include '{kind}' in a business digest")
+        email = render_business_digest(bookings, contacts)
+        await self.send_email(self.business_email, email.subject, email.html, email.text)
 
 
 # Create singleton instance
-email_service = EmailService()
+_email_service: Optional[EmailService] = None
+
+
+def get_email_service() -> EmailService:
+    """Shared EmailService, created on first use rather than at import"""
+    global _email_service
+    if _email_service is None:
+        _email_service = EmailService()
+    return _email_service
@@ -0,0 +1,521 @@
+from datetime import datetime
+from string import Formatter
+from textwrap import dedent
+from typing import List, NamedTuple, Tuple
+
+# Friendly service names, shared by every template
+SERVICE_NAMES = {
+    'car-with-driver': 'Car Service - With Driver',
+    'car-self-drive': 'Car Service - Self Drive',
+    'computer': 'Computer Services',
+    'consulting': 'Freelancing & Consulting'
+}
+
+BUSINESS_PHONE = "0909 967 4035"
+BUSINESS_CONTACT_EMAIL = "rensengamboa@gmail.com"
+
+# English month names regardless of the process locale; index 0 is unused
+MONTH_NAMES = (
+    "", "January", "February", "March", "April", "May", "June",
+    "July", "August", "September", "October", "November", "December",
+)
+TWO_DIGITS = tuple(f"{number:02d}" for number in range(60))
+CLOCK_HOURS = tuple(f"{(hour - 1) % 12 + 1:02d}:" for hour in range(24))
+MERIDIEMS = tuple(" AM" if hour < 12 else " PM" for hour in range(24))
+
+
+class RenderedEmail(NamedTuple):
+    subject: str
+    html: str
+    text: str
+
+
+# Markup of one labelled detail row split around its value, plus its
+# plain-text prefix: (before, after, label). A plain tuple, indexed like
+# the template parts, keeps rendering free of attribute lookups.
+Row = Tuple[str, str, str]
+
+
+def _compile(source: str, **fragments: str) -> str:
+    """Dedent a template source and inline its static fragments.
+
+    The result is a str.format-style source whose only remaining slots are
+    the per-email fields; braces inside the inlined fragments (CSS) are
+    escaped so they are emitted literally.
+    """
+    compiled = dedent(source).strip()
+    for name, fragment in fragments.items():
+        compiled = compiled.replace(f"[[{name}]]", fragment.replace("{", "{{").replace("}", "}}"))
+    return compiled
+
+
+def _parts(source: str, *slots: str) -> Tuple[str, ...]:
+    """Literal text around the {slots} of a compiled source, which must appear in this order.
+
+    Rendering then only concatenates these literals with the per-email
+    values, with no parsing or brace handling per email.
+    """
+    literals, names = [], []
+    pending = ""
+    for literal, slot, _, _ in Formatter().parse(source):
+        pending += literal
+        if slot is not None:
+            literals.append(pending)
+            names.append(slot)
+            pending = ""
+    if tuple(names) != slots:
+        raise ValueError(f"Template slots {names} do not match {list(slots)}")
+    literals.append(pending)
+    return tuple(literals)
+
+
+def _row(markup: str, label: str) -> Row:
+    before, after = markup.format(label=label, value="\0").split("\0")
+    return before, after + "\n", f"{label}: "
+
+
+def _escape(value: str) -> str:
+    """html.escape(value, quote=False); most values have nothing to escape"""
+    if "&" in value or "<" in value or ">" in value:
+        return value.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+    return value
+
+
+# Static fragments
+BASE_CSS = dedent("""
+    body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
+    .container { max-width: 600px; margin: 0 auto; padding: 20px; }
+    .booking-details { background-color: white; padding: 20px; border-radius: 8px; margin: 20px 0; }
+""").strip()
+
+CUSTOMER_CSS = BASE_CSS + dedent("""
+    .header { background-color: #0f172a; color: white; padding: 20px; text-align: center; border-radius: 8px 8px 0 0; }
+    .content { background-color: #f8f9fa; padding: 30px; border-radius: 0 0 8px 8px; }
+    .detail-row { display: flex; padding: 10px 0; border-bottom: 1px solid #e2e8f0; }
+    .detail-label { font-weight: bold; width: 150px; color: #64748b; }
+    .detail-value { flex: 1; }
+    .footer { text-align: center; margin-top: 30px; color: #64748b; font-size: 14px; }
+    .button { background-color: #0f172a; color: white; padding: 12px 30px; text-decoration: none; border-radius: 6px; display: inline-block; margin-top: 20px; }
+""").rstrip()
+
+BUSINESS_CSS = BASE_CSS + dedent("""
+    .header { background-color: #16a34a; color: white; padding: 20px; text-align: center; border-radius: 8px 8px 0 0; }
+    .content { background-color: #f8f9fa; padding: 30px; border-radius: 0 0 8px 8px; }
+    .detail-row { padding: 10px 0; border-bottom: 1px solid #e2e8f0; }
+    .detail-label { font-weight: bold; color: #64748b; }
+    .detail-value { margin-top: 5px; }
+    .urgent { background-color: #fef3c7; padding: 15px; border-left: 4px solid #f59e0b; border-radius: 4px; margin: 20px 0; }
+""").rstrip()
+
+CONTACT_CSS = dedent("""
+    body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
+    .container { max-width: 600px; margin: 0 auto; padding: 20px; }
+    .header { background-color: #0f172a; color: white; padding: 20px; text-align: center; }
+    .content { background-color: #f8f9fa; padding: 30px; }
+    .detail-row { padding: 10px 0; border-bottom: 1px solid #e2e8f0; }
+""").strip()
+
+
+def _document(css: str, body: str, **fragments: str) -> str:
+    """Wrap a body in the shared HTML skeleton with its stylesheet inlined"""
+    return _compile("""
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <style>
+        [[css]]
+            </style>
+        </head>
+        <body>
+            <div class="container">
+        [[body]]
+            </div>
+        </body>
+        </html>
+    """, css=css).replace("[[body]]", _compile(body, **fragments))
+
+
+FOOTER = _compile("""
+    <p>We will contact you shortly to confirm the final details.</p>
+    <p>If you have any questions, feel free to reach out:</p>
+    <ul>
+        <li>Phone/WhatsApp: [[phone]]</li>
+        <li>Email: [[email]]</li>
+    </ul>
+
+    <div class="footer">
+        <p><strong>Eri's Shoppe</strong><br>
+        Luzonwide Coverage<br>
+        Your Trusted Partner for All Services</p>
+    </div>
+""", phone=BUSINESS_PHONE, email=BUSINESS_CONTACT_EMAIL)
+
+DETAIL_ROW = _compile("""
+    <div class="detail-row">
+        <div class="detail-label">{label}:</div>
+        <div class="detail-value">{value}</div>
+    </div>
+""")
+
+CONTACT_ROW = '<div class="detail-row"><strong>{label}:</strong> {value}</div>'
+
+SERVICE_ROW = _row(DETAIL_ROW, "Service")
+DATE_ROW = _row(DETAIL_ROW, "Date & Time")
+DURATION_ROW = _row(DETAIL_ROW, "Duration")
+PACKAGE_ROW = _row(DETAIL_ROW, "Package")
+PICKUP_ROW = _row(DETAIL_ROW, "Pickup Location")
+DROPOFF_ROW = _row(DETAIL_ROW, "Drop-off Location")
+MESSAGE_ROW = _row(DETAIL_ROW, "Message")
+CONTACT_PHONE_ROW = _row(DETAIL_ROW, "Contact Phone")
+NAME_ROW = _row(DETAIL_ROW, "Name")
+EMAIL_ROW = _row(DETAIL_ROW, "Email")
+PHONE_ROW = _row(DETAIL_ROW, "Phone")
+
+CONTACT_FORM_ROWS = {
+    key: _row(CONTACT_ROW, label)
+    for key, label in (("name", "Name"), ("email", "Email"), ("phone", "Phone"), ("service", "Service"), ("message", "Message"))
+}
+
+# Precompiled templates: the literal text around each slot, in slot order
+CONFIRMATION_HTML = _parts(_document(CUSTOMER_CSS, """
+    <div class="header">
+        <h1>Booking Confirmed!</h1>
+    </div>
+    <div class="content">
+        <p>Dear {name},</p>
+        <p>Thank you for choosing Eri's Shoppe! Your booking has been confirmed.</p>
+
+        <div class="booking-details">
+            <h2 style="margin-top: 0; color: #0f172a;">Booking Details</h2>
+    {rows}
+        </div>
+
+    [[footer]]
+    </div>
+""", footer=FOOTER), "name", "rows")
+
+CONFIRMATION_TEXT = _parts(_compile("""
+    Booking Confirmation - Eri's Shoppe
+
+    Dear {name},
+
+    Thank you for choosing Eri's Shoppe! Your booking has been confirmed.
+
+    Booking Details:
+    {rows}
+    We will contact you shortly to confirm the final details.
+
+    Contact us:
+    Phone/WhatsApp: [[phone]]
+    Email: [[email]]
+
+    Eri's Shoppe - Your Trusted Partner for All Services
+""", phone=BUSINESS_PHONE, email=BUSINESS_CONTACT_EMAIL), "name", "rows")
+
+NOTIFICATION_HTML = _parts(_document(BUSINESS_CSS, """
+    <div class="header">
+        <h1>🎉 New Booking Received!</h1>
+    </div>
+    <div class="content">
+        <div class="urgent">
+            <strong>Action Required:</strong> Please contact the customer to confirm the booking.
+        </div>
+
+        <div class="booking-details">
+            <h2 style="margin-top: 0; color: #0f172a;">Customer Information</h2>
+    {customer_rows}
+            <h2 style="margin-top: 30px; color: #0f172a;">Booking Details</h2>
+    {rows}
+        </div>
+    </div>
+"""), "customer_rows", "rows")
+
+NOTIFICATION_TEXT = _parts(_compile("""
+    New Booking Received - Action Required
+
+    Customer Information:
+    {customer_rows}
+    Booking Details:
+    {rows}
+"""), "customer_rows", "rows")
+
+CONTACT_HTML = _parts(_document(CONTACT_CSS, """
+    <div class="header">
+        <h1>New Contact Form Submission</h1>
+    </div>
+    <div class="content">
+    {rows}
+    </div>
+"""), "rows")
+
+CONTACT_TEXT = _parts(_compile("""
+    New Contact Form Submission
+
+    {rows}
+"""), "rows")
+
+# One booking or contact form inside a batch notification or digest
+ITEM_HTML = _parts(_compile("""
+    <div class="booking-details">
+        <h2 style="margin-top: 0; color: #0f172a;">{name}</h2>
+    {rows}
+    </div>
+"""), "name", "rows")
+
+ITEM_TEXT = _parts(_compile("""
+    {name}
+    {rows}
+"""), "name", "rows")
+
+BATCH_HTML = _parts(_document(BUSINESS_CSS, """
+    <div class="header">
+        <h1>{count} New Bookings Received</h1>
+    </div>
+    <div class="content">
+        <div class="urgent">
+            <strong>Action Required:</strong> Please contact each customer to confirm their booking.
+        </div>
+    {items}
+    </div>
+"""), "count", "items")
+
+BATCH_TEXT = _parts(_compile("""
+    {count} New Bookings Received - Action Required
+
+    {items}
+"""), "count", "items")
+
+DIGEST_HTML = _parts(_document(BUSINESS_CSS, """
+    <div class="header">
+        <h1>{title}</h1>
+    </div>
+    <div class="content">
+    {bookings}
+    {contacts}
+    </div>
+"""), "title", "bookings", "contacts")
+
+DIGEST_TEXT = _parts(_compile("""
+    {title}
+
+    {bookings}
+    {contacts}
+"""), "title", "bookings", "contacts")
+
+
+def get_service_name(service_type: str) -> str:
+    """Get friendly service name"""
+    return SERVICE_NAMES.get(service_type, service_type)
+
+
+def get_duration_text(booking_data: dict) -> str:
+    """Get duration text"""
+    hours = booking_data.get('duration_hours')
+    if not hours:
+        return ""
+    if hours == 24:
+        return "Full Day (24 hours)"
+    if hours == 12:
+        return "Half Day (12 hours)"
+    if hours <= 4:
+        return f"{hours} hour(s)"
+    return f"{hours} hours"
+
+
+def format_booking_date(booking_date) -> str:
+    """Format a booking date that may still be an ISO string"""
+    if isinstance(booking_date, str):
+        booking_date = datetime.fromisoformat(booking_date.replace('Z', '+00:00'))
+    # strftime("%B %d, %Y at %I:%M %p") in the C locale, from lookup tables
+    hour = booking_date.hour
+    return (
+        f"{MONTH_NAMES[booking_date.month]} {TWO_DIGITS[booking_date.day]}, {booking_date.year} at "
+        f"{CLOCK_HOURS[hour]}{TWO_DIGITS[booking_date.minute]}{MERIDIEMS[hour]}"
+    )
+
+
+def _booking_rows(booking_data: dict, service_name: str) -> Tuple[str, str]:
+    """Service through message rows shared by the business notification and batch items"""
+    formatted_date = format_booking_date(booking_data['booking_date'])
+    duration = get_duration_text(booking_data)
+    package_type = booking_data.get('package_type')
+    package = package_type.replace('-', ' ').title() if package_type else None
+    pickup = booking_data.get('pickup_location')
+    dropoff = booking_data.get('dropoff_location')
+    message = booking_data.get('message')
+    html = (
+        f"{SERVICE_ROW[0]}{_escape(service_name)}{SERVICE_ROW[1]}"
+        f"{DATE_ROW[0]}{formatted_date}{DATE_ROW[1]}"
+        + (f"{DURATION_ROW[0]}{duration}{DURATION_ROW[1]}" if duration else "")
+        + (f"{PACKAGE_ROW[0]}{_escape(package)}{PACKAGE_ROW[1]}" if package else "")
+        + (f"{PICKUP_ROW[0]}{_escape(pickup)}{PICKUP_ROW[1]}" if pickup else "")
+        + (f"{DROPOFF_ROW[0]}{_escape(dropoff)}{DROPOFF_ROW[1]}" if dropoff else "")
+        + (f"{MESSAGE_ROW[0]}{_escape(message)}{MESSAGE_ROW[1]}" if message else "")
+    )
+    text = (
+        f"{SERVICE_ROW[2]}{service_name}\n{DATE_ROW[2]}{formatted_date}\n"
+        + (f"{DURATION_ROW[2]}{duration}\n" if duration else "")
+        + (f"{PACKAGE_ROW[2]}{package}\n" if package else "")
+        + (f"{PICKUP_ROW[2]}{pickup}\n" if pickup else "")
+        + (f"{DROPOFF_ROW[2]}{dropoff}\n" if dropoff else "")
+        + (f"{MESSAGE_ROW[2]}{message}\n" if message else "")
+    )
+    return html, text
+
+
+def render_booking_confirmation(booking_data: dict) -> RenderedEmail:
+    """Render the customer booking confirmation"""
+    name = booking_data['name']
+    phone = booking_data['phone']
+    service_name = get_service_name(booking_data['service_type'])
+    formatted_date = format_booking_date(booking_data['booking_date'])
+    duration = get_duration_text(booking_data)
+    pickup = booking_data.get('pickup_location')
+    dropoff = booking_data.get('dropoff_location')
+    rows_html = (
+        f"{SERVICE_ROW[0]}{_escape(service_name)}{SERVICE_ROW[1]}"
+        f"{DATE_ROW[0]}{formatted_date}{DATE_ROW[1]}"
+        + (f"{DURATION_ROW[0]}{duration}{DURATION_ROW[1]}" if duration else "")
+        + (f"{PICKUP_ROW[0]}{_escape(pickup)}{PICKUP_ROW[1]}" if pickup else "")
+        + (f"{DROPOFF_ROW[0]}{_escape(dropoff)}{DROPOFF_ROW[1]}" if dropoff else "")
+        + f"{CONTACT_PHONE_ROW[0]}{_escape(phone)}{CONTACT_PHONE_ROW[1]}"
+    )
+    rows_text = (
+        f"{SERVICE_ROW[2]}{service_name}\n{DATE_ROW[2]}{formatted_date}\n"
+        + (f"{DURATION_ROW[2]}{duration}\n" if duration else "")
+        + (f"{PICKUP_ROW[2]}{pickup}\n" if pickup else "")
+        + (f"{DROPOFF_ROW[2]}{dropoff}\n" if dropoff else "")
+        + f"{CONTACT_PHONE_ROW[2]}{phone}\n"
+    )
+    html, text = CONFIRMATION_HTML, CONFIRMATION_TEXT
+    return RenderedEmail(
+        "Booking Confirmation - Eri's Shoppe",
+        f"{html[0]}{_escape(name)}{html[1]}{rows_html}{html[2]}",
+        f"{text[0]}{name}{text[1]}{rows_text}{text[2]}",
+    )
+
+
+def _customer_rows(booking_data: dict) -> Tuple[str, str]:
+    name, email, phone = booking_data['name'], booking_data['email'], booking_data['phone']
+    html = (
+        f"{NAME_ROW[0]}{_escape(name)}{NAME_ROW[1]}"
+        f"{EMAIL_ROW[0]}{_escape(email)}{EMAIL_ROW[1]}"
+        f"{PHONE_ROW[0]}{_escape(phone)}{PHONE_ROW[1]}"
+    )
+    text = f"{NAME_ROW[2]}{name}\n{EMAIL_ROW[2]}{email}\n{PHONE_ROW[2]}{phone}\n"
+    return html, text
+
+
+def render_booking_notification(booking_data: dict) -> RenderedEmail:
+    """Render the new booking notification for the business owner"""
+    service_name = get_service_name(booking_data['service_type'])
+    customer_html, customer_text = _customer_rows(booking_data)
+    rows_html, rows_text = _booking_rows(booking_data, service_name)
+    html, text = NOTIFICATION_HTML, NOTIFICATION_TEXT
+    return RenderedEmail(
+        f"New Booking Received - {service_name}",
+        f"{html[0]}{customer_html}{html[1]}{rows_html}{html[2]}",
+        f"{text[0]}{customer_text}{text[1]}{rows_text}{text[2]}",
+    )
+
+
+def _booking_item(booking_data: dict) -> Tuple[str, str]:
+    """One booking inside a batch notification or digest"""
+    name, email, phone = booking_data['name'], booking_data['email'], booking_data['phone']
+    rows_html, rows_text = _booking_rows(booking_data, get_service_name(booking_data['service_type']))
+    html = (
+        f"{ITEM_HTML[0]}{_escape(name)}{ITEM_HTML[1]}"
+        f"{EMAIL_ROW[0]}{_escape(email)}{EMAIL_ROW[1]}"
+        f"{PHONE_ROW[0]}{_escape(phone)}{PHONE_ROW[1]}"
+        f"{rows_html}{ITEM_HTML[2]}"
+    )
+    text = f"{ITEM_TEXT[0]}{name}{ITEM_TEXT[1]}{EMAIL_ROW[2]}{email}\n{PHONE_ROW[2]}{phone}\n{rows_text}{ITEM_TEXT[2]}"
+    return html, text
+
+
+def _contact_item(contact_data: dict) -> Tuple[str, str]:
+    """One contact form inside a digest"""
+    name, email, service = contact_data['name'], contact_data['email'], contact_data['service']
+    phone, message = contact_data.get('phone'), contact_data.get('message')
+    html = (
+        f"{ITEM_HTML[0]}{_escape(name)}{ITEM_HTML[1]}"
+        f"{EMAIL_ROW[0]}{_escape(email)}{EMAIL_ROW[1]}"
+        + (f"{PHONE_ROW[0]}{_escape(phone)}{PHONE_ROW[1]}" if phone else "")
+        + f"{SERVICE_ROW[0]}{_escape(service)}{SERVICE_ROW[1]}"
+        + (f"{MESSAGE_ROW[0]}{_escape(message)}{MESSAGE_ROW[1]}" if message else "")
+        + ITEM_HTML[2]
+    )
+    text = (
+        f"{ITEM_TEXT[0]}{name}{ITEM_TEXT[1]}{EMAIL_ROW[2]}{email}\n"
+        + (f"{PHONE_ROW[2]}{phone}\n" if phone else "")
+        + f"{SERVICE_ROW[2]}{service}\n"
+        + (f"{MESSAGE_ROW[2]}{message}\n" if message else "")
+        + ITEM_TEXT[2]
+    )
+    return html, text
+
+
+def render_booking_batch_notification(bookings: List[dict]) -> RenderedEmail:
+    """Render one business notification summarising a batch of bookings"""
+    items = [_booking_item(booking) for booking in bookings]
+    count = str(len(bookings))
+    items_html = "".join(html for html, _ in items)
+    items_text = "\n".join(text for _, text in items)
+    return RenderedEmail(
+        f"{count} New Bookings Received",
+        f"{BATCH_HTML[0]}{count}{BATCH_HTML[1]}{items_html}{BATCH_HTML[2]}",
+        f"{BATCH_TEXT[0]}{count}{BATCH_TEXT[1]}{items_text}{BATCH_TEXT[2]}",
+    )
+
+
+def _plural(count: int, noun: str) -> str:
+    return f"{count} {noun}" if count == 1 else f"{count} {noun}s"
+
+
+def _digest_section(heading: str, rendered: List[Tuple[str, str]]) -> Tuple[str, str]:
+    if not rendered:
+        return "", ""
+    html = f"<h2>{heading}</h2>" + "".join(html for html, _ in rendered)
+    text = f"{heading}\n\n" + "\n".join(text for _, text in rendered) + "\n"
+    return html, text
+
+
+def render_business_digest(bookings: List[dict], contacts: List[dict]) -> RenderedEmail:
+    """Render one business email listing the bookings and contact forms of a digest window"""
+    bookings_html, bookings_text = _digest_section(
+        f"New Bookings ({len(bookings)})", [_booking_item(booking) for booking in bookings]
+    )
+    contacts_html, contacts_text = _digest_section(
+        f"Contact Form Submissions ({len(contacts)})", [_contact_item(contact) for contact in contacts]
+    )
+    title = " and ".join(
+        part for part in (
+            _plural(len(bookings), "New Booking") if bookings else "",
+            _plural(len(contacts), "Contact Form") if contacts else "",
+        ) if part
+    )
+    html, text = DIGEST_HTML, DIGEST_TEXT
+    return RenderedEmail(
+        f"Digest: {title}",
+        f"{html[0]}{_escape(title)}{html[1]}{bookings_html}{html[2]}{contacts_html}{html[3]}",
+        f"{text[0]}{title}{text[1]}{bookings_text}{text[2]}{contacts_text}{text[3]}",
+    )
+
+
+def render_contact_notification(contact_data: dict) -> RenderedEmail:
+    """Render the contact form notification for the business owner"""
+    values = {
+        "name": contact_data['name'],
+        "email": contact_data['email'],
+        "phone": contact_data.get('phone') or 'N/A',
+        "service": contact_data['service'],
+        "message": contact_data.get('message'),
+    }
+    rows = [(CONTACT_FORM_ROWS[key], value) for key, value in values.items() if value or key != "message"]
+    rows_html = "".join(f"{row[0]}{_escape(value)}{row[1]}" for row, value in rows)
+    rows_text = "".join(f"{row[2]}{value}\n" for row, value in rows)
+    return RenderedEmail(
+        f"New Contact Form Submission - {contact_data['service']}",
+        f"{CONTACT_HTML[0]}{rows_html}{CONTACT_HTML[1]}",
+        f"{CONTACT_TEXT[0]}{rows_text}{CONTACT_TEXT[1]}",
+    )
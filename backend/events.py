@@ -0,0 +1,163 @@
+import asyncio
+import json
+import logging
+from typing import AsyncIterator, Optional, Set
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from pagination import _json_default
+
+logger = logging.getLogger(__name__)
+
+# Event names pushed to the admin dashboard
+BOOKING_CREATED = "booking_created"
+BOOKING_STATUS_CHANGED = "booking_status_changed"
+CONTACT_SUBMITTED = "contact_submitted"
+# Sent to a subscriber that fell behind; it should reload its lists
+RESYNC = "resync"
+
+# Only inserts and status updates of the two admin collections are pushed
+CHANGE_PIPELINE = [
+    {"$match": {
+        "ns.coll": {"$in": ["bookings", "contact_forms"]},
+        "$or": [
+            {"operationType": "insert"},
+            {"operationType": "update", "updateDescription.updatedFields.status": {"$exists": True}},
+        ],
+    }},
+]
+
+
+def format_sse(event: dict) -> bytes:
+    """Encode an event as one Server-Sent Events message"""
+    data = json.dumps(event["data"], default=_json_default, separators=(",", ":"))
+    return f"event: {event['type']}\ndata: {data}\n\n".encode()
+
+
+class EventBroker:
+    """Fan-out of admin events to connected dashboards.
+
+    Events come from a MongoDB change stream when the deployment supports
+    one (replica set), which also picks up writes made by other processes.
+    On a standalone server the stream cannot be opened and the request
+    handlers' publish_local() calls are delivered instead; while the
+    stream runs those calls are ignored so nothing is pushed twice.
+
+    close(), or setting the stop event passed to subscribe(), ends open
+    subscriber streams so the server can finish its responses.
+    """
+
+    def __init__(self, queue_size: int = 100, keepalive_seconds: float = 15):
+        self.queue_size = queue_size
+        self.keepalive_seconds = keepalive_seconds
+        self.change_stream_active = False
+        self.closed = False
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def publish(self, event_type: str, data: dict) -> None:
+        event = {"type": event_type, "data": data}
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Drop the backlog and tell the slow client to reload instead
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait({"type": RESYNC, "data": {}})
+
+    def close(self) -> None:
+        """End all subscriber streams and refuse new ones"""
+        self.closed = True
+        for queue in list(self._subscribers):
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(None)
+
+    def publish_local(self, event_type: str, data: dict) -> None:
+        """Publish from a request handler unless the change stream delivers it"""
+        if not self.change_stream_active:
+            self.publish(event_type, data)
+
+    async def subscribe(self, stop: Optional[asyncio.Event] = None) -> AsyncIterator[bytes]:
+        """SSE byte stream for one client, with keep-alive comments.
+
+        The stream ends when the broker is closed or, if given, once stop is set.
+        """
+        queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        self._subscribers.add(queue)
+        stopping = asyncio.ensure_future(stop.wait()) if stop is not None else None
+        try:
+            yield b"retry: 3000\n\n"
+            while not self.closed:
+                getting = asyncio.ensure_future(queue.get())
+                waiting = {getting, stopping} if stopping is not None else {getting}
+                done, _ = await asyncio.wait(waiting, timeout=self.keepalive_seconds, return_when=asyncio.FIRST_COMPLETED)
+                if getting not in done:
+                    getting.cancel()
+                    if stopping in done:
+                        return
+                    yield b": keep-alive\n\n"
+                    continue
+                event = getting.result()
+                if event is None:
+                    return
+                yield format_sse(event)
+        finally:
+            if stopping is not None:
+                stopping.cancel()
+            self._subscribers.discard(queue)
+
+    async def start(self, db) -> None:
+        self.closed = False
+        self._task = asyncio.create_task(self._watch(db))
+
+    async def stop(self) -> None:
+        self.close()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self.change_stream_active = False
+
+    async def _watch(self, db) -> None:
+        resume_token = None
+        while True:
+            try:
+                async with db.watch(
+                    CHANGE_PIPELINE, full_document="updateLookup", resume_after=resume_token
+                ) as stream:
+                    if not self.change_stream_active:
+                        logger.info("Admin events: streaming from MongoDB change stream")
+                    self.change_stream_active = True
+                    async for change in stream:
+                        resume_token = stream.resume_token
+                        self._publish_change(change)
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                if not self.change_stream_active:
+                    # Standalone server: change streams are not available at all
+                    logger.info(f"Admin events: change streams unavailable, using in-process events ({e.code})")
+                    return
+                logger.warning(f"Admin events: change stream failed, resuming: {str(e)}")
+                self.change_stream_active = False
+                resume_token = None
+                self.publish(RESYNC, {})
+            except PyMongoError as e:
+                logger.warning(f"Admin events: change stream interrupted, resuming: {str(e)}")
+                self.change_stream_active = False
+            except Exception as e:
+                logger.error(f"Admin events: change stream error, using in-process events: {str(e)}")
+                self.change_stream_active = False
+                return
+            await asyncio.sleep(1)
+
+    def _publish_change(self, change: dict) -> None:
+        collection = change["ns"]["coll"]
+        document = dict(change.get("fullDocument") or {})
+        document.pop("_id", None)
+        if change["operationType"] == "insert":
+            self.publish(BOOKING_CREATED if collection == "bookings" else CONTACT_SUBMITTED, document)
+        elif collection == "bookings" and document:
+            self.publish(BOOKING_STATUS_CHANGED, {"id": document["id"], "status": document["status"]})
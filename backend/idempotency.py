@@ -0,0 +1,159 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Tuple
+
+from fastapi import HTTPException
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+PROCESSING = "processing"
+COMPLETED = "completed"
+
+
+def request_fingerprint(body: dict) -> str:
+    """Digest of a request body, to catch a key reused for a different request"""
+    canonical = json.dumps(body, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class IdempotencyStore:
+    """Idempotency-Key handling for POST routes.
+
+    The first request with a key claims it by inserting a "processing"
+    record into the idempotency_keys collection (_id is scope:key), runs
+    the handler and stores the response body on the record. Replays are
+    answered from an in-process LRU or from that record. Duplicates that
+    arrive while the first request runs in this process wait for its
+    result; if it runs in another process they get 409 and should retry.
+    Records expire through a TTL index on expires_at.
+
+    A "processing" claim is a lease: it holds until locked_until, after
+    which a retry may take the key over (the first request's process
+    died). Only the holder of the current lease token may complete or
+    release the record.
+    """
+
+    def __init__(self, db, ttl_seconds: float = None, cache_size: int = None):
+        self.collection = db.idempotency_keys
+        self.ttl = timedelta(seconds=ttl_seconds or float(os.environ.get('IDEMPOTENCY_TTL_SECONDS', 86400)))
+        self.lease = timedelta(seconds=float(os.environ.get('IDEMPOTENCY_LEASE_SECONDS', 30)))
+        self.cache_size = cache_size or int(os.environ.get('IDEMPOTENCY_CACHE_SIZE', 1024))
+        # record id -> (fingerprint, response body, expires_at)
+        self._cache: "OrderedDict[str, Tuple[str, dict, datetime]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def run(self, scope: str, key: str, body: dict, execute: Callable[[], Awaitable[dict]]) -> Tuple[dict, bool]:
+        """Run execute() once per key; returns (response body, replayed)"""
+        record_id = f"{scope}:{key}"
+        fingerprint = request_fingerprint(body)
+
+        cached = self._cache_get(record_id)
+        if cached is not None:
+            return self._replay(cached[0], fingerprint, cached[1]), True
+
+        inflight = self._inflight.get(record_id)
+        if inflight is not None:
+            stored_fingerprint, response = await asyncio.shield(inflight)
+            return self._replay(stored_fingerprint, fingerprint, response), True
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[record_id] = future
+        try:
+            result = await self._claim_and_execute(record_id, fingerprint, execute)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Nobody else may be waiting; don't log "exception never retrieved"
+            future.exception()
+            raise
+        else:
+            future.set_result((fingerprint, result[0]))
+            return result
+        finally:
+            del self._inflight[record_id]
+
+    async def _claim_and_execute(self, record_id: str, fingerprint: str, execute) -> Tuple[dict, bool]:
+        now = datetime.now(timezone.utc)
+        lease = uuid.uuid4().hex
+        claim = {
+            "fingerprint": fingerprint,
+            "state": PROCESSING,
+            "lease": lease,
+            "locked_until": now + self.lease,
+            "created_at": now,
+            "expires_at": now + self.ttl,
+        }
+        try:
+            await self.collection.insert_one({"_id": record_id, **claim})
+        except DuplicateKeyError:
+            record = await self.collection.find_one({"_id": record_id})
+            if record is not None and record["state"] == COMPLETED:
+                self._cache_put(record_id, record["fingerprint"], record["response"], record["expires_at"])
+                return self._replay(record["fingerprint"], fingerprint, record["response"]), True
+            # Take over a claim whose lease ran out (records without one count as expired)
+            taken = await self.collection.find_one_and_update(
+                {"_id": record_id, "state": PROCESSING, "locked_until": {"$not": {"$gt": now}}},
+                {"$set": claim},
+            )
+            if taken is None:
+                raise HTTPException(
+                    status_code=409,
+                    detail="A request with this Idempotency-Key is still being processed",
+                    headers={"Retry-After": "1"},
+                )
+            logger.warning(f"Took over expired idempotency claim {record_id}")
+
+        try:
+            response = await execute()
+        except BaseException:
+            # Failed requests are not recorded, so the client can retry them
+            await asyncio.shield(self.collection.delete_one({"_id": record_id, "lease": lease}))
+            raise
+
+        try:
+            result = await self.collection.update_one(
+                {"_id": record_id, "lease": lease},
+                {
+                    "$set": {"state": COMPLETED, "response": response, "completed_at": datetime.now(timezone.utc)},
+                    "$unset": {"lease": "", "locked_until": ""},
+                },
+            )
+            if not result.matched_count:
+                logger.warning(f"Idempotency claim {record_id} was taken over before the request finished")
+        except Exception as e:
+            # The request succeeded; a lost record only weakens later replays
+            logger.error(f"Failed to store idempotent response for {record_id}: {str(e)}")
+        self._cache_put(record_id, fingerprint, response, now + self.ttl)
+        return response, False
+
+    def _replay(self, stored_fingerprint: str, fingerprint: str, response: dict) -> dict:
+        if stored_fingerprint != fingerprint:
+            raise HTTPException(
+                status_code=422, detail="Idempotency-Key was already used with a different request body"
+            )
+        return response
+
+    def _cache_get(self, record_id: str):
+        entry = self._cache.get(record_id)
+        if entry is None:
+            return None
+        if entry[2] <= datetime.now(timezone.utc):
+            del self._cache[record_id]
+            return None
+        self._cache.move_to_end(record_id)
+        return entry
+
+    def _cache_put(self, record_id: str, fingerprint: str, response: dict, expires_at: datetime) -> None:
+        self._cache[record_id] = (fingerprint, response, expires_at)
+        self._cache.move_to_end(record_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
@@ -0,0 +1,162 @@
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from pymongo import ASCENDING, DESCENDING, TEXT
+from pymongo.errors import OperationFailure
+
+from outbox import PENDING, SENDING
+from pagination import KEYSET_SORT
+from rollups import ROLLUP_COLLECTION, STATUS_CHECK_RETENTION_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class IndexSpec(NamedTuple):
+    collection: str
+    keys: List[Tuple[str, object]]
+    name: str
+    unique: bool = False
+    # TTL index: documents are removed this many seconds after the indexed date
+    expire_after_seconds: Optional[int] = None
+
+
+class HotQuery(NamedTuple):
+    collection: str
+    filter: dict
+    sort: Optional[List[Tuple[str, int]]] = None
+
+
+# Free-text search over the admin lists ($text allows one text index per collection)
+SEARCH_FIELDS = [("name", TEXT), ("email", TEXT), ("phone", TEXT), ("message", TEXT)]
+
+# Every index the application relies on. Names are fixed so re-running
+# ensure_indexes() is a no-op once they exist; a changed TTL is applied
+# to the existing index.
+INDEXES = [
+    IndexSpec("bookings", [("id", ASCENDING)], "bookings_id", unique=True),
+    IndexSpec("bookings", [("status", ASCENDING), ("booking_date", ASCENDING)], "bookings_status_date"),
+    IndexSpec("bookings", [("booking_date", ASCENDING)], "bookings_date"),
+    IndexSpec("bookings", KEYSET_SORT, "bookings_created"),
+    # Equality filter first, then the keyset sort, for filtered admin pages
+    IndexSpec("bookings", [("status", ASCENDING)] + KEYSET_SORT, "bookings_status_created"),
+    IndexSpec("bookings", [("service_type", ASCENDING)] + KEYSET_SORT, "bookings_service_created"),
+    IndexSpec("bookings", SEARCH_FIELDS, "bookings_search"),
+    # Anchored email / phone searches (server.search_filter)
+    IndexSpec("bookings", [("email", ASCENDING)], "bookings_email"),
+    IndexSpec("bookings", [("phone", ASCENDING)], "bookings_phone"),
+    IndexSpec("contact_forms", [("id", ASCENDING)], "contact_forms_id", unique=True),
+    IndexSpec("contact_forms", [("status", ASCENDING)] + KEYSET_SORT, "contact_forms_status_created"),
+    IndexSpec("contact_forms", [("service", ASCENDING)] + KEYSET_SORT, "contact_forms_service_created"),
+    IndexSpec("contact_forms", KEYSET_SORT, "contact_forms_created"),
+    IndexSpec("contact_forms", SEARCH_FIELDS, "contact_forms_search"),
+    IndexSpec("contact_forms", [("email", ASCENDING)], "contact_forms_email"),
+    IndexSpec("contact_forms", [("phone", ASCENDING)], "contact_forms_phone"),
+    # Newest-first listing and retention of raw status checks
+    IndexSpec(
+        "status_checks", [("timestamp", DESCENDING)], "status_checks_timestamp",
+        expire_after_seconds=STATUS_CHECK_RETENTION_SECONDS,
+    ),
+    IndexSpec(ROLLUP_COLLECTION, [("hour", DESCENDING)], "status_check_rollups_hour"),
+    IndexSpec(ROLLUP_COLLECTION, [("client_name", ASCENDING), ("hour", DESCENDING)], "status_check_rollups_client_hour"),
+    IndexSpec("email_outbox", [("status", ASCENDING), ("next_attempt_at", ASCENDING)], "outbox_claim"),
+    IndexSpec("idempotency_keys", [("expires_at", ASCENDING)], "idempotency_keys_expiry", expire_after_seconds=0),
+]
+
+# Queries issued on request paths; each must be answerable from an index
+HOT_QUERIES = [
+    HotQuery("bookings", {"id": ""}),
+    HotQuery("bookings", {"status": {"$ne": "cancelled"}}),
+    HotQuery("bookings", {"status": "pending"}),
+    HotQuery("bookings", {}, KEYSET_SORT),
+    HotQuery("bookings", {"status": "pending"}, KEYSET_SORT),
+    HotQuery("bookings", {"service_type": "computer"}, KEYSET_SORT),
+    HotQuery("bookings", {"$text": {"$search": '"name"'}}, KEYSET_SORT),
+    HotQuery("bookings", {"email": {"$regex": "^name@", "$options": "i"}}, KEYSET_SORT),
+    HotQuery("bookings", {"phone": {"$regex": "^0[\\s().-]*9"}}, KEYSET_SORT),
+    HotQuery("bookings", {"booking_date": {"$gte": datetime(2000, 1, 1, tzinfo=timezone.utc)}}, KEYSET_SORT),
+    # Post-write overlap verification (availability.stored_overlap_query)
+    HotQuery("bookings", {
+        "service_type": {"$in": ["car-with-driver", "car-self-drive"]},
+        "status": {"$ne": "cancelled"},
+        "booking_date": {"$gte": datetime(2000, 1, 1, tzinfo=timezone.utc), "$lt": datetime(2000, 1, 2, tzinfo=timezone.utc)},
+    }),
+    HotQuery("contact_forms", {"status": "new"}),
+    HotQuery("contact_forms", {}, KEYSET_SORT),
+    HotQuery("contact_forms", {"status": "new"}, KEYSET_SORT),
+    HotQuery("contact_forms", {"$text": {"$search": '"name"'}}, KEYSET_SORT),
+    HotQuery("contact_forms", {"email": {"$regex": "^name@", "$options": "i"}}, KEYSET_SORT),
+    HotQuery("contact_forms", {"phone": {"$regex": "^0[\\s().-]*9"}}, KEYSET_SORT),
+    HotQuery("status_checks", {}, [("timestamp", DESCENDING)]),
+    HotQuery("status_checks", {"timestamp": {"$gte": datetime(2000, 1, 1, tzinfo=timezone.utc)}}, [("timestamp", DESCENDING)]),
+    HotQuery(ROLLUP_COLLECTION, {}, [("hour", DESCENDING)]),
+    HotQuery(ROLLUP_COLLECTION, {"client_name": ""}, [("hour", DESCENDING)]),
+    HotQuery("email_outbox", {"status": {"$in": [PENDING, SENDING]}}),
+]
+
+
+async def ensure_indexes(db, specs: Iterable[IndexSpec] = INDEXES) -> None:
+    """Create any missing indexes; existing ones are left untouched except for their TTL"""
+    for spec in specs:
+        options = {}
+        if spec.expire_after_seconds is not None:
+            options["expireAfterSeconds"] = spec.expire_after_seconds
+        try:
+            await db[spec.collection].create_index(spec.keys, name=spec.name, unique=spec.unique, **options)
+        except OperationFailure as e:
+            # IndexOptionsConflict: the index exists without this TTL (e.g. the
+            # retention setting changed), which collMod can change in place
+            if e.code != 85 or spec.expire_after_seconds is None:
+                raise
+            await db.command({
+                "collMod": spec.collection,
+                "index": {"name": spec.name, "expireAfterSeconds": spec.expire_after_seconds},
+            })
+            logger.info(f"Set TTL of {spec.collection}.{spec.name} to {spec.expire_after_seconds}s")
+    logger.info(f"Ensured {len(INDEXES)} indexes")
+
+
+def _plan_stages(plan: Dict[str, Any]) -> Iterable[str]:
+    """All stage names in an explain() plan tree"""
+    if "stage" in plan:
+        yield plan["stage"]
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            yield from _plan_stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from _plan_stages(child)
+
+
+async def check_query_plans(db, queries: Iterable[HotQuery] = HOT_QUERIES, strict: Optional[bool] = None) -> List[HotQuery]:
+    """Explain every hot query and report the ones that scan a whole collection.
+
+    Collection scans are logged as errors; with INDEX_CHECK_STRICT=true they
+    raise instead, so a deployment with missing indexes fails at startup.
+    In strict mode a query that cannot be explained raises as well.
+    """
+    if strict is None:
+        strict = os.environ.get('INDEX_CHECK_STRICT', 'false').lower() in ('1', 'true', 'yes')
+    scans = []
+    for query in queries:
+        cursor = db[query.collection].find(query.filter)
+        if query.sort:
+            cursor = cursor.sort(query.sort)
+        if not hasattr(cursor, "explain"):
+            # In-memory test doubles such as mongomock have no query planner
+            logger.warning(f"Skipping query plan check: {type(cursor).__name__} cannot explain queries")
+            return scans
+        try:
+            plan = await cursor.explain()
+        except Exception as e:
+            if strict:
+                raise
+            logger.error(f"Could not explain query on {query.collection}: {str(e)}")
+            continue
+        winning = plan.get("queryPlanner", {}).get("winningPlan", {})
+        if "COLLSCAN" in set(_plan_stages(winning)):
+            scans.append(query)
+            logger.error(f"Query on {query.collection} {query.filter} sort={query.sort} is a COLLSCAN")
+    if scans and strict:
+        raise RuntimeError(f"{len(scans)} hot queries fall back to COLLSCAN")
+    return scans
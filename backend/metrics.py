@@ -0,0 +1,192 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from pymongo import monitoring
+
+# Seconds; covers cache hits (sub-millisecond) up to slow SMTP sends
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Metric:
+    """Labelled metric in the Prometheus text exposition format.
+
+    Values are updated from the event loop and from the threads Motor runs
+    pymongo in (command listeners), so updates take a lock.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], object] = {}
+        REGISTRY.append(self)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in sorted(self._values.items())]
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        return "\n".join(lines + self._samples())
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labelvalues: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, *labelvalues: str) -> None:
+        with self._lock:
+            self._values[labelvalues] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        with self._lock:
+            series = self._values.get(labelvalues)
+            if series is None:
+                # [per-bucket counts..., +Inf count], sum
+                series = self._values[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def _samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                bucket_labels = _labels(self.labelnames, key, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {total!r}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+REGISTRY: List[Metric] = []
+
+
+def render() -> str:
+    """Every registered metric in the Prometheus text format"""
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+http_requests = Counter(
+    "http_requests_total", "HTTP requests by route template and status", ("method", "route", "status")
+)
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "HTTP request latency until the response body was sent", ("method", "route")
+)
+mongo_command_duration = Histogram(
+    "mongodb_command_duration_seconds", "MongoDB command latency as reported by the driver", ("collection", "command")
+)
+mongo_command_failures = Counter(
+    "mongodb_command_failures_total", "MongoDB commands that returned an error", ("collection", "command")
+)
+email_send_duration = Histogram(
+    "email_send_duration_seconds", "SMTP send latency including connection checkout", ("operation", "result")
+)
+email_circuit_state = Gauge(
+    "email_circuit_state", "SMTP circuit breaker state, 1 for the current state", ("state",)
+)
+token_verify_duration = Histogram(
+    "auth_token_verify_duration_seconds", "Admin JWT verification latency, cached or decoded"
+)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency and status per route template.
+
+    The route is read from the scope after routing, so /api/bookings/{id}
+    is one series rather than one per booking; requests that matched no
+    route share the "unmatched" label. Routes in untimed_routes, such as
+    long-lived event streams, are counted but kept out of the latency
+    histogram.
+    """
+
+    def __init__(self, app, untimed_routes: Iterable[str] = ()):
+        self.app = app
+        self.untimed_routes = frozenset(untimed_routes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            method = scope["method"]
+            if path not in self.untimed_routes:
+                http_request_duration.observe(time.perf_counter() - started, method, path)
+            http_requests.inc(method, path, str(status))
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """pymongo command listener timing each command per collection and command name"""
+
+    def __init__(self):
+        self._pending: Dict[Tuple[object, int], Tuple[str, str]] = {}
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        target = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            target = event.command.get("collection")
+        collection = target if isinstance(target, str) else "-"
+        self._pending[(event.connection_id, event.request_id)] = (collection, event.command_name)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        labels = self._pending.pop((event.connection_id, event.request_id), ("-", event.command_name))
+        mongo_command_duration.observe(event.duration_micros / 1e6, *labels)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        labels = self._pending.pop((event.connection_id, event.request_id), ("-", event.command_name))
+        mongo_command_duration.observe(event.duration_micros / 1e6, *labels)
+        mongo_command_failures.inc(*labels)
@@ -0,0 +1,90 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Callable, Dict, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from availability import as_utc
+
+logger = logging.getLogger(__name__)
+
+# Date fields that older releases stored as ISO strings
+STRING_DATE_FIELDS: Dict[str, Tuple[str, ...]] = {
+    "bookings": ("booking_date", "booking_end_date", "created_at"),
+    "contact_forms": ("created_at",),
+    "status_checks": ("timestamp",),
+}
+
+MIGRATION_ID = "string_dates_to_bson"
+
+
+async def migrate_string_dates(
+    db, batch_size: int = None, pause: float = None, on_batch: Optional[Callable[[str], None]] = None
+) -> int:
+    """Convert ISO string dates into native BSON dates, one batch at a time.
+
+    Collections are walked in _id order and the last converted _id is
+    checkpointed in the migrations collection after every batch, so an
+    interrupted run resumes where it stopped. Each update only applies if
+    the field still holds the string it read, so concurrent writes win.
+    on_batch(collection name) is called after each batch that changed
+    documents. Returns the number of documents converted.
+    """
+    batch_size = batch_size or int(os.environ.get('MIGRATION_BATCH_SIZE', 500))
+    pause = pause if pause is not None else float(os.environ.get('MIGRATION_BATCH_PAUSE', 0.05))
+
+    state = await db.migrations.find_one({"_id": MIGRATION_ID}) or {}
+    if state.get("done"):
+        return 0
+    checkpoints = state.get("checkpoints", {})
+    converted = 0
+
+    for name, fields in STRING_DATE_FIELDS.items():
+        collection = db[name]
+        query = {"$or": [{field: {"$type": "string"}} for field in fields]}
+        projection = {field: 1 for field in fields}
+        while True:
+            batch_query = query
+            if name in checkpoints:
+                batch_query = {"$and": [query, {"_id": {"$gt": checkpoints[name]}}]}
+            docs = await collection.find(batch_query, projection).sort("_id", 1).limit(batch_size).to_list(batch_size)
+            if not docs:
+                break
+
+            updates = []
+            for doc in docs:
+                values = {}
+                for field in fields:
+                    value = doc.get(field)
+                    if not isinstance(value, str):
+                        continue
+                    try:
+                        values[field] = as_utc(value)
+                    except ValueError:
+                        logger.warning(f"Skipping unparseable {name}.{field} on {doc['_id']}: {value!r}")
+                if values:
+                    guard = {field: doc[field] for field in values}
+                    updates.append(UpdateOne({"_id": doc["_id"], **guard}, {"$set": values}))
+            if updates:
+                result = await collection.bulk_write(updates, ordered=False)
+                converted += result.modified_count
+                if on_batch and result.modified_count:
+                    on_batch(name)
+
+            checkpoints[name] = docs[-1]["_id"]
+            await db.migrations.update_one(
+                {"_id": MIGRATION_ID},
+                {"$set": {"checkpoints": checkpoints, "updated_at": datetime.now(timezone.utc)}},
+                upsert=True,
+            )
+            await asyncio.sleep(pause)
+
+    await db.migrations.update_one(
+        {"_id": MIGRATION_ID},
+        {"$set": {"done": True, "updated_at": datetime.now(timezone.utc)}},
+        upsert=True,
+    )
+    logger.info(f"Date migration finished, converted {converted} documents")
+    return converted
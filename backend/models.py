@@ -1,8 +1,12 @@
 from pydantic import BaseModel, Field, EmailStr
 from typing import Optional
-from datetime import datetime
+from datetime import datetime, timezone
 import uuid
 
+# Longest package (full day). Bounds how long one public booking can hold a
+# resource and the overlap scan window of the availability index
+MAX_BOOKING_HOURS = 24
+
 
 class BookingCreate(BaseModel):
     name: str
@@ -12,7 +16,7 @@ class BookingCreate(BaseModel):
     pickup_location: Optional[str] = None
     dropoff_location: Optional[str] = None
     booking_date: datetime
-    duration_hours: Optional[int] = None  # 4, 12, 24 hours
+    duration_hours: Optional[int] = Field(None, ge=1, le=MAX_BOOKING_HOURS)  # 2, 4, 12, 24 hours
     package_type: Optional[str] = None  # 'short-trip', 'half-day', 'full-day', 'airport'
     message: Optional[str] = None
 
@@ -31,7 +35,7 @@ class Booking(BaseModel):
     package_type: Optional[str] = None
     message: Optional[str] = None
     status: str = "pending"  # pending, confirmed, cancelled
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 
 class ContactFormSubmit(BaseModel):
@@ -49,5 +53,5 @@ class ContactFormEntry(BaseModel):
     phone: Optional[str] = None
     service: str
     message: Optional[str] = None
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     status: str = "new"  # new, contacted, closed
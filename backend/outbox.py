@@ -0,0 +1,320 @@
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Collection, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from breaker import CircuitOpen
+
+logger = logging.getLogger(__name__)
+
+# Outbox record states
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+# Leader lock document in the <outbox>_locks collection
+DIGEST_LOCK_ID = "digest"
+
+
+class EmailOutbox:
+    """Persisted email queue drained by a pool of background asyncio workers.
+
+    Request handlers only write outbox records; delivery happens in the
+    workers, so request latency no longer depends on SMTP. Records are
+    leased while being sent, and a lease that expires (worker crashed or
+    process restarted) makes the record claimable again. Every claim gets
+    a new lease token and later writes must match it, so a worker whose
+    lease expired cannot overwrite the record's next attempt.
+
+    Digest mode (digest_window > 0): records of the digest kinds are held
+    for digest_window seconds, or until digest_max of them are pending.
+    The worker that claims one becomes the digest leader, if no other
+    worker holds the leader lock, and leases the other pending ones with
+    its own token to send them all through digest_handler as one email.
+    """
+
+    def __init__(
+        self,
+        collection,
+        handlers: Dict[str, Callable[[dict], Awaitable[None]]],
+        concurrency: Optional[int] = None,
+        poll_interval: Optional[float] = None,
+        max_attempts: Optional[int] = None,
+        lease_seconds: Optional[int] = None,
+        digest_handler: Optional[Callable[[List[Tuple[str, dict]]], Awaitable[None]]] = None,
+        digest_kinds: Collection[str] = (),
+        digest_window: Optional[float] = None,
+        digest_max: Optional[int] = None,
+    ):
+        self.collection = collection
+        self.locks = collection.database[f"{collection.name}_locks"]
+        self.handlers = handlers
+        self.concurrency = concurrency or int(os.environ.get('OUTBOX_CONCURRENCY', 4))
+        self.poll_interval = poll_interval or float(os.environ.get('OUTBOX_POLL_INTERVAL', 5))
+        self.max_attempts = max_attempts or int(os.environ.get('OUTBOX_MAX_ATTEMPTS', 5))
+        self.lease_seconds = lease_seconds or int(os.environ.get('OUTBOX_LEASE_SECONDS', 120))
+        self.digest_handler = digest_handler
+        self.digest_kinds = list(digest_kinds)
+        self.digest_window = digest_window if digest_window is not None else float(os.environ.get('OUTBOX_DIGEST_WINDOW', 0))
+        self.digest_max = digest_max or int(os.environ.get('OUTBOX_DIGEST_MAX', 20))
+        self._wakeup = asyncio.Event()
+        self._workers: List[asyncio.Task] = []
+        # Set while the SMTP circuit is open; workers sleep instead of claiming
+        self._paused_until = 0.0
+
+    async def enqueue(self, kind: str, payload: dict) -> None:
+        """Queue a single email for background delivery"""
+        await self.enqueue_many([(kind, payload)])
+
+    async def enqueue_many(self, items: Iterable[Tuple[str, dict]]) -> None:
+        """Queue several emails with a single insert"""
+        now = datetime.now(timezone.utc)
+        held_until = now + timedelta(seconds=self.digest_window)
+        docs = [
+            {
+                "id": str(uuid.uuid4()),
+                "kind": kind,
+                "payload": payload,
+                "status": PENDING,
+                "attempts": 0,
+                "created_at": now,
+                "next_attempt_at": held_until if self._digested(kind) else now,
+                "locked_until": None,
+                "sent_at": None,
+                "last_error": None,
+            }
+            for kind, payload in items
+        ]
+        if not docs:
+            return
+        await self.collection.insert_many(docs)
+        if any(self._digested(doc["kind"]) for doc in docs):
+            await self._release_full_digest(now)
+        self._wakeup.set()
+
+    def _digested(self, kind: str) -> bool:
+        return self.digest_handler is not None and self.digest_window > 0 and kind in self.digest_kinds
+
+    async def _release_full_digest(self, now: datetime) -> None:
+        """Make held digest records due now once digest_max of them are waiting"""
+        held = {"status": PENDING, "kind": {"$in": self.digest_kinds}}
+        if await self.collection.count_documents(held) >= self.digest_max:
+            await self.collection.update_many(
+                {**held, "next_attempt_at": {"$gt": now}}, {"$set": {"next_attempt_at": now}}
+            )
+
+    async def start(self) -> None:
+        """Spawn the worker pool; the claim index is created by indexes.py"""
+        self._workers = [
+            asyncio.create_task(self._worker(i)) for i in range(self.concurrency)
+        ]
+        logger.info(f"Email outbox started with {self.concurrency} workers")
+
+    async def stop(self) -> None:
+        """Cancel the worker pool; leased records are retried after restart"""
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def stats(self) -> dict:
+        """Queue depth and lag of the oldest undelivered email"""
+        depth = await self.collection.count_documents({"status": {"$in": [PENDING, SENDING]}})
+        failed = await self.collection.count_documents({"status": FAILED})
+        oldest = await self.collection.find_one(
+            {"status": {"$in": [PENDING, SENDING]}},
+            {"_id": 0, "created_at": 1},
+            sort=[("created_at", ASCENDING)],
+        )
+        lag_seconds = 0.0
+        if oldest:
+            lag_seconds = max((datetime.now(timezone.utc) - oldest["created_at"]).total_seconds(), 0.0)
+        return {
+            "depth": depth,
+            "failed": failed,
+            "lag_seconds": lag_seconds,
+            "workers": len(self._workers),
+        }
+
+    async def _claim(self) -> Optional[dict]:
+        """Lease the next due record, including ones whose lease expired"""
+        now = datetime.now(timezone.utc)
+        return await self.collection.find_one_and_update(
+            {
+                "$or": [
+                    {"status": PENDING, "next_attempt_at": {"$lte": now}},
+                    {"status": SENDING, "locked_until": {"$lte": now}},
+                ]
+            },
+            {
+                "$set": {
+                    "status": SENDING,
+                    "lease": uuid.uuid4().hex,
+                    "locked_until": now + timedelta(seconds=self.lease_seconds),
+                },
+                "$unset": {"digest_id": ""},
+                "$inc": {"attempts": 1},
+            },
+            sort=[("next_attempt_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def _worker(self, number: int) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                if self._paused_until > loop.time():
+                    await asyncio.sleep(self._paused_until - loop.time())
+                    continue
+                self._wakeup.clear()
+                job = await self._claim()
+                if job is None:
+                    await self._idle()
+                    continue
+                await self._deliver(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Outbox worker {number} error: {str(e)}")
+                await asyncio.sleep(self.poll_interval)
+
+    async def _idle(self) -> None:
+        """Sleep until an enqueue wakes the pool or the poll interval passes"""
+        waiter = asyncio.ensure_future(self._wakeup.wait())
+        try:
+            await asyncio.wait({waiter}, timeout=self.poll_interval)
+        finally:
+            waiter.cancel()
+
+    async def _deliver(self, job: dict) -> None:
+        if self._digested(job["kind"]):
+            await self._deliver_digest(job)
+            return
+        handler = self.handlers.get(job["kind"])
+        try:
+            if handler is None:
+                raise ValueError(f"No handler for outbox kind '{job['kind']}'")
+            await handler(job["payload"])
+        except Exception as e:
+            await self._record_failure(job, e)
+            return
+
+        await self.collection.update_one(
+            {"_id": job["_id"], "lease": job["lease"]},
+            {"$set": {"status": SENT, "sent_at": datetime.now(timezone.utc), "locked_until": None, "lease": None, "last_error": None}},
+        )
+
+    async def _lead_digest(self, job: dict) -> bool:
+        """Take the digest leader lock for the claimed record's lease"""
+        now = datetime.now(timezone.utc)
+        try:
+            await self.locks.find_one_and_update(
+                {"_id": DIGEST_LOCK_ID, "locked_until": {"$lte": now}},
+                {"$set": {"lease": job["lease"], "locked_until": job["locked_until"]}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            # Another worker holds an unexpired lock
+            return False
+        return True
+
+    async def _deliver_digest(self, job: dict) -> None:
+        """Send the claimed record with up to digest_max - 1 other pending digest records"""
+        if not await self._lead_digest(job):
+            # The current leader may still pick it up; otherwise it leads the next digest
+            await self._release(job, datetime.now(timezone.utc) + timedelta(seconds=self.poll_interval))
+            return
+        try:
+            await self._send_digest(job)
+        finally:
+            await asyncio.shield(self.locks.delete_one({"_id": DIGEST_LOCK_ID, "lease": job["lease"]}))
+
+    async def _send_digest(self, job: dict) -> None:
+        now = datetime.now(timezone.utc)
+        others = await self.collection.find(
+            {"status": PENDING, "kind": {"$in": self.digest_kinds}}, {"_id": 1}
+        ).sort("created_at", ASCENDING).limit(self.digest_max - 1).to_list(self.digest_max - 1)
+        if others:
+            # Lease them under the leader's token; records claimed meanwhile are skipped
+            await self.collection.update_many(
+                {"_id": {"$in": [doc["_id"] for doc in others]}, "status": PENDING},
+                {
+                    "$set": {
+                        "status": SENDING,
+                        "lease": job["lease"],
+                        "locked_until": job["locked_until"],
+                        "digest_id": job["lease"],
+                    },
+                    "$inc": {"attempts": 1},
+                },
+            )
+        jobs = [job] + await self.collection.find(
+            {"lease": job["lease"], "status": SENDING, "_id": {"$ne": job["_id"]}}
+        ).sort("created_at", ASCENDING).to_list(None)
+
+        try:
+            if len(jobs) == 1:
+                handler = self.handlers.get(job["kind"])
+                if handler is None:
+                    raise ValueError(f"No handler for outbox kind '{job['kind']}'")
+                await handler(job["payload"])
+            else:
+                await self.digest_handler([(item["kind"], item["payload"]) for item in jobs])
+        except Exception as e:
+            for item in jobs:
+                await self._record_failure(item, e)
+            return
+
+        await self.collection.update_many(
+            {"_id": {"$in": [item["_id"] for item in jobs]}, "lease": job["lease"]},
+            {"$set": {"status": SENT, "sent_at": datetime.now(timezone.utc), "locked_until": None, "lease": None, "last_error": None}},
+        )
+        if len(jobs) > 1:
+            age = (now - jobs[0]["created_at"]).total_seconds()
+            logger.info(f"Outbox sent a digest of {len(jobs)} emails, the oldest queued {age:.0f}s ago")
+
+    async def _record_failure(self, job: dict, error: Exception) -> None:
+        if isinstance(error, CircuitOpen):
+            await self._defer(job, error.retry_after)
+            return
+        attempts = job.get("attempts", 1)
+        update = {"locked_until": None, "lease": None, "last_error": str(error)}
+        if attempts >= self.max_attempts:
+            update["status"] = FAILED
+            logger.error(f"Outbox email {job['id']} ({job['kind']}) failed permanently: {str(error)}")
+        else:
+            # Exponential backoff: 30s, 60s, 120s, ... capped at one hour
+            delay = min(30 * 2 ** (attempts - 1), 3600)
+            update["status"] = PENDING
+            update["next_attempt_at"] = datetime.now(timezone.utc) + timedelta(seconds=delay)
+            logger.warning(f"Outbox email {job['id']} ({job['kind']}) failed, retrying in {delay}s: {str(error)}")
+        await self.collection.update_one(
+            {"_id": job["_id"], "lease": job["lease"]}, {"$set": update, "$unset": {"digest_id": ""}}
+        )
+
+    async def _defer(self, job: dict, delay: float) -> None:
+        """Pause the workers and put a record back; nothing was sent"""
+        self._paused_until = max(self._paused_until, asyncio.get_running_loop().time() + delay)
+        await self._release(job, datetime.now(timezone.utc) + timedelta(seconds=delay))
+
+    async def _release(self, job: dict, next_attempt_at: datetime) -> None:
+        """Return a claimed record to pending without using up an attempt"""
+        await self.collection.update_one(
+            {"_id": job["_id"], "lease": job["lease"]},
+            {
+                "$set": {
+                    "status": PENDING,
+                    "locked_until": None,
+                    "lease": None,
+                    "next_attempt_at": next_attempt_at,
+                },
+                "$unset": {"digest_id": ""},
+                "$inc": {"attempts": -1},
+            },
+        )
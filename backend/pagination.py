@@ -0,0 +1,78 @@
+import base64
+import json
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Tuple
+
+from pymongo import DESCENDING
+
+# Newest first; id breaks ties between rows created in the same instant
+KEYSET_SORT = [("created_at", DESCENDING), ("id", DESCENDING)]
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(doc: dict) -> str:
+    """Opaque cursor pointing just past the given row"""
+    created_at = doc["created_at"]
+    payload = {
+        "t": created_at.isoformat() if isinstance(created_at, datetime) else created_at,
+        "d": isinstance(created_at, datetime),
+        "i": doc["id"],
+    }
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[object, str]:
+    """Decode a cursor into its (created_at, id) key; raises ValueError"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        created_at = datetime.fromisoformat(payload["t"]) if payload["d"] else payload["t"]
+        return created_at, payload["i"]
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def keyset_query(query: dict, after: Optional[str]) -> dict:
+    """Restrict a query to rows that sort after the cursor"""
+    if not after:
+        return query
+    created_at, row_id = decode_cursor(after)
+    clauses = [
+        {"created_at": {"$lt": created_at}},
+        {"created_at": created_at, "id": {"$lt": row_id}},
+    ]
+    if isinstance(created_at, datetime):
+        # Descending BSON order puts dates before legacy ISO strings
+        clauses.append({"created_at": {"$type": "string"}})
+    after_filter = {"$or": clauses}
+    return {"$and": [query, after_filter]} if query else after_filter
+
+
+async def fetch_page(
+    collection, query: dict, limit: int, after: Optional[str] = None, projection: Optional[dict] = None
+) -> Tuple[List[dict], Optional[str]]:
+    """One page of rows plus the cursor for the next page (None on the last page)"""
+    docs = await collection.find(
+        keyset_query(query, after), projection or {"_id": 0}
+    ).sort(KEYSET_SORT).limit(limit + 1).to_list(limit + 1)
+    if len(docs) <= limit:
+        return docs, None
+    docs = docs[:limit]
+    return docs, encode_cursor(docs[-1])
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+async def stream_ndjson(collection, query: dict, after: Optional[str] = None, limit: Optional[int] = None) -> AsyncIterator[bytes]:
+    """Yield rows as newline-delimited JSON while the Motor cursor produces them"""
+    cursor = collection.find(keyset_query(query, after), {"_id": 0}).sort(KEYSET_SORT)
+    if limit:
+        cursor = cursor.limit(limit)
+    async for doc in cursor:
+        yield json.dumps(doc, default=_json_default).encode() + b"\n"
@@ -0,0 +1,38 @@
+import time
+from collections import deque
+from typing import Deque, Dict, Hashable
+
+
+class AttemptLimiter:
+    """Sliding-window attempt counter per key (client IP, (username, IP), ...).
+
+    hit() records an attempt and returns 0 when it is allowed, otherwise
+    the seconds until the oldest attempt leaves the window. Rejected
+    attempts are not recorded, so a blocked client is not locked out for
+    longer by retrying. State is per process.
+    """
+
+    def __init__(self, limit: int, window_seconds: float):
+        self.limit = limit
+        self.window = window_seconds
+        self._attempts: Dict[Hashable, Deque[float]] = {}
+
+    def hit(self, key: Hashable) -> float:
+        now = time.monotonic()
+        attempts = self._attempts.setdefault(key, deque())
+        while attempts and attempts[0] <= now - self.window:
+            attempts.popleft()
+        if len(attempts) >= self.limit:
+            return attempts[0] + self.window - now
+        attempts.append(now)
+        if len(self._attempts) > 10000:
+            self._prune(now)
+        return 0.0
+
+    def reset(self, key: Hashable) -> None:
+        self._attempts.pop(key, None)
+
+    def _prune(self, now: float) -> None:
+        for key, attempts in list(self._attempts.items()):
+            if not attempts or attempts[-1] <= now - self.window:
+                del self._attempts[key]
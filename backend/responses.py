@@ -0,0 +1,30 @@
+import os
+from typing import Type
+
+from fastapi.responses import Response
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+# Opt-in: list endpoints serialize MongoDB rows directly instead of
+# validating each one against the response_model first
+FAST_JSON_RESPONSES = os.environ.get('FAST_JSON_RESPONSES', 'false').lower() in ('1', 'true', 'yes')
+
+
+def model_projection(model: Type[BaseModel]) -> dict:
+    """MongoDB projection returning exactly the model's fields, so rows need no filtering"""
+    return {"_id": 0, **{name: 1 for name in model.model_fields}}
+
+
+class RawJSONResponse(Response):
+    """JSON response for trusted rows that already have the response model's shape.
+
+    Returning it from a handler bypasses FastAPI's response_model
+    validation, and pydantic-core's encoder writes datetimes the same way
+    the model would. Rows are not checked: fields missing from a document
+    are omitted rather than filled with model defaults.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return to_json(content)
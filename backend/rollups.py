@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import os
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from pymongo import ReplaceOne
+
+from availability import as_utc
+
+logger = logging.getLogger(__name__)
+
+# Raw status checks are removed by a TTL index on timestamp after this long
+STATUS_CHECK_RETENTION_SECONDS = int(float(os.environ.get('STATUS_CHECK_RETENTION_DAYS', 30)) * 86400)
+
+ROLLUP_COLLECTION = "status_check_rollups"
+
+
+def hour_start(moment: datetime) -> datetime:
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def rollup_pipeline(start: Optional[datetime], end: datetime) -> list:
+    """Count status checks per client and hour in [start, end).
+
+    The hour is rebuilt with $dateFromParts rather than $dateTrunc, which
+    needs MongoDB 5.0, since rows must never expire without a rollup.
+    """
+    window = {"$lt": end}
+    if start is not None:
+        window["$gte"] = start
+    return [
+        {"$match": {"timestamp": window}},
+        {"$group": {
+            "_id": {
+                "client_name": "$client_name",
+                "hour": {"$dateFromParts": {
+                    "year": {"$year": "$timestamp"},
+                    "month": {"$month": "$timestamp"},
+                    "day": {"$dayOfMonth": "$timestamp"},
+                    "hour": {"$hour": "$timestamp"},
+                }},
+            },
+            "count": {"$sum": 1},
+        }},
+        {"$project": {"client_name": "$_id.client_name", "hour": "$_id.hour", "count": 1}},
+    ]
+
+
+class StatusRollups:
+    """Per-client hourly counts of status checks.
+
+    Raw status_checks only live for the retention period; before they
+    expire, every completed hour is aggregated into status_check_rollups.
+    Each run continues after the newest hour already rolled up, so the
+    rollup collection itself is the checkpoint and an hour is only counted
+    while all of its raw rows still exist.
+
+    Rows from older releases may still have an ISO string timestamp. The
+    TTL index ignores those, but the date migration turns them into dates
+    it can expire at once, so they are counted too, parsed like the
+    migration parses them. The startup run happens before the migration
+    is launched, so no row changes type while it is counted.
+    """
+
+    def __init__(self, db, interval: Optional[float] = None):
+        self.db = db
+        self.collection = db[ROLLUP_COLLECTION]
+        self.interval = interval or float(os.environ.get('STATUS_ROLLUP_INTERVAL', 3600))
+        self._task: Optional[asyncio.Task] = None
+
+    async def roll_up(self, now: Optional[datetime] = None) -> Optional[datetime]:
+        """Roll up every completed hour not rolled up yet; returns the end of the window"""
+        end = hour_start(now or datetime.now(timezone.utc))
+        latest = await self.collection.find_one({}, {"_id": 0, "hour": 1}, sort=[("hour", -1)])
+        start = latest["hour"] + timedelta(hours=1) if latest else None
+        if start is not None and start >= end:
+            return None
+        rows = await self.db.status_checks.aggregate(rollup_pipeline(start, end)).to_list(None)
+        legacy = await self._count_string_timestamps(start, end)
+        if legacy:
+            by_key = {(row.get("client_name"), as_utc(row["hour"])): row for row in rows}
+            for (client_name, hour), count in legacy.items():
+                if (client_name, hour) in by_key:
+                    by_key[(client_name, hour)]["count"] += count
+                else:
+                    key = {"client_name": client_name, "hour": hour}
+                    rows.append({"_id": key, **key, "count": count})
+        if rows:
+            # The group key is the _id, so re-running a window replaces the same documents
+            await self.collection.bulk_write(
+                [ReplaceOne({"_id": row["_id"]}, row, upsert=True) for row in rows], ordered=False
+            )
+        return end
+
+    async def _count_string_timestamps(self, start: Optional[datetime], end: datetime) -> Counter:
+        """Status checks per (client, hour) in [start, end) whose timestamp is still an ISO string"""
+        counts = Counter()
+        async for doc in self.db.status_checks.find(
+            {"timestamp": {"$type": "string"}}, {"_id": 0, "client_name": 1, "timestamp": 1}
+        ):
+            try:
+                moment = as_utc(doc["timestamp"])
+            except ValueError:
+                continue
+            if moment < end and (start is None or moment >= start):
+                counts[(doc.get("client_name"), hour_start(moment))] += 1
+        return counts
+
+    async def start(self) -> None:
+        """Roll up now, before the TTL index may remove rows, then every interval seconds"""
+        await self._run()
+        self._task = asyncio.create_task(self._rollup_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        try:
+            end = await self.roll_up()
+            if end is not None:
+                logger.info(f"Rolled up status checks before {end.isoformat()}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Status check rollup failed: {str(e)}")
+
+    async def _rollup_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self._run()
@@ -1,30 +1,173 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, Header
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Header, Query, Request, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import BulkWriteError
+from contextlib import asynccontextmanager
 import os
+import re
+import json
+import secrets
+import time
+import asyncio
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional
+from pydantic import BaseModel, Field, ConfigDict, ValidationError
+from typing import Any, Dict, List, Optional
 import uuid
+from collections import Counter
 from datetime import datetime, timezone, timedelta
-from models import Booking, BookingCreate, ContactFormEntry, ContactFormSubmit
-from email_service import email_service
-from auth import authenticate_admin, create_access_token, verify_token
-
 
 ROOT_DIR = Path(__file__).parent
+# Load .env before the local modules below read their settings
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+from models import Booking, BookingCreate, ContactFormEntry, ContactFormSubmit
+from email_service import get_email_service
+from outbox import EmailOutbox
+from migrations import migrate_string_dates
+from counters import DashboardCounters
+from cache import GenerationCache
+from versions import ChangeVersions, etag_matches
+from events import BOOKING_CREATED, BOOKING_STATUS_CHANGED, CONTACT_SUBMITTED, EventBroker
+from indexes import check_query_plans, ensure_indexes
+from availability import BookingConflict, BookingIntervalIndex, BookingReservations, as_utc
+from calendar_slots import CALENDAR_SLOT_MINUTES, month_calendar
+from pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, fetch_page, stream_ndjson
+from idempotency import IdempotencyStore
+from rollups import StatusRollups
+from ratelimit import AttemptLimiter
+import metrics
+from metrics import MetricsMiddleware, MongoCommandListener
+from responses import FAST_JSON_RESPONSES, RawJSONResponse, model_projection
+from auth import authenticate_admin_async, create_access_token, revoke_token, verify_token
+
+
+# MongoDB connection, email outbox and counters are created by the lifespan
+# handler, so importing this module does no I/O
+client: Optional[AsyncIOMotorClient] = None
+db = None
+outbox: Optional[EmailOutbox] = None
+counters: Optional[DashboardCounters] = None
+idempotency: Optional[IdempotencyStore] = None
+rollups: Optional[StatusRollups] = None
+
+# In-memory index of non-cancelled bookings for availability lookups
+booking_index = BookingIntervalIndex()
+BOOKING_INDEX_PROJECTION = {"_id": 0, "id": 1, "booking_date": 1, "booking_end_date": 1, "service_type": 1}
+
+
+async def find_stored_booking(query: dict) -> Optional[dict]:
+    return await db.bookings.find_one(query, BOOKING_INDEX_PROJECTION)
+
+
+# Overlap checks in memory, verified against the database after each write
+reservations = BookingReservations(booking_index, find_stored=find_stored_booking)
+
+# Rendered availability responses, invalidated on every booking write
+availability_cache = GenerationCache(int(os.environ.get('AVAILABILITY_CACHE_SIZE', 256)))
+# Month calendars (day bitmaps) for the booking modal, same invalidation
+calendar_cache = GenerationCache(int(os.environ.get('CALENDAR_CACHE_SIZE', 64)))
+
+# Change versions behind the ETags of admin and availability responses
+versions = ChangeVersions()
+
+
+# Live admin events: change stream when available, otherwise in-process
+broker = EventBroker()
+
+# Set by the lifespan on shutdown; open admin event streams end on it.
+# uvicorn only runs the lifespan shutdown once open responses are done, so
+# serve with --timeout-graceful-shutdown (e.g. 5) to bound how long an
+# open dashboard stream can hold up a restart; uvicorn cancels it after that.
+shutdown_event = asyncio.Event()
+
+
+def bookings_changed():
+    """Record a booking write: new ETags and a fresh availability cache"""
+    versions.bump("bookings")
+    availability_cache.invalidate()
+    calendar_cache.invalidate()
+
+
+async def load_booking_index():
+    bookings = await db.bookings.find(
+        {"status": {"$ne": "cancelled"}}, BOOKING_INDEX_PROJECTION
+    ).to_list(None)
+    booking_index.load(bookings)
+    logger.info(f"Loaded {len(booking_index)} bookings into the availability index")
+
+
+async def run_date_migration():
+    try:
+        # Converted documents serialize differently, so they need new ETags
+        await migrate_string_dates(db, on_batch=versions.bump)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.error(f"Date migration stopped, it will resume on next startup: {str(e)}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global client, db, outbox, counters, idempotency, rollups
+    # Dates are stored as native BSON dates and read back as aware UTC datetimes
+    client = AsyncIOMotorClient(
+        os.environ['MONGO_URL'], tz_aware=True, event_listeners=[MongoCommandListener()]
+    )
+    db = client[os.environ['DB_NAME']]
+    email_service = get_email_service()
+    # Email outbox: handlers persist emails, background workers send them
+    outbox = EmailOutbox(
+        db.email_outbox,
+        {
+            "booking_confirmation": email_service.send_booking_confirmation_to_customer,
+            "booking_notification": email_service.send_booking_notification_to_business,
+            "booking_batch_notification": email_service.send_booking_batch_notification_to_business,
+            "contact_notification": email_service.send_contact_form_notification,
+        },
+        # Optional digest mode (OUTBOX_DIGEST_WINDOW): business notifications are
+        # combined into one email; customer confirmations still go out one by one
+        digest_handler=email_service.send_business_digest,
+        digest_kinds=("booking_notification", "booking_batch_notification", "contact_notification"),
+    )
+    # Dashboard totals maintained incrementally with $inc
+    counters = DashboardCounters(db, on_change=lambda: versions.bump("counters"))
+    # Replayed public POSTs are answered from the first response
+    idempotency = IdempotencyStore(db)
+    # Hourly per-client status check counts, kept after the raw rows expire
+    rollups = StatusRollups(db)
+
+    shutdown_event.clear()
+    # Roll up first: ensure_indexes() may add the TTL index that removes old rows
+    await rollups.start()
+    await ensure_indexes(db)
+    await check_query_plans(db)
+    await load_booking_index()
+    await outbox.start()
+    await broker.start(db)
+    await counters.start()
+    # Legacy ISO string dates are converted in the background; reads accept both.
+    # Started after the rollup above, which counts rows still holding strings.
+    date_migration = asyncio.create_task(run_date_migration())
+    try:
+        yield
+    finally:
+        shutdown_event.set()
+        date_migration.cancel()
+        await asyncio.gather(date_migration, return_exceptions=True)
+        await broker.stop()
+        await outbox.stop()
+        await counters.stop()
+        await rollups.stop()
+        await email_service.close()
+        client.close()
+
 
 # Create the main app without a prefix
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -32,12 +175,37 @@ api_router = APIRouter(prefix="/api")
 # Security
 security = HTTPBearer()
 
+# Login attempts allowed per (username, client IP) and per client IP overall,
+# checked before bcrypt. The username limit is scoped to the client so that
+# guessing from one address cannot lock the admin out everywhere else; the
+# per-IP limit caps each address across all usernames.
+LOGIN_WINDOW_SECONDS = float(os.environ.get('LOGIN_WINDOW_SECONDS', 60))
+login_user_limiter = AttemptLimiter(int(os.environ.get('LOGIN_MAX_ATTEMPTS_PER_USER', 5)), LOGIN_WINDOW_SECONDS)
+login_ip_limiter = AttemptLimiter(int(os.environ.get('LOGIN_MAX_ATTEMPTS_PER_IP', 20)), LOGIN_WINDOW_SECONDS)
+
+
+# Reverse proxies in front of the app that append to X-Forwarded-For; hops
+# left of the ones they added are client-supplied and cannot be trusted
+TRUSTED_PROXY_COUNT = int(os.environ.get('TRUSTED_PROXY_COUNT', 1))
+
+
+def client_ip(request: Request) -> str:
+    """Client address as seen by the outermost trusted proxy"""
+    forwarded = request.headers.get("x-forwarded-for")
+    if forwarded and TRUSTED_PROXY_COUNT > 0:
+        hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+        if hops:
+            return hops[-min(TRUSTED_PROXY_COUNT, len(hops))]
+    return request.client.host if request.client else "unknown"
+
 
 # Auth dependency
 async def get_current_admin(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Verify admin token"""
     token = credentials.credentials
+    started = time.perf_counter()
     payload = verify_token(token)
+    metrics.token_verify_duration.observe(time.perf_counter() - started)
     if payload is None:
         raise HTTPException(status_code=401, detail="Invalid authentication credentials")
     return payload
@@ -54,6 +222,11 @@ class StatusCheck(BaseModel):
 class StatusCheckCreate(BaseModel):
     client_name: str
 
+class StatusCheckRollup(BaseModel):
+    client_name: str
+    hour: datetime
+    count: int
+
 
 # Auth Models
 class AdminLogin(BaseModel):
@@ -69,6 +242,121 @@ class TokenResponse(BaseModel):
 class BookingStatusUpdate(BaseModel):
     status: str  # pending, confirmed, cancelled, completed
 
+
+class BulkBookingResult(BaseModel):
+    index: int
+    status: str  # created, invalid, conflict, failed
+    booking: Optional[Booking] = None
+    detail: Optional[Any] = None
+
+
+class BulkBookingResponse(BaseModel):
+    created: int
+    rejected: int
+    results: List[BulkBookingResult]
+
+
+BULK_BOOKING_MAX = int(os.environ.get('BULK_BOOKING_MAX', 500))
+
+
+def build_booking(booking_input: BookingCreate) -> Booking:
+    """Booking with its end date calculated from the duration"""
+    booking_end_date = None
+    if booking_input.duration_hours:
+        booking_end_date = booking_input.booking_date + timedelta(hours=booking_input.duration_hours)
+    return Booking(**booking_input.model_dump(), booking_end_date=booking_end_date)
+
+
+def booking_conflict_detail(conflict: BookingConflict) -> dict:
+    """409 response body naming the window that is already taken"""
+    slot = conflict.conflict.slot
+    return {
+        "message": "The selected time overlaps an existing booking",
+        "conflict": {"start": slot["start"], "end": slot["end"], "service_type": slot["service_type"]},
+    }
+
+# Search input that is matched against one indexed field rather than $text,
+# which splits emails and phone numbers into words and matches any of them
+EMAIL_LIKE = re.compile(r"^[^\s@]+@[^\s@]*$")
+PHONE_LIKE = re.compile(r"^\+?[\d\s().-]+$")
+PHONE_SEPARATORS = r"[\s().-]*"
+PHONE_MIN_DIGITS = 4
+
+
+def search_filter(q: str) -> dict:
+    """Mongo filter for the admin list search box.
+
+    Email-like input is a case-insensitive prefix match on email and
+    phone-like input a prefix match on phone that ignores separators, both
+    anchored so they run on the field's index. Anything else is a $text
+    search for the input as one phrase, so operators such as a leading "-"
+    or embedded quotes are taken literally.
+    """
+    if EMAIL_LIKE.match(q):
+        return {"email": {"$regex": "^" + re.escape(q), "$options": "i"}}
+    digits = re.sub(r"\D", "", q)
+    if PHONE_LIKE.match(q) and len(digits) >= PHONE_MIN_DIGITS:
+        prefix = re.escape("+") if q.startswith("+") else ""
+        return {"phone": {"$regex": "^" + prefix + PHONE_SEPARATORS.join(digits)}}
+    return {"$text": {"$search": '"' + q.replace('"', " ") + '"'}}
+
+
+def list_filter(q: Optional[str] = None, **equals) -> dict:
+    """Mongo filter from exact-match params and the search box; None values are skipped"""
+    query = {field: value for field, value in equals.items() if value is not None}
+    if q and q.strip():
+        query.update(search_filter(q.strip()))
+    return query
+
+
+def validator_headers(etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+
+def conditional_get(*collections: str):
+    """Dependency: ETag from the collections' change versions, 304 when If-None-Match matches.
+
+    Runs before the handler, so a matching request never reaches Mongo.
+    The ETag is returned for handlers that build their own Response.
+    """
+    async def check(request: Request, response: Response) -> str:
+        etag = versions.etag(collections, f"{request.url.path}?{request.url.query}")
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            raise HTTPException(status_code=304, headers=validator_headers(etag))
+        response.headers.update(validator_headers(etag))
+        return etag
+    return check
+
+
+async def list_page(
+    collection, model, query: dict, response: Response, limit: Optional[int], after: Optional[str], format: str
+):
+    """Keyset-paginated admin listing, newest first, or an NDJSON stream"""
+    if after:
+        try:
+            decode_cursor(after)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    if format == "ndjson":
+        # Streams every row after the cursor unless a limit is given
+        return StreamingResponse(
+            stream_ndjson(collection, query, after, limit),
+            media_type="application/x-ndjson",
+            headers=validator_headers(response.headers["etag"]),
+        )
+    if FAST_JSON_RESPONSES:
+        docs, next_cursor = await fetch_page(
+            collection, query, limit or DEFAULT_PAGE_SIZE, after, model_projection(model)
+        )
+        headers = validator_headers(response.headers["etag"])
+        if next_cursor:
+            headers["X-Next-Cursor"] = next_cursor
+        return RawJSONResponse(docs, headers=headers)
+    docs, next_cursor = await fetch_page(collection, query, limit or DEFAULT_PAGE_SIZE, after)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return docs
+
 # Add your routes to the router instead of directly to app
 @api_router.get("/")
 async def root():
@@ -79,113 +367,258 @@ async def create_status_check(input: StatusCheckCreate):
     status_dict = input.model_dump()
     status_obj = StatusCheck(**status_dict)
     
-    # Convert to dict and serialize datetime to ISO string for MongoDB
     doc = status_obj.model_dump()
-    doc['timestamp'] = doc['timestamp'].isoformat()
-    
     _ = await db.status_checks.insert_one(doc)
     return status_obj
 
 @api_router.get("/status", response_model=List[StatusCheck])
-async def get_status_checks():
+async def get_status_checks(
+    since: Optional[datetime] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+):
+    """Status checks newest first, optionally only those at or after since"""
+    query = {"timestamp": {"$gte": as_utc(since)}} if since else {}
     # Exclude MongoDB's _id field from the query results
-    status_checks = await db.status_checks.find({}, {"_id": 0}).to_list(1000)
-    
-    # Convert ISO string timestamps back to datetime objects
-    for check in status_checks:
-        if isinstance(check['timestamp'], str):
-            check['timestamp'] = datetime.fromisoformat(check['timestamp'])
-    
+    projection = model_projection(StatusCheck) if FAST_JSON_RESPONSES else {"_id": 0}
+    status_checks = await db.status_checks.find(query, projection).sort("timestamp", -1).limit(limit).to_list(limit)
+    if FAST_JSON_RESPONSES:
+        return RawJSONResponse(status_checks)
     return status_checks
 
+@api_router.get("/status/hourly", response_model=List[StatusCheckRollup])
+async def get_status_check_rollups(
+    client_name: Optional[str] = None,
+    since: Optional[datetime] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+):
+    """Hourly status check counts per client, newest hour first; covers completed hours only"""
+    query = {}
+    if client_name:
+        query["client_name"] = client_name
+    if since:
+        query["hour"] = {"$gte": as_utc(since)}
+    return await rollups.collection.find(query, {"_id": 0}).sort("hour", -1).limit(limit).to_list(limit)
+
+
+async def idempotent(response: Response, scope: str, key: str, request: BaseModel, execute) -> dict:
+    """Run a POST handler once per Idempotency-Key and replay its response body"""
+    async def run():
+        return (await execute()).model_dump(mode="json")
+
+    body, replayed = await idempotency.run(scope, key, request.model_dump(mode="json"), run)
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return body
+
 
 # Booking Endpoints
 @api_router.post("/bookings", response_model=Booking)
-async def create_booking(booking_input: BookingCreate):
+async def create_booking(
+    booking_input: BookingCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, min_length=1, max_length=255)
+):
+    """Create a new booking; a retry with the same Idempotency-Key gets the original response"""
+    if idempotency_key is None:
+        return await insert_booking(booking_input)
+    return await idempotent(response, "bookings", idempotency_key, booking_input, lambda: insert_booking(booking_input))
+
+
+async def insert_booking(booking_input: BookingCreate) -> Booking:
     """Create a new booking and send email notifications"""
     try:
-        # Calculate booking end date based on duration
-        booking_end_date = None
-        if booking_input.duration_hours:
-            booking_end_date = booking_input.booking_date + timedelta(hours=booking_input.duration_hours)
-        
-        # Create booking object
-        booking_dict = booking_input.model_dump()
-        booking = Booking(**booking_dict, booking_end_date=booking_end_date)
+        # Create booking object with its end date
+        booking = build_booking(booking_input)
         
         # Save to database
         doc = booking.model_dump()
-        doc['booking_date'] = doc['booking_date'].isoformat()
-        doc['created_at'] = doc['created_at'].isoformat()
-        if doc['booking_end_date']:
-            doc['booking_end_date'] = doc['booking_end_date'].isoformat()
         
-        await db.bookings.insert_one(doc)
+        # Check for overlapping bookings and insert as one step
+        await reservations.reserve(
+            doc, lambda: db.bookings.insert_one(doc), undo=lambda: db.bookings.delete_one({"id": doc["id"]})
+        )
+        bookings_changed()
         
-        # Send email notifications
+        # Queue email notifications for background delivery
         try:
             email_data = booking.model_dump()
-            await email_service.send_booking_confirmation_to_customer(email_data)
-            await email_service.send_booking_notification_to_business(email_data)
-            logger.info(f"Booking created and emails sent for {booking.email}")
+            await outbox.enqueue_many([
+                ("booking_confirmation", email_data),
+                ("booking_notification", email_data),
+            ])
+            logger.info(f"Booking created and emails queued for {booking.email}")
         except Exception as e:
-            logger.error(f"Failed to send emails for booking {booking.id}: {str(e)}")
+            logger.error(f"Failed to queue emails for booking {booking.id}: {str(e)}")
             # Continue even if email fails - booking is still saved
         
+        try:
+            await counters.booking_created(booking.status)
+        except Exception as e:
+            logger.error(f"Failed to update counters for booking {booking.id}: {str(e)}")
+        
+        # Published last so listeners refetching the stats see the new counts
+        broker.publish_local(BOOKING_CREATED, booking.model_dump(mode="json"))
+        
         return booking
+    except BookingConflict as e:
+        raise HTTPException(status_code=409, detail=booking_conflict_detail(e))
     except Exception as e:
         logger.error(f"Error creating booking: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@api_router.get("/bookings/availability")
-async def get_booking_availability(start_date: str, end_date: str):
-    """Get booking availability for calendar"""
+@api_router.post("/bookings/bulk", response_model=BulkBookingResponse)
+async def create_bookings_bulk(items: List[Dict[str, Any]], admin: dict = Depends(get_current_admin)):
+    """Create a batch of bookings with one insert and batched notifications (admin only)"""
+    if len(items) > BULK_BOOKING_MAX:
+        raise HTTPException(status_code=413, detail=f"At most {BULK_BOOKING_MAX} bookings per request")
     try:
-        start = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
-        end = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
+        # Validate every item on its own so one bad row does not reject the batch
+        results: List[Optional[BulkBookingResult]] = [None] * len(items)
+        bookings, positions = [], {}
+        for index, item in enumerate(items):
+            try:
+                booking = build_booking(BookingCreate.model_validate(item))
+            except ValidationError as e:
+                results[index] = BulkBookingResult(
+                    index=index, status="invalid", detail=e.errors(include_url=False, include_context=False)
+                )
+                continue
+            bookings.append(booking)
+            positions[booking.id] = index
+        
+        async def insert(docs: List[dict]) -> Dict[str, str]:
+            try:
+                # insert_many adds _id to the dicts, keep them out of the response
+                await db.bookings.insert_many([dict(doc) for doc in docs], ordered=False)
+                return {}
+            except BulkWriteError as e:
+                return {docs[error['index']]['id']: error['errmsg'] for error in e.details['writeErrors']}
         
-        # Get all bookings in the date range
-        bookings = await db.bookings.find({
-            "booking_date": {"$gte": start.isoformat(), "$lte": end.isoformat()},
-            "status": {"$ne": "cancelled"}
-        }, {"_id": 0}).to_list(1000)
+        # Overlap checks and the insert run under the resource locks
+        stored, conflicts, errors = await reservations.reserve_many(
+            [booking.model_dump() for booking in bookings],
+            insert,
+            undo=lambda ids: db.bookings.delete_many({"id": {"$in": ids}}),
+        )
+        if stored:
+            bookings_changed()
         
-        # Create list of blocked time slots
-        blocked_slots = []
+        stored_ids = {doc['id'] for doc in stored}
         for booking in bookings:
-            booking_start = datetime.fromisoformat(booking['booking_date'])
-            booking_end = datetime.fromisoformat(booking['booking_end_date']) if booking.get('booking_end_date') else booking_start
+            index = positions[booking.id]
+            if booking.id in stored_ids:
+                results[index] = BulkBookingResult(index=index, status="created", booking=booking)
+            elif booking.id in conflicts:
+                results[index] = BulkBookingResult(
+                    index=index, status="conflict", detail=booking_conflict_detail(BookingConflict(conflicts[booking.id]))
+                )
+            else:
+                results[index] = BulkBookingResult(index=index, status="failed", detail=errors.get(booking.id))
+        
+        created = [booking for booking in bookings if booking.id in stored_ids]
+        if created:
+            # One confirmation per customer and a single summary for the business, in one insert
+            try:
+                emails = [("booking_confirmation", booking.model_dump()) for booking in created]
+                emails.append(("booking_batch_notification", {"bookings": [booking.model_dump() for booking in created]}))
+                await outbox.enqueue_many(emails)
+                logger.info(f"Bulk created {len(created)} bookings and queued {len(emails)} emails")
+            except Exception as e:
+                logger.error(f"Failed to queue emails for bulk bookings: {str(e)}")
+            
+            try:
+                for status, count in Counter(booking.status for booking in created).items():
+                    await counters.booking_created(status, count)
+            except Exception as e:
+                logger.error(f"Failed to update counters for bulk bookings: {str(e)}")
             
-            blocked_slots.append({
-                "id": booking['id'],
-                "start": booking['booking_date'],
-                "end": booking['booking_end_date'] if booking.get('booking_end_date') else booking['booking_date'],
-                "service_type": booking['service_type']
-            })
+            for booking in created:
+                broker.publish_local(BOOKING_CREATED, booking.model_dump(mode="json"))
         
-        return {"blocked_slots": blocked_slots}
+        return {"created": len(created), "rejected": len(items) - len(created), "results": results}
     except Exception as e:
-        logger.error(f"Error getting availability: {str(e)}")
+        logger.error(f"Error creating bulk bookings: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@api_router.get("/bookings", response_model=List[Booking])
-async def get_all_bookings(admin: dict = Depends(get_current_admin)):
-    """Get all bookings (admin endpoint - protected)"""
+@api_router.get("/bookings/availability")
+async def get_booking_availability(start_date: str, end_date: str, etag: str = Depends(conditional_get("bookings"))):
+    """Get booking availability for calendar"""
     try:
-        bookings = await db.bookings.find({}, {"_id": 0}).to_list(1000)
+        start = as_utc(start_date)
+        end = as_utc(end_date)
         
-        # Convert ISO strings back to datetime
-        for booking in bookings:
-            if isinstance(booking['booking_date'], str):
-                booking['booking_date'] = datetime.fromisoformat(booking['booking_date'])
-            if isinstance(booking['created_at'], str):
-                booking['created_at'] = datetime.fromisoformat(booking['created_at'])
-            if booking.get('booking_end_date') and isinstance(booking['booking_end_date'], str):
-                booking['booking_end_date'] = datetime.fromisoformat(booking['booking_end_date'])
+        # Same instants in any offset share one cache entry
+        key = (start, end)
+        body = availability_cache.get(key)
+        if body is None:
+            generation = availability_cache.generation
+            # Non-cancelled bookings overlapping the window, served from memory
+            blocked_slots = [entry.slot for entry in booking_index.overlapping(start, end)]
+            body = json.dumps({"blocked_slots": blocked_slots}).encode()
+            availability_cache.put(key, body, generation)
+        
+        return Response(content=body, media_type="application/json", headers=validator_headers(etag))
+    except Exception as e:
+        logger.error(f"Error getting availability: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@api_router.get("/bookings/calendar")
+async def get_booking_calendar(
+    month: str = Query(..., pattern=r"^\d{4}-(0[1-9]|1[0-2])$"),
+    service_type: Optional[str] = None,
+    slot_minutes: int = Query(CALENDAR_SLOT_MINUTES, ge=5, le=1440),
+    etag: str = Depends(conditional_get("bookings"))
+):
+    """Get per-day occupancy bitmaps for one month (YYYY-MM), base64 encoded"""
+    if 1440 % slot_minutes:
+        raise HTTPException(status_code=400, detail="slot_minutes must divide a day evenly")
+    try:
+        key = (month, service_type, slot_minutes)
+        body = calendar_cache.get(key)
+        if body is None:
+            generation = calendar_cache.generation
+            year, month_number = (int(part) for part in month.split("-"))
+            calendar = month_calendar(booking_index, year, month_number, service_type, slot_minutes)
+            body = json.dumps(calendar).encode()
+            calendar_cache.put(key, body, generation)
         
-        return bookings
+        return Response(content=body, media_type="application/json", headers=validator_headers(etag))
+    except Exception as e:
+        logger.error(f"Error getting booking calendar: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@api_router.get("/bookings", response_model=List[Booking])
+async def get_all_bookings(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    status: Optional[str] = None,
+    service_type: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    q: Optional[str] = Query(None, max_length=200),
+    admin: dict = Depends(get_current_admin),
+    etag: str = Depends(conditional_get("bookings"))
+):
+    """Get bookings newest first, one page at a time, filtered in the database (admin endpoint - protected)"""
+    try:
+        query = list_filter(q, status=status, service_type=service_type)
+        # booking_date range: date_from inclusive, date_to exclusive
+        date_range = {}
+        if date_from:
+            date_range["$gte"] = as_utc(date_from)
+        if date_to:
+            date_range["$lt"] = as_utc(date_to)
+        if date_range:
+            query["booking_date"] = date_range
+        return await list_page(db.bookings, Booking, query, response, limit, after, format)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting bookings: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -193,7 +626,18 @@ async def get_all_bookings(admin: dict = Depends(get_current_admin)):
 
 # Contact Form Endpoints
 @api_router.post("/contact", response_model=ContactFormEntry)
-async def submit_contact_form(contact_input: ContactFormSubmit):
+async def submit_contact_form(
+    contact_input: ContactFormSubmit,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, min_length=1, max_length=255)
+):
+    """Submit contact form; a retry with the same Idempotency-Key gets the original response"""
+    if idempotency_key is None:
+        return await insert_contact_form(contact_input)
+    return await idempotent(response, "contact", idempotency_key, contact_input, lambda: insert_contact_form(contact_input))
+
+
+async def insert_contact_form(contact_input: ContactFormSubmit) -> ContactFormEntry:
     """Submit contact form and send email notification"""
     try:
         # Create contact form entry
@@ -202,16 +646,22 @@ async def submit_contact_form(contact_input: ContactFormSubmit):
         
         # Save to database
         doc = contact_entry.model_dump()
-        doc['created_at'] = doc['created_at'].isoformat()
         
         await db.contact_forms.insert_one(doc)
+        versions.bump("contact_forms")
+        
+        try:
+            await counters.contact_created(contact_entry.status)
+        except Exception as e:
+            logger.error(f"Failed to update counters for contact form {contact_entry.id}: {str(e)}")
+        broker.publish_local(CONTACT_SUBMITTED, contact_entry.model_dump(mode="json"))
         
-        # Send email notification to business owner
+        # Queue email notification to business owner
         try:
-            await email_service.send_contact_form_notification(contact_entry.model_dump())
-            logger.info(f"Contact form submitted and email sent for {contact_entry.email}")
+            await outbox.enqueue("contact_notification", contact_entry.model_dump())
+            logger.info(f"Contact form submitted and email queued for {contact_entry.email}")
         except Exception as e:
-            logger.error(f"Failed to send email for contact form {contact_entry.id}: {str(e)}")
+            logger.error(f"Failed to queue email for contact form {contact_entry.id}: {str(e)}")
             # Continue even if email fails
         
         return contact_entry
@@ -221,17 +671,23 @@ async def submit_contact_form(contact_input: ContactFormSubmit):
 
 
 @api_router.get("/contact", response_model=List[ContactFormEntry])
-async def get_contact_forms(admin: dict = Depends(get_current_admin)):
-    """Get all contact form submissions (admin endpoint - protected)"""
+async def get_contact_forms(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    status: Optional[str] = None,
+    service: Optional[str] = None,
+    q: Optional[str] = Query(None, max_length=200),
+    admin: dict = Depends(get_current_admin),
+    etag: str = Depends(conditional_get("contact_forms"))
+):
+    """Get contact form submissions newest first, one page at a time, filtered in the database (admin endpoint - protected)"""
     try:
-        contacts = await db.contact_forms.find({}, {"_id": 0}).to_list(1000)
-        
-        # Convert ISO strings back to datetime
-        for contact in contacts:
-            if isinstance(contact['created_at'], str):
-                contact['created_at'] = datetime.fromisoformat(contact['created_at'])
-        
-        return contacts
+        query = list_filter(q, status=status, service=service)
+        return await list_page(db.contact_forms, ContactFormEntry, query, response, limit, after, format)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting contact forms: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -239,15 +695,33 @@ async def get_contact_forms(admin: dict = Depends(get_current_admin)):
 
 # Admin Authentication Endpoints
 @api_router.post("/admin/login", response_model=TokenResponse)
-async def admin_login(login_data: AdminLogin):
+async def admin_login(login_data: AdminLogin, request: Request):
     """Admin login endpoint"""
-    if not authenticate_admin(login_data.username, login_data.password):
+    ip = client_ip(request)
+    retry_after = login_ip_limiter.hit(ip) or login_user_limiter.hit((login_data.username, ip))
+    if retry_after:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many login attempts, try again later",
+            headers={"Retry-After": str(int(retry_after) + 1)},
+        )
+    
+    if not await authenticate_admin_async(login_data.username, login_data.password):
         raise HTTPException(status_code=401, detail="Invalid username or password")
     
+    login_user_limiter.reset((login_data.username, ip))
+    
     access_token = create_access_token(data={"sub": login_data.username, "role": "admin"})
     return {"access_token": access_token, "token_type": "bearer"}
 
 
+@api_router.post("/admin/logout")
+async def admin_logout(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Revoke the current admin token"""
+    revoke_token(credentials.credentials)
+    return {"success": True}
+
+
 @api_router.get("/admin/verify")
 async def verify_admin(admin: dict = Depends(get_current_admin)):
     """Verify admin token"""
@@ -267,44 +741,120 @@ async def update_booking_status(
         if status_update.status not in valid_statuses:
             raise HTTPException(status_code=400, detail=f"Invalid status. Must be one of: {valid_statuses}")
         
-        result = await db.bookings.update_one(
-            {"id": booking_id},
-            {"$set": {"status": status_update.status}}
-        )
-        
-        if result.matched_count == 0:
+        booking = await db.bookings.find_one({"id": booking_id}, BOOKING_INDEX_PROJECTION)
+        if booking is None:
             raise HTTPException(status_code=404, detail="Booking not found")
         
+        replaced = {}
+        
+        async def set_status():
+            # The pre-image gives the status actually replaced, even under concurrent updates
+            previous = await db.bookings.find_one_and_update(
+                {"id": booking_id}, {"$set": {"status": status_update.status}}, {"_id": 0, "status": 1}
+            )
+            if previous is not None:
+                replaced["status"] = previous.get("status")
+                try:
+                    await counters.booking_status_changed(previous.get("status"), status_update.status)
+                except Exception as e:
+                    logger.error(f"Failed to update counters for booking {booking_id}: {str(e)}")
+        
+        async def restore_status():
+            if "status" in replaced:
+                await db.bookings.update_one(
+                    {"id": booking_id, "status": status_update.status}, {"$set": {"status": replaced["status"]}}
+                )
+                try:
+                    await counters.booking_status_changed(status_update.status, replaced["status"])
+                except Exception as e:
+                    logger.error(f"Failed to update counters for booking {booking_id}: {str(e)}")
+        
+        if status_update.status == "cancelled":
+            await set_status()
+            booking_index.remove(booking_id)
+        else:
+            # Reactivating a cancelled booking must not double-book its slot
+            await reservations.reserve(booking, set_status, undo=restore_status)
+        bookings_changed()
+        broker.publish_local(BOOKING_STATUS_CHANGED, {"id": booking_id, "status": status_update.status})
+        
         return {"success": True, "message": f"Booking status updated to {status_update.status}"}
+    except BookingConflict as e:
+        raise HTTPException(status_code=409, detail=booking_conflict_detail(e))
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error updating booking status: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @api_router.get("/admin/stats")
-async def get_admin_stats(admin: dict = Depends(get_current_admin)):
+async def get_admin_stats(
+    admin: dict = Depends(get_current_admin),
+    etag: str = Depends(conditional_get("bookings", "contact_forms", "counters"))
+):
     """Get dashboard statistics"""
     try:
-        total_bookings = await db.bookings.count_documents({})
-        pending_bookings = await db.bookings.count_documents({"status": "pending"})
-        confirmed_bookings = await db.bookings.count_documents({"status": "confirmed"})
-        completed_bookings = await db.bookings.count_documents({"status": "completed"})
-        total_contacts = await db.contact_forms.count_documents({})
-        new_contacts = await db.contact_forms.count_documents({"status": "new"})
-        
+        current = await counters.read()
+        bookings = current["bookings"]
+        contacts = current["contacts"]
+
         return {
-            "total_bookings": total_bookings,
-            "pending_bookings": pending_bookings,
-            "confirmed_bookings": confirmed_bookings,
-            "completed_bookings": completed_bookings,
-            "total_contacts": total_contacts,
-            "new_contacts": new_contacts
+            "total_bookings": bookings.get("total", 0),
+            "pending_bookings": bookings.get("pending", 0),
+            "confirmed_bookings": bookings.get("confirmed", 0),
+            "completed_bookings": bookings.get("completed", 0),
+            "total_contacts": contacts.get("total", 0),
+            "new_contacts": contacts.get("new", 0)
         }
     except Exception as e:
         logger.error(f"Error getting stats: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@api_router.get("/admin/events")
+async def stream_admin_events(admin: dict = Depends(get_current_admin)):
+    """Push new bookings, status changes and contact forms (Server-Sent Events)"""
+    return StreamingResponse(
+        broker.subscribe(stop=shutdown_event),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@api_router.get("/admin/cache")
+async def get_cache_stats(admin: dict = Depends(get_current_admin)):
+    """Get availability and calendar cache hit/miss counters"""
+    return {"availability": availability_cache.stats(), "calendar": calendar_cache.stats()}
+
+
+@api_router.get("/admin/outbox")
+async def get_outbox_stats(admin: dict = Depends(get_current_admin)):
+    """Get email outbox queue depth and lag"""
+    try:
+        return await outbox.stats()
+    except Exception as e:
+        logger.error(f"Error getting outbox stats: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Static bearer token for Prometheus scrapers, which cannot renew an 8h admin JWT
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+
+async def get_metrics_reader(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Accept the METRICS_TOKEN, if configured, or an admin token"""
+    if METRICS_TOKEN and secrets.compare_digest(credentials.credentials.encode(), METRICS_TOKEN.encode()):
+        return {"sub": "metrics"}
+    return await get_current_admin(credentials)
+
+
+@api_router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics(reader: dict = Depends(get_metrics_reader)):
+    """Request, MongoDB, SMTP and auth timings in the Prometheus text format"""
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
 # Include the router in the main app
 app.include_router(api_router)
 
@@ -314,15 +864,16 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
+# Added last so it is outermost and CORS preflights and 404s are counted as
+# well; the SSE stream stays open for minutes and would skew the latencies
+app.add_middleware(MetricsMiddleware, untimed_routes={"/api/admin/events"})
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
-
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
\ No newline at end of file
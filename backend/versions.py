@@ -0,0 +1,42 @@
+import hashlib
+import uuid
+from collections import defaultdict
+from typing import Dict, Iterable, Optional
+
+
+class ChangeVersions:
+    """Per-collection change counters used to build strong ETags.
+
+    Every write path bumps the collections it touched. An ETag combines a
+    random per-process epoch (so tags never survive a restart), the
+    versions of the collections a response is built from and a digest of
+    the request variant (query string), so equal tags imply byte-equal
+    responses.
+    """
+
+    def __init__(self):
+        self.epoch = uuid.uuid4().hex[:12]
+        self._versions: Dict[str, int] = defaultdict(int)
+
+    def bump(self, *collections: str) -> None:
+        for collection in collections:
+            self._versions[collection] += 1
+
+    def get(self, collection: str) -> int:
+        return self._versions[collection]
+
+    def etag(self, collections: Iterable[str], variant: str = "") -> str:
+        state = ".".join(str(self._versions[collection]) for collection in collections)
+        digest = hashlib.blake2s(variant.encode(), digest_size=6).hexdigest()
+        return f'"{self.epoch}-{state}-{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match comparison (weak, as RFC 9110 requires for GET)"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
@@ -6,17 +6,71 @@ import { Input } from '../components/ui/input';
 import { Textarea } from '../components/ui/textarea';
 import { toast } from 'sonner';
 import axios from 'axios';
+import { idempotentPost } from '../lib/idempotentPost';
 import { Calendar as CalendarIcon, Clock, MapPin, Car, X } from 'lucide-react';
-import { format, addHours, isBefore, startOfDay } from 'date-fns';
+import { format, addMonths, isBefore, startOfDay, startOfMonth } from 'date-fns';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
 
+const HOURS = Array.from({ length: 24 }, (_, i) => i);
+
+const decodeBitmap = (encoded) => Uint8Array.from(atob(encoded), (c) => c.charCodeAt(0));
+
+const zoneFormats = {};
+
+// Calendar date and minute of the day of an instant in an IANA time zone
+const zonedParts = (instant, timeZone) => {
+  if (!zoneFormats[timeZone]) {
+    zoneFormats[timeZone] = new Intl.DateTimeFormat('en-US', {
+      timeZone,
+      hourCycle: 'h23',
+      year: 'numeric',
+      month: '2-digit',
+      day: '2-digit',
+      hour: '2-digit',
+      minute: '2-digit'
+    });
+  }
+  const parts = Object.fromEntries(zoneFormats[timeZone].formatToParts(instant).map(({ type, value }) => [type, value]));
+  return {
+    year: Number(parts.year),
+    month: Number(parts.month),
+    day: Number(parts.day),
+    minute: (Number(parts.hour) % 24) * 60 + Number(parts.minute)
+  };
+};
+
+// True when no booked slot overlaps [start, start + minutes). The day
+// bitmaps are laid out in the business time zone (calendar.timezone), so
+// the instant is placed there rather than in the browser's zone. Days whose
+// month is not loaded count as free; the server still rejects a conflicting
+// booking with 409.
+const isRangeFree = (calendar, start, minutes) => {
+  const { year, month, day, minute } = zonedParts(start, calendar.timezone);
+  const slotsPerDay = 1440 / calendar.slotMinutes;
+  const first = Math.floor(minute / calendar.slotMinutes);
+  const last = Math.ceil((minute + minutes) / calendar.slotMinutes);
+  for (let dayOffset = 0; dayOffset * slotsPerDay < last; dayOffset += 1) {
+    const date = new Date(Date.UTC(year, month - 1, day + dayOffset));
+    const key = `${date.getUTCFullYear()}-${String(date.getUTCMonth() + 1).padStart(2, '0')}`;
+    const bitmap = calendar.months[key]?.[date.getUTCDate() - 1];
+    if (!bitmap) continue;
+    const from = Math.max(first - dayOffset * slotsPerDay, 0);
+    const to = Math.min(last - dayOffset * slotsPerDay, slotsPerDay);
+    for (let slot = from; slot < to; slot += 1) {
+      if (bitmap[slot >> 3] & (0x80 >> (slot & 7))) return false;
+    }
+  }
+  return true;
+};
+
 const CarBookingModal = ({ isOpen, onClose }) => {
   const [step, setStep] = useState(1);
   const [selectedDate, setSelectedDate] = useState(null);
   const [selectedTime, setSelectedTime] = useState('09:00');
-  const [blockedSlots, setBlockedSlots] = useState([]);
+  const [visibleMonth, setVisibleMonth] = useState(() => startOfMonth(new Date()));
+  const [calendar, setCalendar] = useState(null);
   const [loading, setLoading] = useState(false);
   
   const [formData, setFormData] = useState({
@@ -50,47 +104,48 @@ const CarBookingModal = ({ isOpen, onClose }) => {
   };
 
   useEffect(() => {
-    if (isOpen) {
+    if (isOpen && formData.serviceType) {
       fetchAvailability();
     }
-  }, [isOpen]);
+  }, [isOpen, formData.serviceType, visibleMonth]);
 
   const fetchAvailability = async () => {
     try {
-      const today = new Date();
-      const endDate = new Date();
-      endDate.setMonth(endDate.getMonth() + 2);
+      // The shown month plus its neighbours: bookings run past month end, and
+      // the business time zone's day can differ from the browser's
+      const months = [-1, 0, 1].map((offset) => format(addMonths(visibleMonth, offset), 'yyyy-MM'));
+      const responses = await Promise.all(months.map((month) =>
+        axios.get(`${API}/bookings/calendar`, {
+          params: { month, service_type: formData.serviceType }
+        })
+      ));
       
-      const response = await axios.get(`${API}/bookings/availability`, {
-        params: {
-          start_date: today.toISOString(),
-          end_date: endDate.toISOString()
-        }
+      setCalendar((prev) => {
+        const keep = prev?.serviceType === formData.serviceType ? prev.months : {};
+        const loaded = Object.fromEntries(responses.map(({ data }) => [data.month, data.days.map(decodeBitmap)]));
+        return {
+          serviceType: formData.serviceType,
+          slotMinutes: responses[0].data.slot_minutes,
+          timezone: responses[0].data.timezone,
+          months: { ...keep, ...loaded }
+        };
       });
-      
-      setBlockedSlots(response.data.blocked_slots);
     } catch (error) {
       console.error('Error fetching availability:', error);
     }
   };
 
-  const isDateBlocked = (date) => {
-    if (!selectedDate || !formData.durationHours) return false;
-    
-    const checkStart = new Date(date);
-    checkStart.setHours(0, 0, 0, 0);
-    const checkEnd = new Date(checkStart);
-    checkEnd.setHours(23, 59, 59, 999);
-    
-    return blockedSlots.some(slot => {
-      const slotStart = new Date(slot.start);
-      const slotEnd = new Date(slot.end);
-      
-      // Check if there's any overlap
-      return (checkStart <= slotEnd && checkEnd >= slotStart);
-    });
+  const isTimeBlocked = (date, hour) => {
+    if (!calendar || calendar.serviceType !== formData.serviceType || !formData.durationHours) return false;
+    // Same instant handleSubmit books: the hour on the chosen day, browser time
+    const start = new Date(date);
+    start.setHours(hour, 0, 0, 0);
+    return !isRangeFree(calendar, start, formData.durationHours * 60);
   };
 
+  // A date is unavailable when the package fits at none of the start times
+  const isDateBlocked = (date) => HOURS.every((hour) => isTimeBlocked(date, hour));
+
   const handleInputChange = (e) => {
     const { name, value } = e.target;
     setFormData(prev => ({ ...prev, [name]: value }));
@@ -144,7 +199,7 @@ const CarBookingModal = ({ isOpen, onClose }) => {
         message: formData.message || null
       };
 
-      await axios.post(`${API}/bookings`, bookingData);
+      await idempotentPost(`${API}/bookings`, bookingData);
       
       toast.success('Booking confirmed! Check your email for details.');
       
@@ -167,7 +222,18 @@ const CarBookingModal = ({ isOpen, onClose }) => {
       fetchAvailability(); // Refresh availability
     } catch (error) {
       console.error('Booking error:', error);
-      toast.error('Failed to create booking. Please try again.');
+      const conflict = error.response?.data?.detail?.conflict;
+      if (error.response?.status === 409 && !conflict) {
+        // Same Idempotency-Key still in flight; submitting again reuses it
+        toast.error('Your booking is still being processed. Please wait a moment and try again.');
+      } else if (error.response?.status === 409) {
+        toast.error(
+          `That time is already booked (${format(new Date(conflict.start), 'PPp')} - ${format(new Date(conflict.end), 'PPp')}). Please choose another slot.`
+        );
+        fetchAvailability();
+      } else {
+        toast.error('Failed to create booking. Please try again.');
+      }
     } finally {
       setLoading(false);
     }
@@ -267,6 +333,8 @@ const CarBookingModal = ({ isOpen, onClose }) => {
                     mode="single"
                     selected={selectedDate}
                     onSelect={setSelectedDate}
+                    month={visibleMonth}
+                    onMonthChange={setVisibleMonth}
                     disabled={(date) => {
                       const today = startOfDay(new Date());
                       return isBefore(date, today) || isDateBlocked(date);
@@ -288,11 +356,12 @@ const CarBookingModal = ({ isOpen, onClose }) => {
                     onChange={(e) => setSelectedTime(e.target.value)}
                     className="w-full px-3 py-2 border border-slate-300 rounded-md"
                   >
-                    {Array.from({ length: 24 }, (_, i) => {
+                    {HOURS.map((i) => {
                       const hour = i.toString().padStart(2, '0');
+                      const booked = isTimeBlocked(selectedDate, i);
                       return (
-                        <option key={i} value={`${hour}:00`}>
-                          {format(new Date().setHours(i, 0), 'h:00 a')}
+                        <option key={i} value={`${hour}:00`} disabled={booked}>
+                          {format(new Date().setHours(i, 0), 'h:00 a')}{booked ? ' (booked)' : ''}
                         </option>
                       );
                     })}
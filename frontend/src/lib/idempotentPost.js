@@ -0,0 +1,33 @@
+import axios from 'axios';
+
+// One Idempotency-Key per URL while the same payload is being submitted, so
+// a retry after a dropped connection or a second click cannot create a
+// second booking or contact message. A changed payload gets a new key.
+const pendingKeys = new Map();
+
+const newKey = () =>
+  (window.crypto?.randomUUID
+    ? window.crypto.randomUUID()
+    : `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`);
+
+export async function idempotentPost(url, data, retries = 2) {
+  const body = JSON.stringify(data);
+  let pending = pendingKeys.get(url);
+  if (!pending || pending.body !== body) {
+    pending = { body, key: newKey() };
+    pendingKeys.set(url, pending);
+  }
+
+  for (let attempt = 0; ; attempt += 1) {
+    try {
+      const res = await axios.post(url, data, { headers: { 'Idempotency-Key': pending.key } });
+      pendingKeys.delete(url);
+      return res;
+    } catch (error) {
+      // Only retry when no response arrived; the server answers a replay
+      // with the original response instead of running the request again
+      if (error.response || attempt >= retries) throw error;
+      await new Promise((resolve) => setTimeout(resolve, 1000 * 2 ** attempt));
+    }
+  }
+}
@@ -1,8 +1,9 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { Button } from '../components/ui/button';
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '../components/ui/card';
 import { Badge } from '../components/ui/badge';
+import { Input } from '../components/ui/input';
 import { toast } from 'sonner';
 import axios from 'axios';
 import { format } from 'date-fns';
@@ -16,21 +17,66 @@ import {
   LogOut,
   TrendingUp,
   MessageSquare,
+  Search,
   Car,
   BarChart3
 } from 'lucide-react';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
+const PAGE_SIZE = 50;
+
+// Load one page; next is the X-Next-Cursor for the following page, if any
+const fetchPage = async (url, headers, filters = {}, after = null) => {
+  const res = await axios.get(url, {
+    headers,
+    params: after ? { ...filters, limit: PAGE_SIZE, after } : { ...filters, limit: PAGE_SIZE }
+  });
+  return { rows: res.data, next: res.headers['x-next-cursor'] || null };
+};
+
+// Read a Server-Sent Events stream with fetch (EventSource cannot send the
+// Authorization header) and call onEvent(type, data) per message
+const streamEvents = async (url, token, onEvent, signal) => {
+  const res = await fetch(url, { headers: { Authorization: `Bearer ${token}` }, signal });
+  if (!res.ok || !res.body) throw new Error(`Event stream failed: ${res.status}`);
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) return;
+    buffer += decoder.decode(value, { stream: true });
+    let end;
+    while ((end = buffer.indexOf('\n\n')) !== -1) {
+      const message = buffer.slice(0, end);
+      buffer = buffer.slice(end + 2);
+      let type = 'message';
+      let data = '';
+      for (const line of message.split('\n')) {
+        if (line.startsWith('event:')) type = line.slice(6).trim();
+        else if (line.startsWith('data:')) data += line.slice(5).trim();
+      }
+      if (data) onEvent(type, JSON.parse(data));
+    }
+  }
+};
 
 const AdminDashboard = () => {
   const [stats, setStats] = useState(null);
   const [bookings, setBookings] = useState([]);
   const [contacts, setContacts] = useState([]);
+  const [bookingsNext, setBookingsNext] = useState(null);
+  const [contactsNext, setContactsNext] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [activeTab, setActiveTab] = useState('overview');
   const [loading, setLoading] = useState(true);
   const [filterStatus, setFilterStatus] = useState('all');
+  const [search, setSearch] = useState('');
   const navigate = useNavigate();
+  // Current filters for the event handler, which outlives a single render
+  const filtersRef = useRef({ status: filterStatus, search });
+  filtersRef.current = { status: filterStatus, search };
 
   useEffect(() => {
     const initDashboard = async () => {
@@ -41,6 +87,28 @@ const AdminDashboard = () => {
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, []);
 
+  // Live updates: new bookings and contacts are pushed by the server
+  useEffect(() => {
+    const token = localStorage.getItem('admin_token');
+    if (!token) return undefined;
+    const controller = new AbortController();
+    let retry;
+
+    const connect = () => {
+      streamEvents(`${API}/admin/events`, token, handleEvent, controller.signal)
+        .catch(() => {})
+        .finally(() => {
+          if (!controller.signal.aborted) retry = setTimeout(connect, 3000);
+        });
+    };
+    connect();
+    return () => {
+      controller.abort();
+      clearTimeout(retry);
+    };
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, []);
+
   const verifyAuth = async () => {
     const token = localStorage.getItem('admin_token');
     if (!token) {
@@ -58,6 +126,60 @@ const AdminDashboard = () => {
     }
   };
 
+  // Filtering happens server-side; only matching bookings are downloaded
+  const bookingFilters = (status = filterStatus) => {
+    const filters = {};
+    if (status !== 'all') filters.status = status;
+    if (search.trim()) filters.q = search.trim();
+    return filters;
+  };
+
+  const fetchBookings = async (status = filterStatus) => {
+    const token = localStorage.getItem('admin_token');
+    try {
+      const page = await fetchPage(`${API}/bookings`, { Authorization: `Bearer ${token}` }, bookingFilters(status));
+      setBookings(page.rows);
+      setBookingsNext(page.next);
+    } catch (error) {
+      console.error('Error fetching bookings:', error);
+      toast.error('Failed to load bookings');
+    }
+  };
+
+  // Append the next page of bookings or contacts
+  const loadMore = async (kind) => {
+    const token = localStorage.getItem('admin_token');
+    const isBookings = kind === 'bookings';
+    setLoadingMore(true);
+    try {
+      const page = await fetchPage(
+        `${API}/${isBookings ? 'bookings' : 'contact'}`,
+        { Authorization: `Bearer ${token}` },
+        isBookings ? bookingFilters() : {},
+        isBookings ? bookingsNext : contactsNext
+      );
+      // Live events may already have added some of these rows
+      const append = (prev) => [...prev, ...page.rows.filter((row) => !prev.some((p) => p.id === row.id))];
+      if (isBookings) {
+        setBookings(append);
+        setBookingsNext(page.next);
+      } else {
+        setContacts(append);
+        setContactsNext(page.next);
+      }
+    } catch (error) {
+      console.error(`Error loading more ${kind}:`, error);
+      toast.error(`Failed to load more ${kind}`);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  const changeFilterStatus = (status) => {
+    setFilterStatus(status);
+    fetchBookings(status);
+  };
+
   const fetchData = async () => {
     const token = localStorage.getItem('admin_token');
     setLoading(true);
@@ -67,17 +189,16 @@ const AdminDashboard = () => {
         axios.get(`${API}/admin/stats`, {
           headers: { Authorization: `Bearer ${token}` }
         }),
-        axios.get(`${API}/bookings`, {
-          headers: { Authorization: `Bearer ${token}` }
-        }),
-        axios.get(`${API}/contact`, {
-          headers: { Authorization: `Bearer ${token}` }
-        })
+        fetchPage(`${API}/bookings`, { Authorization: `Bearer ${token}` }, bookingFilters()),
+        fetchPage(`${API}/contact`, { Authorization: `Bearer ${token}` })
       ]);
 
+      // The API already returns rows newest first
       setStats(statsRes.data);
-      setBookings(bookingsRes.data.sort((a, b) => new Date(b.created_at) - new Date(a.created_at)));
-      setContacts(contactsRes.data.sort((a, b) => new Date(b.created_at) - new Date(a.created_at)));
+      setBookings(bookingsRes.rows);
+      setBookingsNext(bookingsRes.next);
+      setContacts(contactsRes.rows);
+      setContactsNext(contactsRes.next);
     } catch (error) {
       console.error('Error fetching data:', error);
       toast.error('Failed to load dashboard data');
@@ -86,7 +207,47 @@ const AdminDashboard = () => {
     }
   };
 
+  const fetchStats = async () => {
+    const token = localStorage.getItem('admin_token');
+    try {
+      const res = await axios.get(`${API}/admin/stats`, {
+        headers: { Authorization: `Bearer ${token}` }
+      });
+      setStats(res.data);
+    } catch (error) {
+      console.error('Error fetching stats:', error);
+    }
+  };
+
+  const handleEvent = (type, data) => {
+    const { status, search: query } = filtersRef.current;
+    if (type === 'booking_created') {
+      // A search is matched server-side, so searched lists are left alone
+      if ((status === 'all' || status === data.status) && !query.trim()) {
+        setBookings((prev) => (prev.some((b) => b.id === data.id) ? prev : [data, ...prev]));
+      }
+      toast.info(`New booking from ${data.name}`);
+      fetchStats();
+    } else if (type === 'booking_status_changed') {
+      setBookings((prev) => prev
+        .map((b) => (b.id === data.id ? { ...b, status: data.status } : b))
+        .filter((b) => status === 'all' || b.status === status));
+      fetchStats();
+    } else if (type === 'contact_submitted') {
+      setContacts((prev) => (prev.some((c) => c.id === data.id) ? prev : [data, ...prev]));
+      toast.info(`New message from ${data.name}`);
+      fetchStats();
+    } else if (type === 'resync') {
+      fetchData();
+    }
+  };
+
   const handleLogout = () => {
+    const token = localStorage.getItem('admin_token');
+    // Revoke server-side too; the local logout does not wait for it
+    axios.post(`${API}/admin/logout`, null, {
+      headers: { Authorization: `Bearer ${token}` }
+    }).catch(() => {});
     localStorage.removeItem('admin_token');
     toast.success('Logged out successfully');
     navigate('/admin/login');
@@ -135,9 +296,13 @@ const AdminDashboard = () => {
     return names[serviceType] || serviceType;
   };
 
-  const filteredBookings = filterStatus === 'all' 
-    ? bookings 
-    : bookings.filter(b => b.status === filterStatus);
+  const loadMoreButton = (kind, next) => next && (
+    <div className="flex justify-center">
+      <Button onClick={() => loadMore(kind)} variant="outline" size="sm" disabled={loadingMore}>
+        {loadingMore ? 'Loading...' : 'Load more'}
+      </Button>
+    </div>
+  );
 
   if (loading) {
     return (
@@ -251,7 +416,7 @@ const AdminDashboard = () => {
                   : 'border-transparent text-slate-600 hover:text-slate-900'
               }`}
             >
-              Bookings ({bookings.length})
+              Bookings ({stats ? stats.total_bookings : bookings.length})
             </button>
             <button
               onClick={() => setActiveTab('contacts')}
@@ -261,7 +426,7 @@ const AdminDashboard = () => {
                   : 'border-transparent text-slate-600 hover:text-slate-900'
               }`}
             >
-              Contacts ({contacts.length})
+              Contacts ({stats ? stats.total_contacts : contacts.length})
             </button>
           </div>
         </div>
@@ -332,7 +497,7 @@ const AdminDashboard = () => {
               {['all', 'pending', 'confirmed', 'completed', 'cancelled'].map((status) => (
                 <Button
                   key={status}
-                  onClick={() => setFilterStatus(status)}
+                  onClick={() => changeFilterStatus(status)}
                   variant={filterStatus === status ? 'default' : 'outline'}
                   className={filterStatus === status ? 'bg-slate-900' : ''}
                   size="sm"
@@ -340,9 +505,27 @@ const AdminDashboard = () => {
                   {status.charAt(0).toUpperCase() + status.slice(1)}
                 </Button>
               ))}
+              <form
+                className="ml-auto flex gap-2"
+                onSubmit={(e) => {
+                  e.preventDefault();
+                  fetchBookings();
+                }}
+              >
+                <Input
+                  value={search}
+                  onChange={(e) => setSearch(e.target.value)}
+                  placeholder="Search name, email, phone, message"
+                  className="w-72"
+                />
+                <Button type="submit" variant="outline" size="sm" className="flex items-center gap-2">
+                  <Search className="h-4 w-4" />
+                  Search
+                </Button>
+              </form>
             </div>
 
-            {filteredBookings.length === 0 ? (
+            {bookings.length === 0 ? (
               <Card>
                 <CardContent className="py-12">
                   <p className="text-slate-600 text-center">No bookings found</p>
@@ -350,7 +533,7 @@ const AdminDashboard = () => {
               </Card>
             ) : (
               <div className="space-y-4">
-                {filteredBookings.map((booking) => (
+                {bookings.map((booking) => (
                   <Card key={booking.id}>
                     <CardContent className="pt-6">
                       <div className="grid md:grid-cols-2 gap-6">
@@ -420,6 +603,7 @@ const AdminDashboard = () => {
                     </CardContent>
                   </Card>
                 ))}
+                {loadMoreButton('bookings', bookingsNext)}
               </div>
             )}
           </div>
@@ -462,6 +646,7 @@ const AdminDashboard = () => {
                 </Card>
               ))
             )}
+            {loadMoreButton('contacts', contactsNext)}
           </div>
         )}
       </div>
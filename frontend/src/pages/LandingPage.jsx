@@ -6,7 +6,7 @@ import { Textarea } from '../components/ui/textarea';
 import { toast } from 'sonner';
 import { images } from '../config/images';
 import CarBookingModal from '../components/CarBookingModal';
-import axios from 'axios';
+import { idempotentPost } from '../lib/idempotentPost';
 import {
   Car,
   Monitor,
@@ -66,7 +66,7 @@ const LandingPage = () => {
 
     setSubmittingForm(true);
     try {
-      await axios.post(`${API}/contact`, {
+      await idempotentPost(`${API}/contact`, {
         name: formData.name,
         email: formData.email,
         phone: formData.phone || null,
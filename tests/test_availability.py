@@ -0,0 +1,244 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import mongomock
+import pytest
+
+from availability import (
+    BookingConflict,
+    BookingIntervalIndex,
+    BookingReservations,
+    stored_overlap_query,
+)
+
+CAR_SERVICES = ["car-with-driver", "car-self-drive"]
+DAY = datetime(2030, 5, 1, tzinfo=timezone.utc)
+
+
+def at(hour: float) -> datetime:
+    return DAY + timedelta(hours=hour)
+
+
+def booking(booking_id: str, start: float, end: float = None, service_type: str = "car-self-drive", **fields) -> dict:
+    """A booking document from start to end, in hours after DAY; no end means no booking_end_date"""
+    document = {"id": booking_id, "service_type": service_type, "booking_date": at(start), "status": "confirmed"}
+    if end is not None:
+        document["booking_end_date"] = at(end)
+    document.update(fields)
+    return document
+
+
+def overlapping_ids(index: BookingIntervalIndex, start: float, end: float, service_types=None) -> list:
+    return [entry.id for entry in index.overlapping(at(start), at(end), service_types)]
+
+
+@pytest.fixture
+def index():
+    index = BookingIntervalIndex()
+    index.load([
+        booking("morning", 8, 10),
+        booking("noon", 12, 14),
+        booking("instant", 16),
+        booking("long", -20, 11),
+        booking("computer", 9, 10, service_type="computer"),
+    ])
+    return index
+
+
+def test_overlapping_orders_matches_by_start(index):
+    assert overlapping_ids(index, 9, 13) == ["long", "morning", "computer", "noon"]
+
+
+def test_overlapping_excludes_adjacent_windows(index):
+    assert overlapping_ids(index, 14, 15) == []
+    assert overlapping_ids(index, 11, 12) == []
+    assert overlapping_ids(index, 10, 12, CAR_SERVICES) == ["long"]
+
+
+def test_overlapping_finds_long_booking_starting_well_before_window(index):
+    assert overlapping_ids(index, 10.5, 11) == ["long"]
+
+
+def test_overlapping_filters_service_types(index):
+    assert overlapping_ids(index, 9, 10, CAR_SERVICES) == ["long", "morning"]
+    assert overlapping_ids(index, 9, 10, ["computer"]) == ["computer"]
+
+
+def test_overlapping_empty_window(index):
+    assert overlapping_ids(index, 13, 13) == []
+    assert overlapping_ids(index, 13, 12) == []
+
+
+def test_booking_without_end_is_an_instant(index):
+    assert overlapping_ids(index, 16, 17) == ["instant"]
+    assert overlapping_ids(index, 15, 16.5) == ["instant"]
+    assert overlapping_ids(index, 15, 16) == []
+
+
+def test_add_replaces_and_remove_forgets(index):
+    index.add(booking("noon", 18, 19))
+    assert overlapping_ids(index, 12, 14) == []
+    assert overlapping_ids(index, 18, 19) == ["noon"]
+    index.remove("noon")
+    index.remove("unknown")
+    assert "noon" not in index
+    assert overlapping_ids(index, 18, 19) == []
+    assert len(index) == 4
+
+
+@pytest.fixture
+def stored():
+    collection = mongomock.MongoClient(tz_aware=True).db.bookings
+    collection.insert_many([
+        booking("morning", 8, 10),
+        booking("noon", 12, 14, service_type="car-with-driver"),
+        booking("instant", 16),
+        booking("cancelled", 8, 20, status="cancelled"),
+        booking("computer", 8, 20, service_type="computer"),
+    ])
+    return collection
+
+
+def stored_ids(collection, candidate: dict) -> list:
+    query = stored_overlap_query(BookingIntervalIndex.interval_for(candidate), CAR_SERVICES)
+    return sorted(document["id"] for document in collection.find(query))
+
+
+@pytest.mark.parametrize("candidate, expected", [
+    # Adjacent windows touch but do not overlap
+    (booking("new", 10, 12), []),
+    (booking("new", 6, 8), []),
+    (booking("new", 14, 15), []),
+    # Overlapping windows, across services of the same resource
+    (booking("new", 9, 13), ["morning", "noon"]),
+    (booking("new", 13.5, 18), ["instant", "noon"]),
+    (booking("new", 7, 8.5), ["morning"]),
+    # Bookings without an end date occupy their start instant
+    (booking("new", 15, 16), []),
+    (booking("new", 15, 17), ["instant"]),
+    (booking("new", 16), ["instant"]),
+    (booking("new", 9), ["morning"]),
+    (booking("new", 10), []),
+    # The booking itself is never its own conflict
+    (booking("morning", 8, 10), []),
+])
+def test_stored_overlap_query_boundaries(stored, candidate, expected):
+    assert stored_ids(stored, candidate) == expected
+
+
+def test_stored_overlap_query_matches_index(stored):
+    index = BookingIntervalIndex()
+    index.load(document for document in stored.find({"status": {"$ne": "cancelled"}}))
+    for start, end in [(6, 8), (7, 9), (9, 12), (10, 12), (12, 16), (15.5, 16.5), (16, 17), (0, 24)]:
+        expected = sorted(entry.id for entry in index.overlapping(at(start), at(end), CAR_SERVICES))
+        assert stored_ids(stored, booking("new", start, end)) == expected
+
+
+class FakeBookings:
+    """Records writes and undos; find_stored answers from a list of bookings stored by 'other workers'"""
+
+    def __init__(self, other_workers=()):
+        self.other_workers = list(other_workers)
+        self.written, self.undone = [], []
+
+    async def find_stored(self, query: dict):
+        candidates = mongomock.MongoClient(tz_aware=True).db.bookings
+        if self.other_workers:
+            candidates.insert_many([dict(document) for document in self.other_workers])
+        return candidates.find_one(query)
+
+
+def test_reserve_undoes_write_on_stored_conflict():
+    fake = FakeBookings([booking("elsewhere", 9, 11)])
+    reservations = BookingReservations(BookingIntervalIndex(), fake.find_stored)
+    candidate = booking("new", 10, 12)
+
+    async def write():
+        fake.written.append(candidate["id"])
+
+    async def undo():
+        fake.undone.append(candidate["id"])
+
+    with pytest.raises(BookingConflict) as raised:
+        asyncio.run(reservations.reserve(candidate, write, undo))
+    assert raised.value.conflict.id == "elsewhere"
+    assert fake.written == ["new"] and fake.undone == ["new"]
+    assert "new" not in reservations.index
+
+
+def test_reserve_rejects_indexed_conflict_without_writing():
+    fake = FakeBookings()
+    index = BookingIntervalIndex()
+    index.add(booking("existing", 9, 11))
+    reservations = BookingReservations(index, fake.find_stored)
+
+    async def write():
+        fake.written.append("new")
+
+    with pytest.raises(BookingConflict):
+        asyncio.run(reservations.reserve(booking("new", 10, 12), write))
+    assert fake.written == []
+
+
+def test_reserve_many_undoes_only_stored_conflicts():
+    fake = FakeBookings([booking("elsewhere", 9, 11)])
+    reservations = BookingReservations(BookingIntervalIndex(), fake.find_stored)
+    batch = [
+        booking("clash", 10, 12),
+        booking("free", 13, 14),
+        booking("same-batch", 13.5, 15),
+        booking("unlimited", 10, 12, service_type="computer"),
+        booking("failed", 20, 21),
+    ]
+
+    async def write(accepted):
+        fake.written.extend(document["id"] for document in accepted)
+        return {"failed": "write error"}
+
+    async def undo(ids):
+        fake.undone.extend(ids)
+
+    stored, conflicts, errors = asyncio.run(reservations.reserve_many(batch, write, undo))
+    assert [document["id"] for document in stored] == ["free", "unlimited"]
+    assert conflicts["clash"].id == "elsewhere"
+    assert conflicts["same-batch"].id == "free"
+    assert errors == {"failed": "write error"}
+    assert fake.written == ["clash", "free", "unlimited", "failed"]
+    assert fake.undone == ["clash"]
+    assert [booking_id for booking_id in fake.written if booking_id in reservations.index] == ["free", "unlimited"]
+
+
+def test_reserve_many_unindexes_batch_when_write_fails():
+    reservations = BookingReservations(BookingIntervalIndex())
+
+    async def write(accepted):
+        raise RuntimeError("database down")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(reservations.reserve_many([booking("a", 1, 2), booking("b", 3, 4)], write))
+    assert len(reservations.index) == 0
+
+
+def test_concurrent_reservations_of_one_resource_keep_one():
+    reservations = BookingReservations(BookingIntervalIndex())
+    written = []
+
+    def attempt(number: int):
+        # Every window overlaps 10:00-11:00; the writes yield to the event loop mid-reservation
+        candidate = booking(f"b{number}", 10 - number / 10, 11, service_type=CAR_SERVICES[number % 2])
+
+        async def write():
+            await asyncio.sleep(0)
+            written.append(candidate["id"])
+
+        return reservations.reserve(candidate, write)
+
+    async def race():
+        return await asyncio.gather(*(attempt(number) for number in range(10)), return_exceptions=True)
+
+    results = asyncio.run(race())
+    winners = [number for number, result in enumerate(results) if result is None]
+    assert len(winners) == 1
+    assert all(isinstance(result, BookingConflict) for result in results if result is not None)
+    assert written == [f"b{winners[0]}"]
+    assert len(reservations.index) == 1
@@ -0,0 +1,150 @@
+import asyncio
+
+import aiosmtplib
+import pytest
+
+import breaker
+from breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpen
+from email_service import _smtp_unavailable
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(breaker.time, "monotonic", clock)
+    return clock
+
+
+def make_breaker(**options) -> CircuitBreaker:
+    changes = []
+    settings = dict(failure_threshold=3, reset_timeout=30, on_state_change=changes.append)
+    settings.update(options)
+    circuit = CircuitBreaker("SMTP", **settings)
+    circuit.changes = changes
+    return circuit
+
+
+async def call(circuit: CircuitBreaker, error: Exception = None) -> None:
+    async with circuit.guard():
+        if error is not None:
+            raise error
+
+
+def outcome(circuit: CircuitBreaker, error: Exception = None) -> str:
+    try:
+        asyncio.run(call(circuit, error))
+    except CircuitOpen:
+        return "fast-fail"
+    except Exception:
+        return "error"
+    return "ok"
+
+
+def test_consecutive_failures_open_the_circuit(clock):
+    circuit = make_breaker()
+    assert [outcome(circuit, ConnectionError()) for _ in range(3)] == ["error"] * 3
+    assert circuit.state == OPEN
+    assert circuit.changes == [OPEN]
+    assert outcome(circuit) == "fast-fail"
+
+
+def test_success_resets_the_failure_count(clock):
+    circuit = make_breaker()
+    outcome(circuit, ConnectionError())
+    outcome(circuit, ConnectionError())
+    outcome(circuit)
+    outcome(circuit, ConnectionError())
+    assert circuit.state == CLOSED and circuit.failures == 1
+
+
+def test_half_open_probe_success_closes(clock):
+    circuit = make_breaker()
+    for _ in range(3):
+        outcome(circuit, ConnectionError())
+    clock.now += 29
+    assert outcome(circuit) == "fast-fail"
+    clock.now += 1
+    assert outcome(circuit) == "ok"
+    assert circuit.changes == [OPEN, HALF_OPEN, CLOSED]
+    assert circuit.failures == 0
+
+
+def test_half_open_probe_failure_reopens_for_another_timeout(clock):
+    circuit = make_breaker()
+    for _ in range(3):
+        outcome(circuit, ConnectionError())
+    clock.now += 30
+    assert outcome(circuit, TimeoutError()) == "error"
+    assert circuit.changes == [OPEN, HALF_OPEN, OPEN]
+    assert circuit.retry_after() == 30
+    clock.now += 29
+    assert outcome(circuit) == "fast-fail"
+
+
+def test_half_open_lets_one_probe_through(clock):
+    circuit = make_breaker(failure_threshold=1)
+    outcome(circuit, ConnectionError())
+    clock.now += 30
+
+    async def probe_and_second_call():
+        started, release = asyncio.Event(), asyncio.Event()
+
+        async def probe():
+            async with circuit.guard():
+                started.set()
+                await release.wait()
+
+        task = asyncio.create_task(probe())
+        await started.wait()
+        with pytest.raises(CircuitOpen):
+            await call(circuit)
+        release.set()
+        await task
+
+    asyncio.run(probe_and_second_call())
+    assert circuit.state == CLOSED
+
+
+def test_slow_call_counts_as_failure(clock):
+    circuit = make_breaker(failure_threshold=1, slow_call_seconds=10)
+
+    async def slow():
+        async with circuit.guard():
+            clock.now += 11
+
+    asyncio.run(slow())
+    assert circuit.state == OPEN
+
+
+@pytest.mark.parametrize("error, trips", [
+    (aiosmtplib.SMTPServerDisconnected("gone"), True),
+    (aiosmtplib.SMTPConnectTimeoutError("connect timed out"), True),
+    (aiosmtplib.SMTPReadTimeoutError("read timed out"), True),
+    (ConnectionRefusedError(), True),
+    (aiosmtplib.SMTPDataError(451, "try again later"), True),
+    (aiosmtplib.SMTPRecipientsRefused([aiosmtplib.SMTPRecipientRefused(450, "mailbox busy", "a@example.com")]), True),
+    (aiosmtplib.SMTPRecipientsRefused([aiosmtplib.SMTPRecipientRefused(550, "no such user", "a@example.com")]), False),
+    (aiosmtplib.SMTPSenderRefused(553, "sender rejected", "shop@example.com"), False),
+    (aiosmtplib.SMTPDataError(554, "message rejected"), False),
+    (ValueError("bad message"), False),
+])
+def test_only_smtp_availability_errors_trip_the_breaker(clock, error, trips):
+    circuit = make_breaker(failure_threshold=1, is_failure=_smtp_unavailable)
+    assert outcome(circuit, error) == "error"
+    assert circuit.state == (OPEN if trips else CLOSED)
+
+
+def test_permanent_rejection_during_probe_closes(clock):
+    circuit = make_breaker(failure_threshold=1, is_failure=_smtp_unavailable)
+    outcome(circuit, aiosmtplib.SMTPServerDisconnected("gone"))
+    clock.now += 30
+    assert outcome(circuit, aiosmtplib.SMTPDataError(554, "message rejected")) == "error"
+    assert circuit.state == CLOSED
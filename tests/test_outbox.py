@@ -0,0 +1,169 @@
+import asyncio
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from mongomock_motor import AsyncMongoMockClient
+
+from breaker import CircuitBreaker
+from outbox import DIGEST_LOCK_ID, PENDING, SENDING, SENT, EmailOutbox
+
+DIGEST_KIND = "booking_notification"
+
+
+def new_db():
+    return AsyncMongoMockClient(tz_aware=True).outbox_tests
+
+
+def make_outbox(db, sent: Counter, digests: list, **options) -> EmailOutbox:
+    async def send_one(payload):
+        sent[payload["n"]] += 1
+
+    async def send_digest(items):
+        digests.append(len(items))
+        sent.update(payload["n"] for _, payload in items)
+
+    settings = dict(concurrency=3, poll_interval=0.05, digest_window=0.1, digest_max=5)
+    settings.update(options)
+    return EmailOutbox(
+        db.email_outbox, {DIGEST_KIND: send_one},
+        digest_handler=send_digest, digest_kinds=(DIGEST_KIND,), **settings,
+    )
+
+
+async def wait_until_sent(db, timeout: float = 10) -> None:
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while await db.email_outbox.count_documents({"status": {"$ne": SENT}}):
+        assert loop.time() < deadline, "outbox did not drain"
+        await asyncio.sleep(0.02)
+
+
+def test_two_processes_send_each_digest_record_once():
+    async def scenario():
+        db = new_db()
+        sent, digests = Counter(), []
+        # Two outboxes on one database stand in for two server processes
+        outboxes = [make_outbox(db, sent, digests) for _ in range(2)]
+        for outbox in outboxes:
+            await outbox.start()
+        try:
+            for number in range(23):
+                await outboxes[number % 2].enqueue(DIGEST_KIND, {"n": number})
+                await asyncio.sleep(0.005)
+            await wait_until_sent(db)
+        finally:
+            for outbox in outboxes:
+                await outbox.stop()
+        return db, sent, digests
+
+    db, sent, digests = asyncio.run(scenario())
+    assert sorted(sent) == list(range(23))
+    assert set(sent.values()) == {1}
+    assert sum(digests) <= 23 and max(digests) <= 5
+    assert sum(1 for size in digests if size > 1) >= 1
+    assert asyncio.run(db.email_outbox_locks.find_one({"_id": DIGEST_LOCK_ID})) is None
+
+
+async def claimed(outbox: EmailOutbox, number: int) -> dict:
+    await outbox.collection.insert_one({
+        "id": f"job-{number}", "kind": DIGEST_KIND, "payload": {"n": number}, "status": PENDING,
+        "attempts": 0, "created_at": datetime.now(timezone.utc),
+        "next_attempt_at": datetime.now(timezone.utc) - timedelta(seconds=1), "locked_until": None,
+    })
+    return await outbox._claim()
+
+
+def test_digest_leader_lock_is_exclusive_until_it_expires():
+    async def scenario():
+        outbox = make_outbox(new_db(), Counter(), [], lease_seconds=60)
+        first, second = await claimed(outbox, 1), await claimed(outbox, 2)
+        assert first["lease"] != second["lease"]
+        assert await outbox._lead_digest(first)
+        assert not await outbox._lead_digest(second)
+
+        # The leader's lease runs out (e.g. its process died mid-digest)
+        await outbox.locks.update_one(
+            {"_id": DIGEST_LOCK_ID}, {"$set": {"locked_until": datetime.now(timezone.utc) - timedelta(seconds=1)}}
+        )
+        assert await outbox._lead_digest(second)
+        lock = await outbox.locks.find_one({"_id": DIGEST_LOCK_ID})
+        assert lock["lease"] == second["lease"]
+
+    asyncio.run(scenario())
+
+
+def test_non_leader_releases_its_record_without_using_an_attempt():
+    async def scenario():
+        outbox = make_outbox(new_db(), Counter(), [], lease_seconds=60)
+        leader, follower = await claimed(outbox, 1), await claimed(outbox, 2)
+        assert await outbox._lead_digest(leader)
+        await outbox._deliver_digest(follower)
+        return await outbox.collection.find_one({"_id": follower["_id"]})
+
+    record = asyncio.run(scenario())
+    assert record["status"] == PENDING
+    assert record["attempts"] == 0
+    assert record["lease"] is None
+
+
+def test_expired_lease_is_reclaimed_and_fences_the_old_worker():
+    async def scenario():
+        outbox = make_outbox(new_db(), Counter(), [], lease_seconds=60)
+        stale = await claimed(outbox, 1)
+        assert stale["status"] == SENDING and stale["attempts"] == 1
+
+        # The worker holding the lease stalls past locked_until
+        await outbox.collection.update_one(
+            {"_id": stale["_id"]}, {"$set": {"locked_until": datetime.now(timezone.utc) - timedelta(seconds=1)}}
+        )
+        reclaimed = await outbox._claim()
+        assert reclaimed["_id"] == stale["_id"]
+        assert reclaimed["lease"] != stale["lease"]
+        assert reclaimed["attempts"] == 2
+
+        # The stalled worker's late failure report matches no lease and is dropped
+        await outbox._record_failure(stale, RuntimeError("timed out"))
+        record = await outbox.collection.find_one({"_id": stale["_id"]})
+        assert record["status"] == SENDING and record["lease"] == reclaimed["lease"]
+
+        await outbox._deliver(reclaimed)
+        return await outbox.collection.find_one({"_id": stale["_id"]})
+
+    record = asyncio.run(scenario())
+    assert record["status"] == SENT
+    assert record["lease"] is None
+
+
+def test_open_breaker_defers_records_and_pauses_the_workers():
+    circuit = CircuitBreaker("SMTP", failure_threshold=1, reset_timeout=30)
+    circuit.record_failure()
+    calls = []
+
+    async def send(payload):
+        calls.append(payload["n"])
+        async with circuit.guard():
+            pass
+
+    async def scenario():
+        db = new_db()
+        outbox = EmailOutbox(db.email_outbox, {"booking_confirmation": send}, concurrency=2, poll_interval=0.05)
+        await outbox.start()
+        try:
+            for number in range(3):
+                await outbox.enqueue("booking_confirmation", {"n": number})
+            await asyncio.sleep(0.3)
+            paused_for = outbox._paused_until - asyncio.get_running_loop().time()
+        finally:
+            await outbox.stop()
+        return paused_for, await db.email_outbox.find().to_list(None)
+
+    paused_for, records = asyncio.run(scenario())
+    # Each worker hits the open circuit at most once, then sleeps instead of claiming
+    assert 1 <= len(calls) <= 2
+    assert 25 < paused_for <= 30
+    due = datetime.now(timezone.utc) + timedelta(seconds=25)
+    for record in records:
+        assert record["status"] == PENDING
+        assert record["attempts"] == 0
+        assert record["last_error"] is None
+    assert sum(1 for record in records if record["next_attempt_at"] > due) == len(calls)
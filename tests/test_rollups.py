@@ -0,0 +1,39 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from mongomock_motor import AsyncMongoMockClient
+
+from migrations import migrate_string_dates
+from rollups import StatusRollups
+
+BASE = datetime(2030, 5, 1, 5, 0, tzinfo=timezone.utc)
+
+
+def counts(rollups) -> dict:
+    async def read():
+        return await rollups.collection.find({}, {"_id": 0}).to_list(None)
+    return {(row["client_name"], row["hour"]): row["count"] for row in asyncio.run(read())}
+
+
+def test_string_and_date_timestamps_roll_up_together():
+    db = AsyncMongoMockClient(tz_aware=True).rollup_tests
+    checks = [
+        {"client_name": "a", "timestamp": BASE + timedelta(minutes=10)},
+        {"client_name": "a", "timestamp": (BASE + timedelta(minutes=20)).isoformat()},
+        {"client_name": "a", "timestamp": (BASE + timedelta(hours=1, minutes=5)).isoformat().replace("+00:00", "Z")},
+        {"client_name": "b", "timestamp": (BASE + timedelta(minutes=30)).isoformat()},
+        # Current hour: not complete yet
+        {"client_name": "a", "timestamp": (BASE + timedelta(hours=2, minutes=1)).isoformat()},
+        {"client_name": "a", "timestamp": "not a date"},
+    ]
+    asyncio.run(db.status_checks.insert_many(checks))
+    rollups = StatusRollups(db)
+
+    asyncio.run(rollups.roll_up(BASE + timedelta(hours=2, minutes=30)))
+    expected = {("a", BASE): 2, ("a", BASE + timedelta(hours=1)): 1, ("b", BASE): 1}
+    assert counts(rollups) == expected
+
+    # After the migration the same rows are dates; rolled-up hours are not counted again
+    asyncio.run(migrate_string_dates(db, pause=0))
+    asyncio.run(rollups.roll_up(BASE + timedelta(hours=3, minutes=30)))
+    assert counts(rollups) == {**expected, ("a", BASE + timedelta(hours=2)): 1}